@@ -1,21 +1,89 @@
-import json
-import re
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
+from typing import Any, Callable, Dict, List, Optional
 from langchain.prompts import HumanMessagePromptTemplate
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import SystemMessage, HumanMessage
 from dotenv import load_dotenv
-import os
+
+from agents.registry import ResourceRegistry, get_registry
+from agents.tools.events import emit
+from agents.tools.json_repair import aparse_reply, parse_reply, validate
+from agents.tools.json_stream import JsonArrayStream
+
 load_dotenv()
 
+USE_CASES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "use_case": {"type": "string"},
+            "market_trend": {"type": "string"},
+            "implementation_steps": {"type": "array"},
+        },
+        "required": ["use_case", "market_trend"],
+    },
+}
+
+# Called with (index, use case) as each use case becomes available
+UseCaseCallback = Callable[[int, Dict[str, Any]], None]
+
+
+class UseCaseStream(BaseCallbackHandler):
+    """
+    Parses use cases out of the reply's tokens while it streams, emitting a
+    "use_case" event and calling on_use_case for each one as soon as its
+    object is complete. Only use cases matching USE_CASES_SCHEMA's items are
+    delivered early; from the first one that doesn't, the rest wait for the
+    validated (repaired or re-asked) reply.
+    """
+
+    # Called on the event loop for async runs, so on_use_case can start tasks
+    run_inline = True
+
+    def __init__(self, on_use_case: Optional[UseCaseCallback] = None):
+        self.on_use_case = on_use_case
+        self.parser = JsonArrayStream()
+        self.delivered: List[Dict[str, Any]] = []
+        self.held_back = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        for item in self.parser.feed(token):
+            if self.held_back:
+                continue
+            if validate(item, USE_CASES_SCHEMA["items"]):
+                self.held_back = True
+                continue
+            self.deliver(item)
+
+    def deliver(self, use_case: Dict[str, Any]):
+        index = len(self.delivered)
+        self.delivered.append(use_case)
+        emit("use_case", use_case, index=index)
+        if self.on_use_case:
+            self.on_use_case(index, use_case)
+
 class UseCaseGenerationTool:
     """
     Generate AI/GenAI use cases for a given industry and focus areas.
+    Runs on the LLM_TIERS["use_cases"] model tier unless model_name is given.
     """
-    def __init__(self, model_name: str = "gpt-4", temperature: float = 0.3):
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+
+    LLM_TIERS = {"use_cases": "strong"}
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        temperature: float = 0.3,
+        use_llm_cache: bool = True,
+        registry: Optional[ResourceRegistry] = None,
+    ):
+        registry = registry or get_registry()
+        if model_name is None:
+            self.llm = registry.tier_model(self.LLM_TIERS["use_cases"], temperature, use_cache=use_llm_cache)
+        else:
+            self.llm = registry.chat_model(model_name, temperature, use_cache=use_llm_cache)
         system_msg = SystemMessage(content=(
             "You are an AI strategist. Generate innovative AI/GenAI use cases for an industry with given focus areas. "
             "Respond as a JSON list of dictionaries with 'use_case', 'market_trend', and 'implementation_steps'. "
@@ -38,69 +106,162 @@ class UseCaseGenerationTool:
         industry: str, 
         key_offerings: List[str], 
         strategic_focus: List[str], 
-        market_position: str
+        market_position: str,
+        on_use_case: Optional[UseCaseCallback] = None,
     ) -> List[Dict[str, Any]]:
         """
         Generate use cases based on inputs.
+        The reply is parsed while it streams: on_use_case(index, use_case) is
+        called as soon as each use case is complete, before the reply ends.
+        """
+        messages = self._messages(industry, key_offerings, strategic_focus, market_position)
+        stream = UseCaseStream(on_use_case)
+        content = self._content(self.llm.invoke(messages, config={"callbacks": [stream]}))
+        try:
+            use_cases = parse_reply(
+                content, USE_CASES_SCHEMA, "use_cases",
+                lambda repair: self._content(self.llm.invoke(messages + [HumanMessage(content=repair)])),
+            )
+        except Exception as e:
+            print(f"Use case JSON unusable: {e}")
+            use_cases = []
+        return self._finish_stream(use_cases, stream)
+
+    async def agenerate_use_cases(
+        self,
+        industry: str,
+        key_offerings: List[str],
+        strategic_focus: List[str],
+        market_position: str,
+        on_use_case: Optional[UseCaseCallback] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        generate_use_cases() for coroutines. on_use_case is called on the
+        event loop.
         """
-        messages = self.prompt.format_messages(
+        messages = self._messages(industry, key_offerings, strategic_focus, market_position)
+        stream = UseCaseStream(on_use_case)
+        content = self._content(await self.llm.ainvoke(messages, config={"callbacks": [stream]}))
+
+        async def reask(repair: str) -> str:
+            return self._content(await self.llm.ainvoke(messages + [HumanMessage(content=repair)]))
+
+        try:
+            use_cases = await aparse_reply(content, USE_CASES_SCHEMA, "use_cases", reask)
+        except Exception as e:
+            print(f"Use case JSON unusable: {e}")
+            use_cases = []
+        return self._finish_stream(use_cases, stream)
+
+    def _messages(self, industry, key_offerings, strategic_focus, market_position):
+        return self.prompt.format_messages(
             industry=industry,
             key_offerings=", ".join(key_offerings),
             strategic_focus=", ".join(strategic_focus),
             market_position=market_position
         )
-        response = self.llm.invoke(messages)
+
+    def _content(self, response) -> str:
         content = response.content if hasattr(response, "content") else str(response)
         content = self.output_parser.parse(content)
-        
-        # Preprocess to remove markdown code blocks
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'\s*```', '', content)
-        
+
         # Debugging: Print raw content to inspect
         print("Raw Response Content:", content)
-        
-        try:
-            use_cases = json.loads(content)
-            if not isinstance(use_cases, list):  # Ensure it's a list
-                use_cases = []
-        except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {e}")
-            use_cases = []
-        return use_cases
+        return content
+
+    @staticmethod
+    def _finish_stream(use_cases: List[Dict[str, Any]], stream: UseCaseStream) -> List[Dict[str, Any]]:
+        """
+        The final list: the validated use_cases, with the first ones being
+        those already delivered while streaming (their resources may be
+        underway, and they passed the same schema); the rest are delivered now.
+        Cached and coalesced replies arrive without tokens, so for them
+        everything is delivered here.
+        """
+        delivered = stream.delivered
+        if use_cases[:len(delivered)] != delivered[:len(use_cases)]:
+            print("Streamed use cases differ from the validated reply; keeping the ones already delivered")
+        for use_case in use_cases[len(delivered):]:
+            stream.deliver(use_case)
+        return list(stream.delivered)
 
 
 class MarketAnalysisAgent:
     """
     Agent that handles generating use cases with provided market data.
     """
-    def __init__(self, model_name: str = "gpt-4", temperature: float = 0.3):
-        self.market_agent = UseCaseGenerationTool(model_name=model_name, temperature=temperature)
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        temperature: float = 0.3,
+        use_llm_cache: bool = True,
+        registry: Optional[ResourceRegistry] = None,
+    ):
+        self.market_agent = UseCaseGenerationTool(
+            model_name=model_name, temperature=temperature, use_llm_cache=use_llm_cache, registry=registry
+        )
 
     def generate_use_cases(
         self, 
         industry: str, 
         key_offerings: List[str], 
         strategic_focus: List[str], 
-        market_position: str
+        market_position: str,
+        on_use_case: Optional[UseCaseCallback] = None,
     ) -> List[Dict[str, Any]]:
         """
         Interface to directly generate use cases given market inputs.
         """
         return self.market_agent.generate_use_cases(
-            industry, key_offerings, strategic_focus, market_position
+            industry, key_offerings, strategic_focus, market_position, on_use_case
         )
 
-    def execute_workflow(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def agenerate_use_cases(
+        self,
+        industry: str,
+        key_offerings: List[str],
+        strategic_focus: List[str],
+        market_position: str,
+        on_use_case: Optional[UseCaseCallback] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        generate_use_cases() for coroutines.
+        """
+        return await self.market_agent.agenerate_use_cases(
+            industry, key_offerings, strategic_focus, market_position, on_use_case
+        )
+
+    def execute_workflow(
+        self, market_data: Dict[str, Any], on_use_case: Optional[UseCaseCallback] = None
+    ) -> Dict[str, Any]:
         """
         Workflow when market data (not company name) is already provided.
+        on_use_case(index, use_case) is called as each use case streams in.
         """
         use_cases = self.generate_use_cases(
             market_data.get("industry", ""),
             market_data.get("key_offerings", []),
             market_data.get("strategic_focus", []),
-            market_data.get("market_position", "")
+            market_data.get("market_position", ""),
+            on_use_case,
+        )
+        return {
+            "generated_use_cases": use_cases
+        }
+
+    async def aexecute_workflow(
+        self, market_data: Dict[str, Any], on_use_case: Optional[UseCaseCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        execute_workflow() for coroutines.
+        """
+        use_cases = await self.agenerate_use_cases(
+            market_data.get("industry", ""),
+            market_data.get("key_offerings", []),
+            market_data.get("strategic_focus", []),
+            market_data.get("market_position", ""),
+            on_use_case,
         )
         return {
             "generated_use_cases": use_cases
-        }
\ No newline at end of file
+        }
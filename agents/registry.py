@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from langchain_openai import ChatOpenAI
+
+from agents.tools.fetcher import PageFetcher
+from agents.tools.llm import chat_model
+from agents.tools.model_tiers import TIERS, TierSettings, tier_settings_from_env
+from agents.tools.report_store import ReportStore
+from agents.tools.research import DEFAULT_HEADERS, ResearchAgent
+from agents.tools.scrape_cache import ScrapeCache
+from agents.tools.singleflight import SingleFlight
+
+
+class ResourceRegistry:
+    """
+    Process-wide home for expensive, thread-safe objects that every agent and
+    session can share: LLM clients, the pooled HTTP fetcher, the scraper and
+    compiled agent graphs. Objects are built once, on first use.
+
+    http_concurrency caps the requests the shared fetcher has in flight at once.
+    tiers maps each model tier ("fast", "strong") to the model serving it
+    (default: tier_settings_from_env(), read on first use so that settings
+    loaded from .env after import still apply).
+    """
+
+    def __init__(self, http_concurrency: int = 16, tiers: Optional[Dict[str, TierSettings]] = None):
+        self.http_concurrency = http_concurrency
+        self._tiers = tiers
+        self._objects = {}
+        self._lock = threading.RLock()
+        self._inflight = SingleFlight()
+
+    @property
+    def tiers(self) -> Dict[str, TierSettings]:
+        with self._lock:
+            if self._tiers is None:
+                self._tiers = tier_settings_from_env()
+            return self._tiers
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the object stored under key, building it with factory the first time."""
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = factory()
+            return self._objects[key]
+
+    def coalesce(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or join an identical call (same key) already running in another thread."""
+        return self._inflight.do(key, fn)
+
+    def chat_model(
+        self, model: str = "gpt-4", temperature: float = 0.3, use_cache: bool = True, max_tokens: Optional[int] = None
+    ) -> ChatOpenAI:
+        return self.get_or_create(
+            ("chat_model", model, temperature, use_cache, max_tokens),
+            lambda: chat_model(model, temperature, use_cache=use_cache, max_tokens=max_tokens),
+        )
+
+    def tier_model(self, tier: str, temperature: float = 0.3, use_cache: bool = True) -> ChatOpenAI:
+        """The chat model serving `tier`, at the tier's temperature if it sets one."""
+        if tier not in TIERS:
+            raise ValueError(f"Unknown model tier '{tier}', expected one of {TIERS}")
+        settings = self.tiers[tier]
+        if settings.temperature is not None:
+            temperature = settings.temperature
+        return self.chat_model(settings.model, temperature, use_cache=use_cache, max_tokens=settings.max_tokens)
+
+    def page_fetcher(self) -> PageFetcher:
+        return self.get_or_create(
+            "page_fetcher",
+            lambda: PageFetcher(
+                headers=DEFAULT_HEADERS,
+                max_connections=self.http_concurrency,
+                cache=ScrapeCache.from_env(),
+            ),
+        )
+
+    def research_scraper(self) -> ResearchAgent:
+        return self.get_or_create(
+            "research_scraper",
+            lambda: ResearchAgent(fetcher=self.page_fetcher()),
+        )
+
+    def report_store(self) -> Optional[ReportStore]:
+        """Finished reports shared by every session (None if REPORT_STORE_TTL=off)."""
+        return self.get_or_create("report_store", ReportStore.from_env)
+
+
+_registry = ResourceRegistry()
+
+
+def get_registry() -> ResourceRegistry:
+    """The default process-wide registry."""
+    return _registry
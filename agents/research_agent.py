@@ -1,97 +1,329 @@
 from dotenv import load_dotenv
 import json
+import os
+import time
 
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from langgraph.prebuilt import create_react_agent
 
+from typing import Optional
+
 # Your existing ResearchAgent import
-from agents.tools.research import ResearchAgent
+from agents.registry import ResourceRegistry, get_registry
+from agents.tools.compaction import compact_sections
+from agents.tools.events import emit
+from agents.tools.json_repair import aparse_reply, parse_reply
+from agents.tools.tracing import span
+from agents.tools.usage import track_usage
 
 load_dotenv()
 
+ANALYSIS_PROMPT = ChatPromptTemplate.from_template(
+    """
+    Analyze the following company information:
+    {company_info}
+
+    Extract and return the information in this JSON format:
+    {{
+        "industry": string,
+        "key_offerings": [list of strings],
+        "strategic_focus": [list of strings],
+        "market_position": string
+    }}
+    Only output JSON. No explanation.
+    """
+)
+
+# Function-calling schema for the direct mode's single extraction call
+ANALYSIS_SCHEMA = {
+    "title": "company_analysis",
+    "description": "Structured summary of a company's market profile.",
+    "type": "object",
+    "properties": {
+        "industry": {"type": "string"},
+        "key_offerings": {"type": "array", "items": {"type": "string"}},
+        "strategic_focus": {"type": "array", "items": {"type": "string"}},
+        "market_position": {"type": "string"},
+    },
+    "required": ["industry", "key_offerings", "strategic_focus", "market_position"],
+}
+
+RESEARCH_MODES = ("direct", "react")
+
+# Token budget for the research text put into the analysis prompt
+DEFAULT_CONTEXT_TOKENS = 1500
+
+
+def format_company_info(info: dict) -> str:
+    """Render ResearchAgent.get_company_info output as the text the LLM sees."""
+    combined_info = ""
+    if "wikipedia" in info:
+        combined_info += f"Wikipedia Info:\n{info['wikipedia']}\n\n"
+    if "website" in info:
+        combined_info += f"Website Info:\n{info['website']}\n"
+    return combined_info or "No information found."
+
+
+def compact_context(sections, company_name: str, context_tokens: int) -> str:
+    with span("compact", "compact") as current:
+        text, stats = compact_sections(sections, company_name, context_tokens)
+        current.set(**stats)
+    print(
+        f"✂️ Research context: {stats['raw_tokens']} -> {stats['tokens']} tokens "
+        f"({stats['kept']}/{stats['paragraphs']} paragraphs kept, "
+        f"{stats['duplicates']} duplicate, {stats['boilerplate']} boilerplate)"
+    )
+    return text or "No information found."
+
+
+def company_context(info: dict, company_name: str, context_tokens: int) -> str:
+    """format_company_info(info), compacted to context_tokens (0 = not compacted)."""
+    if not context_tokens:
+        return format_company_info(info)
+    sections = [
+        (label, info[key])
+        for key, label in (("wikipedia", "Wikipedia Info"), ("website", "Website Info"))
+        if key in info
+    ]
+    return compact_context(sections, company_name, context_tokens)
+
+
+def research_tool(scraper, context_tokens: int):
+    """
+    The ReAct agent's research tool. It only uses the shared scraper and the
+    context budget, never an agent instance, so a graph compiled with it can
+    be shared by every agent with the same budget.
+    """
+    @tool
+    def company_research_tool(query: str) -> str:
+        """
+        Perform deep web research about a company and return detailed findings.
+        """
+        return company_context(scraper.get_company_info(query), query, context_tokens)
+
+    return company_research_tool
+
 
 class ResearchLangGraphAgent:
-    def __init__(self):
-        # Initialize the LLM (ChatGPT GPT-4 here)
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0.5)
-
-        # Initialize your wrapped research agent (non-LangChain)
-        self.research_agent = ResearchAgent()
-
-        # Define the tool using @tool decorator from langchain_core.tools
-        @tool
-        def company_research_tool(query: str) -> str:
-            """
-            Perform deep web research about a company and return detailed findings.
-            """
-            info = self.research_agent.get_company_info(query)
-            combined_info = ""
-            if "wikipedia" in info:
-                combined_info += f"Wikipedia Info:\n{info['wikipedia']}\n\n"
-            if "website" in info:
-                combined_info += f"Website Info:\n{info['website']}\n"
-            return combined_info or "No information found."
-
-        self.company_research_tool = company_research_tool
-
-        # Create the LangGraph React agent with debug enabled for verbose logs
-        self.agent = create_react_agent(
-            model=self.llm,
-            tools=[self.company_research_tool],
-            debug=True  # Set to False to reduce verbosity
+    """
+    Researches a company and extracts its market profile.
+
+    mode="direct" (default) scrapes with ResearchAgent and makes one structured
+    extraction call. mode="react" keeps the original LangGraph ReAct loop, where
+    the model decides to call the research tool and then restates its output
+    before a separate analysis call. Both record per-run LLM call counts,
+    tokens and latency in last_run_stats.
+
+    Research text is compacted before it reaches a prompt: duplicate and
+    boilerplate paragraphs are dropped and the most relevant ones kept within
+    context_tokens (default RESEARCH_CONTEXT_TOKENS, else 1500; 0 disables).
+
+    aresearch_and_analyze (and the other a-prefixed methods) run the same
+    workflow on an asyncio event loop with ainvoke and the async scraper.
+
+    LLM_TIERS declares the model tier of each call: the ReAct loop only
+    decides to call the research tool and hands its output on, so it runs on
+    the fast tier; the analysis stays on the strong one.
+    """
+
+    LLM_TIERS = {"analysis": "strong", "tool_selection": "fast"}
+
+    def __init__(
+        self,
+        use_llm_cache: bool = True,
+        registry: Optional[ResourceRegistry] = None,
+        mode: str = "direct",
+        context_tokens: Optional[int] = None,
+    ):
+        if mode not in RESEARCH_MODES:
+            raise ValueError(f"Unknown research mode '{mode}', expected one of {RESEARCH_MODES}")
+        self.mode = mode
+        if context_tokens is None:
+            context_tokens = int(os.getenv("RESEARCH_CONTEXT_TOKENS", DEFAULT_CONTEXT_TOKENS))
+        self.context_tokens = context_tokens
+        self.last_run_stats = {}
+        self.registry = registry or get_registry()
+
+        # LLMs for each tier (GPT-4 for the analysis by default); identical
+        # prompts are answered from the shared LLM cache unless use_llm_cache is False
+        self.llm = self.registry.tier_model(self.LLM_TIERS["analysis"], 0.5, use_cache=use_llm_cache)
+        self.tool_llm = self.registry.tier_model(self.LLM_TIERS["tool_selection"], 0.5, use_cache=use_llm_cache)
+
+        # Initialize your wrapped research agent (non-LangChain), shared
+        # process-wide together with its HTTP connection pool
+        self.research_agent = self.registry.research_scraper()
+
+        self.company_research_tool = research_tool(self.research_agent, self.context_tokens)
+
+        # Create the LangGraph React agent with debug enabled for verbose logs.
+        # The compiled graph only depends on the shared LLM and scraper and the
+        # context budget, so it is compiled once per process for each of those.
+        self.agent = self.registry.get_or_create(
+            (
+                "react_agent", self.tool_llm.model_name, self.tool_llm.temperature,
+                use_llm_cache, self.context_tokens,
+            ),
+            lambda: create_react_agent(
+                model=self.tool_llm,
+                tools=[self.company_research_tool],
+                debug=True  # Set to False to reduce verbosity
+            ),
         )
 
-    def analyze_company(self, company_info: str) -> dict:
-        """Analyze scraped company info into structured JSON."""
-        prompt = ChatPromptTemplate.from_template(
-            """
-            Analyze the following company information:
-            {company_info}
-
-            Extract and return the information in this JSON format:
-            {{
-                "industry": string,
-                "key_offerings": [list of strings],
-                "strategic_focus": [list of strings],
-                "market_position": string
-            }}
-            Only output JSON. No explanation.
-            """
+        self.analysis_chain = ANALYSIS_PROMPT | self.llm | StrOutputParser()
+        self.extraction_chain = ANALYSIS_PROMPT | self.llm.with_structured_output(
+            ANALYSIS_SCHEMA, method="function_calling"
         )
 
-        chain = prompt | self.llm | StrOutputParser()
-        response = chain.invoke({"company_info": company_info})
+    def company_context(self, info: dict, company_name: str) -> str:
+        """format_company_info(info), compacted to context_tokens."""
+        return company_context(info, company_name, self.context_tokens)
+
+    def fit_context(self, text: str, company_name: str) -> str:
+        """Compact free-form research text (the ReAct agent's summary) to context_tokens."""
+        if not self.context_tokens:
+            return text
+        return compact_context([("", text)], company_name, self.context_tokens)
+
+    def analyze_company(self, company_info: str) -> dict:
+        """
+        Analyze scraped company info into structured JSON. A malformed reply
+        is repaired, or re-asked once with a repair prompt, before giving up.
+        """
+        response = self.analysis_chain.invoke({"company_info": company_info})
+        messages = ANALYSIS_PROMPT.format_messages(company_info=company_info)
+        try:
+            return parse_reply(
+                response, ANALYSIS_SCHEMA, "analysis",
+                lambda repair: self.llm.invoke(messages + [HumanMessage(content=repair)]).content,
+            )
+        except Exception as e:
+            return self._parse_failed(response, e)
+
+    async def aanalyze_company(self, company_info: str) -> dict:
+        """analyze_company() for coroutines."""
+        response = await self.analysis_chain.ainvoke({"company_info": company_info})
+        messages = ANALYSIS_PROMPT.format_messages(company_info=company_info)
+
+        async def reask(repair: str) -> str:
+            return (await self.llm.ainvoke(messages + [HumanMessage(content=repair)])).content
 
         try:
-            parsed = json.loads(response)
-        except json.JSONDecodeError:
-            parsed = {"error": "Failed to parse JSON", "raw_response": response}
+            return await aparse_reply(response, ANALYSIS_SCHEMA, "analysis", reask)
+        except Exception as e:
+            return self._parse_failed(response, e)
+
+    @staticmethod
+    def _parse_failed(response: str, error: Exception) -> dict:
+        print(f"Analysis JSON unusable: {error}")
+        return {"error": "Failed to parse JSON", "raw_response": response}
 
+    def extract_analysis(self, company_info: str) -> dict:
+        """
+        Structured (function-calling) version of analyze_company. Falls back to
+        analyze_company if the structured call fails or returns nothing usable.
+        """
+        try:
+            parsed = self.extraction_chain.invoke({"company_info": company_info})
+        except Exception as e:
+            print(f"Structured extraction failed, retrying as plain JSON: {e}")
+            parsed = None
+        if not isinstance(parsed, dict) or not parsed:
+            return self.analyze_company(company_info)
+        return parsed
+
+    async def aextract_analysis(self, company_info: str) -> dict:
+        """extract_analysis() for coroutines."""
+        try:
+            parsed = await self.extraction_chain.ainvoke({"company_info": company_info})
+        except Exception as e:
+            print(f"Structured extraction failed, retrying as plain JSON: {e}")
+            parsed = None
+        if not isinstance(parsed, dict) or not parsed:
+            return await self.aanalyze_company(company_info)
         return parsed
 
     def research_and_analyze(self, company_name: str) -> dict:
         """
         Full workflow: search, gather, and analyze a company.
 
-        This method calls the LangGraph agent with a user message and
-        then analyzes the text response into structured JSON.
+        In react mode this calls the LangGraph agent with a user message and
+        then analyzes the text response into structured JSON; in direct mode
+        the scraped text goes straight into one structured extraction call.
         """
-        print(f"🔎 Researching: {company_name}")
+        print(f"🔎 Researching: {company_name} ({self.mode} mode)")
+
+        start = time.perf_counter()
+        with track_usage() as usage:
+            if self.mode == "react":
+                analysis = self._research_react(company_name)
+            else:
+                analysis = self._research_direct(company_name)
+
+        self._record_run(start, usage, analysis)
+        return analysis
+
+    async def aresearch_and_analyze(self, company_name: str) -> dict:
+        """research_and_analyze() for coroutines."""
+        print(f"🔎 Researching: {company_name} ({self.mode} mode)")
 
+        start = time.perf_counter()
+        with track_usage() as usage:
+            if self.mode == "react":
+                analysis = await self._aresearch_react(company_name)
+            else:
+                analysis = await self._aresearch_direct(company_name)
+
+        self._record_run(start, usage, analysis)
+        return analysis
+
+    def _record_run(self, start: float, usage, analysis: dict):
+        self.last_run_stats = {
+            "mode": self.mode,
+            "seconds": round(time.perf_counter() - start, 3),
+            **usage.summary(),
+        }
+        print(f"⏱️ Research stats: {json.dumps(self.last_run_stats)}")
+        print(f"📊 Analysis:\n{json.dumps(analysis, indent=2)}")
+
+    def _research_direct(self, company_name: str) -> dict:
+        research_result = self.company_context(self.research_agent.get_company_info(company_name), company_name)
+
+        print(f"📄 Research Result:\n{research_result}\n")
+        emit("research", research_result)
+
+        return self.extract_analysis(research_result)
+
+    async def _aresearch_direct(self, company_name: str) -> dict:
+        research_result = self.company_context(await self.research_agent.aget_company_info(company_name), company_name)
+
+        print(f"📄 Research Result:\n{research_result}\n")
+        emit("research", research_result)
+
+        return await self.aextract_analysis(research_result)
+
+    def _research_react(self, company_name: str) -> dict:
         # Invoke the LangGraph agent with a message history (single human message)
         response = self.agent.invoke({"messages": [("human", f"Find detailed information about {company_name}")], "stream_mode": None})
 
         # The last message from the agent contains the final answer text
-        research_result = response["messages"][-1].content
+        research_result = self.fit_context(response["messages"][-1].content, company_name)
 
         print(f"📄 Research Result:\n{research_result}\n")
+        emit("research", research_result)
 
-        analysis = self.analyze_company(research_result)
+        return self.analyze_company(research_result)
 
-        print(f"📊 Analysis:\n{json.dumps(analysis, indent=2)}")
+    async def _aresearch_react(self, company_name: str) -> dict:
+        # The research tool is a plain function, so LangGraph runs it in a worker thread
+        response = await self.agent.ainvoke({"messages": [("human", f"Find detailed information about {company_name}")], "stream_mode": None})
+        research_result = self.fit_context(response["messages"][-1].content, company_name)
+
+        print(f"📄 Research Result:\n{research_result}\n")
+        emit("research", research_result)
 
-        return analysis
\ No newline at end of file
+        return await self.aanalyze_company(research_result)
@@ -1,37 +1,82 @@
-from typing import List, Dict
-from langchain_openai import ChatOpenAI
-import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
+import asyncio
+import contextvars
 import os
+import threading
 from dotenv import load_dotenv
 
+from agents.tools.events import emit, stage_events
+from agents.tools.fanout import run_concurrently
+from agents.tools.json_repair import JsonRecoveryError, aparse_reply, parse_reply, validate
+from agents.registry import ResourceRegistry, get_registry
+
 load_dotenv()
 
-class ResourceAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0.3)
+RESOURCE_FIELDS = ["implementation_plan", "datasets", "models", "research_papers"]
+RESOURCE_MODES = ("per_field", "batched")
 
-    def safe_invoke(self, prompt: str) -> List[Dict]:
-        """Safely invoke LLM and parse JSON response."""
-        try:
-            response = self.llm.invoke(prompt)
+_LINK_ITEM = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "platform": {"type": "string"},
+        "url": {"type": "string"},
+    },
+    "required": ["name", "platform", "url"],
+}
 
-            if not response.content:
-                print("Warning: Empty response from LLM.")
-                return []
+_PLAN_ITEM = {
+    "type": "object",
+    "properties": {
+        "step": {"type": "integer"},
+        "description": {"type": "string"},
+    },
+    "required": ["step", "description"],
+}
 
-            return json.loads(response.content)
-        
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            return []
-        
-        except Exception as e:
-            print(f"Unexpected error during LLM invoke: {e}")
-            return []
+_PAPER_ITEM = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "authors": {"type": "array", "items": {"type": "string"}},
+        "url": {"type": "string"},
+    },
+    "required": ["title", "authors", "url"],
+}
 
-    def generate_plan(self, use_case: str, market_trend: str) -> List[Dict]:
-        """Generate a step-by-step implementation plan."""
-        prompt = f"""
+# What each per-field reply must look like; replies are repaired or re-asked until they do
+FIELD_SCHEMAS = {
+    "implementation_plan": {"type": "array", "items": _PLAN_ITEM},
+    "datasets": {"type": "array", "items": _LINK_ITEM},
+    "models": {"type": "array", "items": _LINK_ITEM},
+    "research_papers": {"type": "array", "items": _PAPER_ITEM},
+}
+
+# Function-calling schema for batched mode: one bundle per use case, each
+# holding the same four lists the per-field prompts ask for.
+RESOURCE_BUNDLES_SCHEMA = {
+    "title": "resource_bundles",
+    "description": "Implementation plan, datasets, models and papers for each AI use case.",
+    "type": "object",
+    "properties": {
+        "bundles": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer", "description": "Number of the use case, as given."},
+                    **FIELD_SCHEMAS,
+                },
+                "required": ["index"] + RESOURCE_FIELDS,
+            },
+        }
+    },
+    "required": ["bundles"],
+}
+
+# Per-field prompts, filled in with str.format
+PLAN_PROMPT = """
 You are an AI assistant tasked with creating an implementation plan.
 Given the AI use case and market trend below, list the key steps in clear order.
 Output as a JSON list of dictionaries with "step" (number) and "description" (brief action).
@@ -39,36 +84,172 @@ Output as a JSON list of dictionaries with "step" (number) and "description" (br
 Use Case: {use_case}
 Market Trend: {market_trend}
 """
-        return self.safe_invoke(prompt)
 
-    def find_datasets(self, use_case: str) -> List[Dict]:
-        """Find datasets for the use case."""
-        prompt = f"""
+DATASETS_PROMPT = """
 You are an AI assistant tasked with finding datasets.
 Find at least 3 datasets related to: {use_case}.
 Source them from Kaggle, HuggingFace, or GitHub.
 Output as JSON list of dictionaries with "name", "platform", and "url".
 """
-        return self.safe_invoke(prompt)
 
-    def find_models(self, use_case: str) -> List[Dict]:
-        """Find pre-trained models for the use case."""
-        prompt = f"""
+MODELS_PROMPT = """
 You are an AI assistant tasked with finding pre-trained models.
 Find at least 3 models suitable for: {use_case}.
 Source them from HuggingFace or GitHub.
 Output as JSON list of dictionaries with "name", "platform", and "url".
 """
-        return self.safe_invoke(prompt)
 
-    def find_papers(self, use_case: str) -> List[Dict]:
-        """Find research papers related to the use case."""
-        prompt = f"""
+PAPERS_PROMPT = """
 You are an AI assistant tasked with finding research papers.
 Find at least 3 research papers relevant to: {use_case}.
 Output as JSON list of dictionaries with "title", "authors" (list), and "url".
 """
-        return self.safe_invoke(prompt)
+
+FIELD_PROMPTS = {
+    "implementation_plan": PLAN_PROMPT,
+    "datasets": DATASETS_PROMPT,
+    "models": MODELS_PROMPT,
+    "research_papers": PAPERS_PROMPT,
+}
+
+
+class ResourceAgent:
+    """
+    Collects implementation resources (RESOURCE_FIELDS) for AI use cases.
+    The a-prefixed methods (asafe_invoke, aprocess_resources,
+    aprocess_resources_many) do the same on an asyncio event loop.
+
+    LLM_TIERS declares the model tier of each call: the dataset, model and
+    paper lists are simple lookups for the fast tier, the implementation plan
+    and the batched call stay on the strong one.
+    """
+
+    LLM_TIERS = {
+        "implementation_plan": "strong",
+        "datasets": "fast",
+        "models": "fast",
+        "research_papers": "fast",
+        "batched": "strong",
+    }
+
+    def __init__(
+        self,
+        max_concurrency: int = 12,
+        call_timeout: Optional[float] = 120.0,
+        use_llm_cache: bool = True,
+        registry: Optional[ResourceRegistry] = None,
+        mode: str = "per_field",
+    ):
+        if mode not in RESOURCE_MODES:
+            raise ValueError(f"Unknown resource mode '{mode}', expected one of {RESOURCE_MODES}")
+        registry = registry or get_registry()
+        self.llms = {
+            call: registry.tier_model(tier, 0.3, use_cache=use_llm_cache) for call, tier in self.LLM_TIERS.items()
+        }
+        self.llm = self.llms["implementation_plan"]
+        # "per_field" sends four prompts per use case; "batched" asks for every
+        # use case's resources in one structured call and falls back to the
+        # per-field prompts for whatever that call leaves missing or malformed.
+        self.mode = mode
+        self.batched_llm = self.llms["batched"].with_structured_output(
+            RESOURCE_BUNDLES_SCHEMA, method="function_calling", include_raw=True
+        )
+        # max_concurrency=1 runs the LLM calls one after another, as before.
+        self.max_concurrency = max_concurrency
+        self.call_timeout = call_timeout
+        self.stats = {"parse_failures": 0, "batched_fallbacks": 0, "fields_refilled": 0, "llm_failures": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def safe_invoke(self, prompt: str, field: Optional[str] = None) -> List[Dict]:
+        """
+        Safely invoke LLM and parse JSON response. A malformed reply is
+        repaired, or re-asked once with a repair prompt, against the schema
+        of `field` (any JSON list if None); [] if that fails too.
+        """
+        llm = self.llms.get(field, self.llm)
+        try:
+            response = llm.invoke(prompt)
+        except Exception as e:
+            # Raised once the rate limiter's retries are used up (or its circuit is open)
+            print(f"Unexpected error during LLM invoke: {e}")
+            self._count("llm_failures")
+            return []
+        try:
+            return parse_reply(
+                response.content, self._schema(field), field or "resources",
+                lambda repair: llm.invoke(prompt + "\n\n" + repair).content,
+            )
+        except Exception as e:
+            return self._parse_failed(e)
+
+    async def asafe_invoke(self, prompt: str, field: Optional[str] = None) -> List[Dict]:
+        """safe_invoke() for coroutines."""
+        llm = self.llms.get(field, self.llm)
+        try:
+            response = await llm.ainvoke(prompt)
+        except Exception as e:
+            print(f"Unexpected error during LLM invoke: {e}")
+            self._count("llm_failures")
+            return []
+
+        async def reask(repair: str) -> str:
+            return (await llm.ainvoke(prompt + "\n\n" + repair)).content
+
+        try:
+            return await aparse_reply(response.content, self._schema(field), field or "resources", reask)
+        except Exception as e:
+            return self._parse_failed(e)
+
+    @staticmethod
+    def _schema(field: Optional[str]) -> Dict:
+        return FIELD_SCHEMAS.get(field, {"type": "array"})
+
+    def _parse_failed(self, error: Exception) -> List[Dict]:
+        if isinstance(error, JsonRecoveryError):
+            print(f"JSON decode error: {error}")
+        else:
+            print(f"Repair request failed: {error}")
+        self._count("parse_failures")
+        return []
+
+    def generate_plan(self, use_case: str, market_trend: str) -> List[Dict]:
+        """Generate a step-by-step implementation plan."""
+        return self.safe_invoke(PLAN_PROMPT.format(use_case=use_case, market_trend=market_trend), "implementation_plan")
+
+    def find_datasets(self, use_case: str) -> List[Dict]:
+        """Find datasets for the use case."""
+        return self.safe_invoke(DATASETS_PROMPT.format(use_case=use_case), "datasets")
+
+    def find_models(self, use_case: str) -> List[Dict]:
+        """Find pre-trained models for the use case."""
+        return self.safe_invoke(MODELS_PROMPT.format(use_case=use_case), "models")
+
+    def find_papers(self, use_case: str) -> List[Dict]:
+        """Find research papers related to the use case."""
+        return self.safe_invoke(PAPERS_PROMPT.format(use_case=use_case), "research_papers")
+
+    def _field_call(self, field: str, input_data: Dict) -> Callable[[], List[Dict]]:
+        """The per-field LLM call that produces one RESOURCE_FIELDS entry for a use case."""
+        use_case = input_data.get("use_case", "")
+        market_trend = input_data.get("market_trend", "")
+        if field == "implementation_plan":
+            return lambda: self.generate_plan(use_case, market_trend)
+        if field == "datasets":
+            return lambda: self.find_datasets(use_case)
+        if field == "models":
+            return lambda: self.find_models(use_case)
+        return lambda: self.find_papers(use_case)
+
+    async def _afield_call(self, field: str, input_data: Dict) -> List[Dict]:
+        """Async version of the per-field call for one RESOURCE_FIELDS entry."""
+        prompt = FIELD_PROMPTS[field].format(
+            use_case=input_data.get("use_case", ""), market_trend=input_data.get("market_trend", "")
+        )
+        return await self.asafe_invoke(prompt, field)
 
     def process_resources(self, input_data: Dict) -> Dict:
         """
@@ -79,18 +260,298 @@ Output as JSON list of dictionaries with "title", "authors" (list), and "url".
         - Research papers
         Returns a combined dictionary.
         """
-        use_case = input_data["use_case"]
-        market_trend = input_data["market_trend"]
+        return self.process_resources_many([input_data])[0]
 
-        plan = self.generate_plan(use_case, market_trend)
-        datasets = self.find_datasets(use_case)
-        models = self.find_models(use_case)
-        papers = self.find_papers(use_case)
+    async def aprocess_resources(self, input_data: Dict) -> Dict:
+        """process_resources() for coroutines."""
+        return (await self.aprocess_resources_many([input_data]))[0]
 
-        output = {
-            "implementation_plan": plan,
-            "datasets": datasets,
-            "models": models,
-            "research_papers": papers
-        }
-        return output
+    def process_resources_many(self, use_cases: List[Dict]) -> List[Dict]:
+        """
+        Run process_resources for several use cases, in the agent's mode.
+        Per-field mode fans every LLM call (4 per use case) out on one bounded pool.
+        Returns one combined dictionary per use case, in input order.
+        A "resources" event is emitted as soon as each use case's bundle is complete.
+        """
+        bundles = [{} for _ in use_cases]
+        if self.mode == "batched" and use_cases:
+            self._fill_batched(use_cases, bundles)
+            for case, bundle in enumerate(bundles):
+                if len(bundle) == len(RESOURCE_FIELDS):
+                    emit("resources", self._ordered_bundle(bundle), index=case)
+
+        self._fill_per_field(use_cases, bundles, self._missing_fields(bundles))
+        return [self._ordered_bundle(bundle) for bundle in bundles]
+
+    async def aprocess_resources_many(self, use_cases: List[Dict]) -> List[Dict]:
+        """
+        process_resources_many() for coroutines: at most max_concurrency LLM
+        calls are awaited at once, each cancelled after call_timeout seconds.
+        """
+        bundles = [{} for _ in use_cases]
+        if self.mode == "batched" and use_cases:
+            await self._afill_batched(use_cases, bundles)
+            for case, bundle in enumerate(bundles):
+                if len(bundle) == len(RESOURCE_FIELDS):
+                    emit("resources", self._ordered_bundle(bundle), index=case)
+
+        await self._afill_per_field(use_cases, bundles, self._missing_fields(bundles))
+        return [self._ordered_bundle(bundle) for bundle in bundles]
+
+    def pipeline(self, limit: int = 3) -> "ResourcePipeline":
+        """A ResourcePipeline for collecting resources while use cases are still being generated."""
+        return ResourcePipeline(self, limit)
+
+    def _missing_fields(self, bundles: List[Dict]) -> List[Tuple[int, str]]:
+        """(use case index, field) pairs still to be filled by per-field calls."""
+        missing = [
+            (case, field)
+            for case in range(len(bundles))
+            for field in RESOURCE_FIELDS
+            if field not in bundles[case]
+        ]
+        if self.mode == "batched" and missing:
+            self._count("fields_refilled", len(missing))
+        return missing
+
+    def _fill_per_field(
+        self,
+        use_cases: List[Dict],
+        bundles: List[Dict],
+        pairs: List[Tuple[int, str]],
+        cancelled: Optional[threading.Event] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Run one per-field call for each (use case index, field) pair,
+        concurrently (on `executor` if given). Calls not started by the time
+        `cancelled` is set are skipped.
+        """
+        def collect(index: int, result):
+            case, field = pairs[index]
+            bundles[case][field] = result
+            if len(bundles[case]) == len(RESOURCE_FIELDS):
+                emit("resources", self._ordered_bundle(bundles[case]), index=case)
+
+        def unless_cancelled(call: Callable[[], List[Dict]]) -> Callable[[], List[Dict]]:
+            return lambda: [] if cancelled is not None and cancelled.is_set() else call()
+
+        run_concurrently(
+            [unless_cancelled(self._field_call(field, use_cases[case])) for case, field in pairs],
+            max_workers=self.max_concurrency,
+            timeout=self.call_timeout,
+            default_factory=list,
+            on_result=collect,
+            executor=executor,
+        )
+
+    async def _afill_per_field(
+        self,
+        use_cases: List[Dict],
+        bundles: List[Dict],
+        pairs: List[Tuple[int, str]],
+        slots: Optional[asyncio.Semaphore] = None,
+    ):
+        """_fill_per_field() for coroutines; `slots` caps concurrent calls (default: max_concurrency)."""
+        slots = slots or asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def fill(case: int, field: str):
+            async with slots:
+                try:
+                    result = await asyncio.wait_for(self._afield_call(field, use_cases[case]), self.call_timeout)
+                except asyncio.TimeoutError:
+                    print(f"Resource call for '{field}' timed out after {self.call_timeout}s")
+                    result = []
+                except Exception as e:
+                    print(f"Resource call for '{field}' failed: {e}")
+                    result = []
+            bundles[case][field] = result
+            if len(bundles[case]) == len(RESOURCE_FIELDS):
+                emit("resources", self._ordered_bundle(bundles[case]), index=case)
+
+        await asyncio.gather(*(fill(case, field) for case, field in pairs))
+
+    def _fill_batched(self, use_cases: List[Dict], bundles: List[Dict]):
+        """
+        Ask for all four resource lists of every use case in one structured call
+        and store each well-formed list into bundles. Anything missing is left
+        for the per-field fallback.
+        """
+        prompt = self._batched_prompt(use_cases)
+        result = run_concurrently([lambda: self.batched_llm.invoke(prompt)], timeout=self._batched_timeout())[0]
+        self._store_batched(result, use_cases, bundles)
+
+    async def _afill_batched(self, use_cases: List[Dict], bundles: List[Dict]):
+        """_fill_batched() for coroutines."""
+        prompt = self._batched_prompt(use_cases)
+        try:
+            result = await asyncio.wait_for(self.batched_llm.ainvoke(prompt), self._batched_timeout())
+        except Exception as e:
+            print(f"Batched resource call failed: {e}")
+            result = None
+        self._store_batched(result, use_cases, bundles)
+
+    def _batched_timeout(self) -> Optional[float]:
+        # One call produces roughly four calls' worth of output, so allow it
+        # proportionally longer before giving up on it.
+        return self.call_timeout * len(RESOURCE_FIELDS) if self.call_timeout else None
+
+    @staticmethod
+    def _batched_prompt(use_cases: List[Dict]) -> str:
+        listing = "\n".join(
+            f"{i}. Use Case: {item.get('use_case', '')}\n   Market Trend: {item.get('market_trend', '')}"
+            for i, item in enumerate(use_cases)
+        )
+        return f"""
+You are an AI assistant tasked with gathering implementation resources for AI use cases.
+For EACH numbered use case below, return a bundle with its "index" and:
+- "implementation_plan": the key implementation steps in clear order, each with "step" (number) and "description" (brief action), given the use case and market trend.
+- "datasets": at least 3 related datasets from Kaggle, HuggingFace, or GitHub, each with "name", "platform", and "url".
+- "models": at least 3 suitable pre-trained models from HuggingFace or GitHub, each with "name", "platform", and "url".
+- "research_papers": at least 3 relevant research papers, each with "title", "authors" (list), and "url".
+
+{listing}
+"""
+
+    def _store_batched(self, result: Optional[Dict], use_cases: List[Dict], bundles: List[Dict]):
+        """Copy each well-formed list from a batched call's result into bundles."""
+        parsed = result.get("parsed") if result else None
+        if not isinstance(parsed, dict):
+            error = result.get("parsing_error") if result else "call failed or timed out"
+            print(f"Batched resource call unusable, falling back to per-field calls: {error}")
+            self._count("batched_fallbacks")
+            self._count("parse_failures")
+            return
+
+        for item in parsed.get("bundles") or []:
+            if not isinstance(item, dict):
+                continue
+            case = item.get("index")
+            if not isinstance(case, int) or not 0 <= case < len(use_cases):
+                continue
+            for field in RESOURCE_FIELDS:
+                value = item.get(field)
+                if not isinstance(value, list):
+                    continue
+                # Keep the well-formed entries; an empty list is left for the per-field fallback
+                value = [entry for entry in value if not validate(entry, FIELD_SCHEMAS[field]["items"])]
+                if value:
+                    bundles[case][field] = value
+
+    @staticmethod
+    def _ordered_bundle(bundle: Dict) -> Dict:
+        return {field: bundle.get(field, []) for field in RESOURCE_FIELDS}
+
+
+class ResourcePipeline:
+    """
+    Collects resources for use cases as they arrive rather than once the
+    whole list is known: add() starts a use case's per-field calls right away
+    (in a background thread; aadd() starts them as a task on the running
+    event loop) and finish() waits for them. Only the first `limit` use cases
+    get resources.
+
+    In batched mode nothing starts early; finish() makes the usual batched
+    call for the first `limit` use cases.
+
+    If the use cases never arrive in full (their stage failed), cancel() or
+    acancel() stops the calls already started instead of finish().
+
+    All use cases' calls share one pool of the agent's max_concurrency
+    threads (or slots, on an event loop), so the cap holds however many
+    use cases are in flight.
+    """
+
+    def __init__(self, agent: ResourceAgent, limit: int = 3):
+        self.agent = agent
+        self.limit = limit
+        self.use_cases: List[Dict] = []
+        self.bundles: List[Dict] = []
+        self._workers: List[threading.Thread] = []
+        self._tasks: List[asyncio.Task] = []
+        self._cancelled = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, agent.max_concurrency))
+        self._slots = asyncio.Semaphore(max(1, agent.max_concurrency))
+
+    def _claim(self, use_case: Dict) -> Optional[List[Tuple[int, str]]]:
+        """The (use case index, field) pairs to start for use_case, or None if it isn't started early."""
+        if self.agent.mode != "per_field" or len(self.use_cases) >= self.limit or self._cancelled.is_set():
+            return None
+        self.use_cases.append(use_case)
+        self.bundles.append({})
+        case = len(self.use_cases) - 1
+        return [(case, field) for field in RESOURCE_FIELDS]
+
+    def add(self, use_case: Dict):
+        pairs = self._claim(use_case)
+        if pairs is None:
+            return
+        worker = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._fill, pairs), daemon=True
+        )
+        worker.start()
+        self._workers.append(worker)
+
+    def aadd(self, use_case: Dict):
+        """add() for code running on an event loop."""
+        pairs = self._claim(use_case)
+        if pairs is None:
+            return
+        self._tasks.append(asyncio.ensure_future(self._afill(pairs)))
+
+    def _fill(self, pairs: List[Tuple[int, str]]):
+        # Runs while the use_cases stage is still open; tag its events as resources
+        with stage_events("resources"):
+            try:
+                self.agent._fill_per_field(self.use_cases, self.bundles, pairs, self._cancelled, self._executor)
+            except Exception as e:
+                # Nothing would report an error from this thread; its fields stay empty
+                print(f"Resource collection for use case {pairs[0][0] + 1} failed: {e}")
+
+    async def _afill(self, pairs: List[Tuple[int, str]]):
+        with stage_events("resources"):
+            try:
+                await self.agent._afill_per_field(self.use_cases, self.bundles, pairs, self._slots)
+            except Exception as e:
+                print(f"Resource collection for use case {pairs[0][0] + 1} failed: {e}")
+
+    def finish(self, use_cases: List[Dict]) -> List[Dict]:
+        """
+        Start any of use_cases[:limit] not added yet (e.g. a cached reply that
+        never streamed), wait for all of them and return their bundles in order.
+        """
+        if self.agent.mode != "per_field":
+            return self.agent.process_resources_many(use_cases[:self.limit])
+        for use_case in use_cases[len(self.use_cases):self.limit]:
+            self.add(use_case)
+        for worker in self._workers:
+            worker.join()
+        # Calls that timed out finish in the background
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return [self.agent._ordered_bundle(bundle) for bundle in self.bundles]
+
+    async def afinish(self, use_cases: List[Dict]) -> List[Dict]:
+        """finish() for coroutines."""
+        if self.agent.mode != "per_field":
+            return await self.agent.aprocess_resources_many(use_cases[:self.limit])
+        for use_case in use_cases[len(self.use_cases):self.limit]:
+            self.aadd(use_case)
+        await asyncio.gather(*self._tasks)
+        return [self.agent._ordered_bundle(bundle) for bundle in self.bundles]
+
+    def cancel(self):
+        """
+        Start nothing more and wait for the calls already running (a thread
+        can't be interrupted mid-call), so none outlive the failed workflow.
+        """
+        self._cancelled.set()
+        for worker in self._workers:
+            worker.join()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def acancel(self):
+        """cancel() for coroutines: the running calls are cancelled rather than waited for."""
+        self._cancelled.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
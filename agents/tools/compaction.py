@@ -0,0 +1,159 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from agents.tools.tokens import count_tokens, truncate_to_tokens
+
+# Site chrome that survives HTML extraction: legal footers, cookie banners, sign-up prompts.
+# Only matched against short paragraphs: prose may well mention cookies or logins.
+BOILERPLATE_PATTERN = re.compile(
+    r"all rights reserved|©|\bcookies?\b|privacy (policy|notice)|terms (of|and) (use|service|conditions)"
+    r"|subscribe to|sign up|log ?in\b|enable javascript|skip to (main )?content",
+    re.IGNORECASE,
+)
+
+# Words that mark paragraphs describing what a company does and where it stands
+RELEVANCE_KEYWORDS = (
+    "founded", "headquarter", "industry", "product", "service", "platform", "customer",
+    "market", "revenue", "strategy", "focus", "competitor", "leader", "acquisition",
+    "partner", "technology", "solution", "mission", "offering", "subsidiar", "employees",
+)
+
+# Paragraphs shorter than this rarely say anything (menu items, captions)
+MIN_PARAGRAPH_CHARS = 25
+# Paragraphs longer than this are never dropped for matching BOILERPLATE_PATTERN
+BOILERPLATE_MAX_CHARS = 120
+# A paragraph repeated on this many pages of one section (site) is page chrome, not content
+BOILERPLATE_MIN_PAGES = 3
+_PAGE_HEADER = re.compile(r"^Content from (\S+):$")
+
+
+@dataclass
+class _Paragraph:
+    section: int
+    page: str
+    position: int
+    text: str
+    key: str
+    tokens: int = 0
+    score: float = 0.0
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def _split(sections: Sequence[Tuple[str, str]]) -> List[_Paragraph]:
+    """Paragraphs (non-empty lines) of each section, tagged with the page they came from."""
+    paragraphs = []
+    for index, (label, text) in enumerate(sections):
+        page = label
+        position = 0
+        for line in (text or "").splitlines():
+            line = line.strip()
+            header = _PAGE_HEADER.match(line)
+            if header:
+                page, position = header.group(1), 0
+                continue
+            if line:
+                paragraphs.append(_Paragraph(index, page, position, line, _normalize(line)))
+                position += 1
+    return paragraphs
+
+
+def _score(paragraph: _Paragraph, company_terms: List[str]) -> float:
+    lower = paragraph.text.lower()
+    mentions = sum(lower.count(term) for term in company_terms)
+    keywords = sum(1 for keyword in RELEVANCE_KEYWORDS if keyword in lower)
+    # Pages and articles lead with their most general, most useful statements
+    return 3 * min(mentions, 3) + min(keywords, 5) + 2 / (1 + paragraph.position)
+
+
+def _join(sections: Sequence[Tuple[str, str]], paragraphs: List[_Paragraph], header: str) -> str:
+    """The paragraphs under their section labels, in the given order."""
+    parts = []
+    for index, (label, _) in enumerate(sections):
+        texts = [paragraph.text for paragraph in paragraphs if paragraph.section == index]
+        if texts:
+            parts.append(f"{label}:\n" + "\n".join(texts) if label else "\n".join(texts))
+    return header + "\n\n".join(parts) if parts else ""
+
+
+def compact_sections(
+    sections: Sequence[Tuple[str, str]],
+    company: str = "",
+    max_tokens: int = 1500,
+    model: str = "gpt-4",
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Shrink scraped text to fit a prompt: drop duplicate paragraphs (within and
+    across sections), boilerplate repeated across a section's pages or short
+    lines matching BOILERPLATE_PATTERN and fragments too short to matter, then
+    keep the paragraphs most relevant to `company` that fit in `max_tokens`
+    (tiktoken), in their original order. Text that already fits is returned
+    whole.
+
+    `sections` are (label, text) pairs such as ("Website Info", crawl text);
+    "Content from <url>:" lines in a text start a new page. Returns the
+    compacted text and counts of what was kept and removed.
+    """
+    paragraphs = _split(sections)
+    raw_tokens = sum(count_tokens(text, model) for _, text in sections if text)
+    stats = {"raw_tokens": raw_tokens, "paragraphs": len(paragraphs), "duplicates": 0, "boilerplate": 0}
+    header = f"Company: {company}\n\n" if company else ""
+
+    if raw_tokens <= max_tokens:
+        text = _join(sections, paragraphs, header)
+        if count_tokens(text, model) <= max_tokens:
+            stats["kept"] = len(paragraphs)
+            stats["tokens"] = count_tokens(text, model)
+            return text, stats
+
+    pages_per_key = defaultdict(set)
+    for paragraph in paragraphs:
+        pages_per_key[paragraph.section, paragraph.key].add(paragraph.page)
+
+    seen = set()
+    candidates = []
+    for paragraph in paragraphs:
+        if (
+            len(paragraph.text) < MIN_PARAGRAPH_CHARS
+            or len(pages_per_key[paragraph.section, paragraph.key]) >= BOILERPLATE_MIN_PAGES
+            or (len(paragraph.text) <= BOILERPLATE_MAX_CHARS and BOILERPLATE_PATTERN.search(paragraph.text))
+        ):
+            stats["boilerplate"] += 1
+            continue
+        if paragraph.key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(paragraph.key)
+        candidates.append(paragraph)
+
+    budget = max_tokens - count_tokens(header, model)
+    for label, _ in sections:
+        budget -= count_tokens(f"{label}:\n\n", model)
+
+    company_terms = [term for term in _normalize(company).split() if len(term) > 2]
+    for paragraph in candidates:
+        paragraph.tokens = count_tokens(paragraph.text, model) + 1  # + newline
+        paragraph.score = _score(paragraph, company_terms)
+
+    # Greedy by relevance; smaller paragraphs can still fill gaps a larger one left
+    selected = []
+    for paragraph in sorted(candidates, key=lambda p: -p.score):
+        if paragraph.tokens <= budget:
+            selected.append(paragraph)
+            budget -= paragraph.tokens
+    if not selected and candidates and budget > 0:
+        best = max(candidates, key=lambda p: p.score)
+        best.text = truncate_to_tokens(best.text, budget, model)
+        selected.append(best)
+    order = {id(paragraph): index for index, paragraph in enumerate(paragraphs)}
+    selected.sort(key=lambda p: order[id(p)])
+
+    text = _join(sections, selected, header)
+    stats["kept"] = len(selected)
+    stats["tokens"] = count_tokens(text, model)
+    return text, stats
+
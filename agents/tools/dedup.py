@@ -0,0 +1,80 @@
+import random
+import re
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash(value: str) -> int:
+    # str hashes are salted per process, which is fine for an in-memory index
+    return hash(value) & _MASK64
+
+
+class NearDuplicateIndex:
+    """
+    Remembers paragraphs and recognizes repeats: exact copies (after
+    normalizing case, punctuation and whitespace) by hash, and near copies
+    (a changed date, a product name swapped into a tagline) by MinHash over
+    word shingles with LSH banding, so each lookup only compares against the
+    few paragraphs that share a band.
+
+    `threshold` is the estimated Jaccard similarity of the shingle sets above
+    which a paragraph counts as a repeat. Paragraphs with fewer words than
+    `shingle_size` are only matched exactly.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 32, bands: int = 8, shingle_size: int = 3):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Each "permutation" XORs the 64-bit shingle hashes with a random mask,
+        # which keeps the min-per-mask loop in C
+        rng = random.Random(1)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+        self._exact: Set[int] = set()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self._signatures: List[Tuple[int, ...]] = []
+        self.exact_hits = 0
+        self.near_hits = 0
+
+    def _signature(self, words: List[str]) -> Tuple[int, ...]:
+        size = self.shingle_size
+        shingles = {_hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+        return tuple(min(map(mask.__xor__, shingles)) for mask in self._masks)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def seen(self, text: str) -> bool:
+        """True if text repeats a paragraph added before; otherwise add it and return False."""
+        words = _WORD.findall(text.lower())
+        key = _hash(" ".join(words))
+        if key in self._exact:
+            self.exact_hits += 1
+            return True
+        self._exact.add(key)
+        if len(words) < self.shingle_size:
+            return False
+
+        signature = self._signature(words)
+        candidates = {index for band in self._bands(signature) for index in self._buckets.get(band, ())}
+        for index in candidates:
+            other = self._signatures[index]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+            if similarity >= self.threshold:
+                self.near_hits += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band in self._bands(signature):
+            self._buckets[band].append(index)
+        return False
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from agents.tools.tracing import span
+
+
+@dataclass
+class WorkflowEvent:
+    """
+    One incremental result from MasterAgent.stream_workflow.
+
+    kind is one of: "research" (raw research text), "analysis" (dict),
+    "use_case" (dict, meta["index"]), "resources" (bundle dict, meta["index"]),
+    "token" (str, meta["stage"]), "trace" (the run's Tracer),
+    "report" (where a stored report came from: "fresh", "stale", "coalesced"
+    or "built", meta["age_s"]), "done" ((analysis, use_cases, resources)).
+    """
+    kind: str
+    data: Any = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+_sink: ContextVar[Optional[Callable[[WorkflowEvent], None]]] = ContextVar("event_sink", default=None)
+_stage: ContextVar[Optional[str]] = ContextVar("event_stage", default=None)
+
+
+class TokenEventHandler(BaseCallbackHandler):
+    """Forwards every streamed LLM token to the active event sink."""
+
+    # Called on the event loop for async runs (instead of an executor thread),
+    # which keeps tokens in order
+    run_inline = True
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            emit("token", token)
+
+
+# LangChain attaches the handler held in this variable to every model run made
+# in the same context, so agents don't have to thread callbacks through.
+_token_handler: ContextVar[Optional[TokenEventHandler]] = ContextVar("token_event_handler", default=None)
+register_configure_hook(_token_handler, inheritable=True)
+
+
+def emit(kind: str, data: Any = None, **meta):
+    """Send an event to the active sink, if any; a no-op outside event_sink()."""
+    sink = _sink.get()
+    if sink is None:
+        return
+    stage = _stage.get()
+    if stage is not None:
+        meta.setdefault("stage", stage)
+    sink(WorkflowEvent(kind, data, meta))
+
+
+@contextmanager
+def event_sink(callback: Callable[[WorkflowEvent], None]):
+    """Route events emitted in this context (and threads copied from it) to callback."""
+    sink_token = _sink.set(callback)
+    handler_token = _token_handler.set(TokenEventHandler())
+    try:
+        yield
+    finally:
+        _token_handler.reset(handler_token)
+        _sink.reset(sink_token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Tag events (including streamed tokens) emitted inside the block with a
+    stage name, and time the block as a "stage" span when tracing.
+    """
+    with stage_events(name), span(name, "stage"):
+        yield
+
+
+@contextmanager
+def stage_events(name: str):
+    """
+    Only the tagging half of stage(), for work of one stage started early
+    inside another (resource calls started while use cases still stream).
+    """
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
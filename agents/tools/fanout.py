@@ -0,0 +1,78 @@
+import contextvars
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def run_concurrently(
+    calls: Sequence[Callable[[], Any]],
+    max_workers: int = 4,
+    timeout: Optional[float] = None,
+    default_factory: Callable[[], Any] = lambda: None,
+    on_result: Optional[Callable[[int, Any], None]] = None,
+    executor: Optional[Executor] = None,
+) -> List[Any]:
+    """
+    Run zero-argument callables on a bounded thread pool.
+
+    Results come back in the same order as `calls`, whatever order they finish in.
+    A call that raises, or is still running `timeout` seconds after it started,
+    gets `default_factory()` in its slot so one bad call never sinks the batch.
+    `on_result(index, result)` is called from the calling thread as each slot is filled.
+    With `executor`, the calls share that pool (left running afterwards) with
+    other callers instead of getting max_workers threads of their own.
+    """
+    if not calls:
+        return []
+
+    results: List[Any] = [None] * len(calls)
+    started: Dict[int, float] = {}
+
+    def make_task(index: int, call: Callable[[], Any]) -> Callable[[], Any]:
+        def task():
+            started[index] = time.monotonic()
+            return call()
+        return task
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    try:
+        # Each task runs in its own copy of the caller's context so context-local
+        # state (callbacks, event sinks) follows the call into the worker thread.
+        futures = {
+            executor.submit(contextvars.copy_context().run, make_task(i, call)): i
+            for i, call in enumerate(calls)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1 if timeout else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"Concurrent call {index} failed: {e}")
+                    results[index] = default_factory()
+                if on_result:
+                    on_result(index, results[index])
+
+            if timeout is None:
+                continue
+            now = time.monotonic()
+            for future in list(pending):
+                index = futures[future]
+                start = started.get(index)
+                if start is not None and now - start > timeout:
+                    print(f"Concurrent call {index} timed out after {timeout}s")
+                    future.cancel()
+                    pending.discard(future)
+                    results[index] = default_factory()
+                    if on_result:
+                        on_result(index, results[index])
+    finally:
+        # Don't block on calls we already gave up on; they finish in the background.
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
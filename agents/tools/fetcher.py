@@ -0,0 +1,395 @@
+import asyncio
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+
+from agents.tools.page_cache import normalize_url
+from agents.tools.rate_limit import FATAL, RETRY, THROTTLE, rate_limits, retry_after
+from agents.tools.scrape_cache import ScrapeCache, max_age, storable
+from agents.tools.singleflight import AsyncSingleFlight, SingleFlight
+from agents.tools.tracing import current_span, span
+
+
+class RateLimiter:
+    """
+    Global request-start limiter: spaces requests at least 1/rate seconds apart
+    across all threads. A rate of None or 0 disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _reserve(self) -> float:
+        """Claim the next start slot and return how long to wait for it."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self):
+        """acquire() for coroutines: waits without blocking the event loop."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+class SkippedContent(requests.RequestException):
+    """The response was not downloaded because it isn't HTML or is too large."""
+
+
+def http_error_kind(error: BaseException):
+    """
+    How the rate limiter treats a failed fetch (requests or httpx): 429 and
+    503 are throttling, other 5xx and connection errors are retried, the rest
+    (404, SkippedContent, ...) are final.
+    """
+    if isinstance(error, SkippedContent):
+        return FATAL, None
+    response = getattr(error, "response", None)
+    if response is not None:
+        status = response.status_code
+        if status in (429, 503):
+            return THROTTLE, retry_after(response.headers)
+        return (RETRY if status >= 500 else FATAL), None
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return RETRY, None
+    return FATAL, None
+
+
+def check_headers(url: str, headers, max_bytes: int):
+    """Raise SkippedContent unless the headers announce an HTML body of at most max_bytes."""
+    content_type = headers.get("Content-Type", "")
+    if "html" not in content_type:
+        raise SkippedContent(f"Skipping non-HTML content at '{url}' (Content-Type: {content_type})")
+    length = headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise SkippedContent(f"Skipping oversized page at '{url}' ({length} bytes)")
+
+
+def sniff_encoding(response, body: bytes) -> str:
+    """
+    Pick the body's encoding from the Content-Type charset, then a <meta> charset
+    near the top of the document, else UTF-8. Avoids requests' apparent_encoding,
+    which runs character detection over the whole body.
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if "charset" in content_type.lower():
+        encoding = get_encoding_from_headers(response.headers)
+        if encoding:
+            return encoding
+    match = META_CHARSET.search(body[:2048])
+    if match:
+        return match.group(1).decode("ascii")
+    return "utf-8"
+
+
+class PageFetcher:
+    """
+    Shared HTTP layer for the scraper: one requests.Session with a pooled,
+    keep-alive connection adapter, caps on concurrent requests overall
+    (max_connections) and per host, and a global rate limit. Safe to call from many threads at once; concurrent
+    requests for the same URL share a single download. Each host also gets a
+    rate_limit.ProviderLimiter: 429/503 responses and connection errors are
+    retried with backoff, and a host that keeps failing is skipped for a while.
+
+    Bodies are streamed: headers are checked first, so non-HTML responses and
+    ones whose Content-Length exceeds max_bytes are dropped before any body is
+    read, and bodies without a length are cut off at max_bytes.
+
+    With a ScrapeCache, fresh HTML pages are served from disk, stale ones are
+    revalidated with a conditional GET, and in offline mode only the cache is used.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        max_connections: int = 16,
+        per_host_limit: int = 4,
+        requests_per_second: Optional[float] = 10.0,
+        cache: Optional[ScrapeCache] = None,
+        max_bytes: int = 2 * 1024 * 1024,
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self._inflight = SingleFlight()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._host_lock = threading.Lock()
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            return self._host_slots[host]
+
+    def get(self, url: str) -> requests.Response:
+        """
+        GET an HTML page through the shared session, waiting for a free per-host
+        slot and the global rate limiter first. Raises requests.RequestException
+        on network errors and bad status codes once retries are used up,
+        SkippedContent for non-HTML or oversized responses, and
+        rate_limit.CircuitOpenError while the host's circuit is open.
+        """
+        # _get records the cache status; callers that joined another
+        # thread's download keep "coalesced"
+        with span("fetch", "fetch", url=url, cache="coalesced"):
+            return self._inflight.do(normalize_url(url), lambda: self._get(url))
+
+    def _get(self, url: str) -> requests.Response:
+        key = "page:" + normalize_url(url)
+        entry = self.cache.get(key) if self.cache else None
+        if entry and (entry.fresh or self.cache.offline):
+            current_span().set(cache="hit" if entry.fresh else "offline")
+            return self._cached_response(entry, url)
+        if self.cache and self.cache.offline:
+            raise requests.ConnectionError(f"Offline mode: '{url}' is not in the scrape cache")
+
+        # Revalidate a stale entry instead of downloading it again
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        # Throttling, transient errors and a failing host are handled per host
+        limiter = rate_limits.get("http", urlparse(url).netloc.lower())
+        return limiter.call(lambda: self._download(url, key, entry, headers), http_error_kind)
+
+    def _download(self, url: str, key: str, entry, headers: Dict[str, str]) -> requests.Response:
+        with self._slots, self._host_slot(url):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                ttl = max_age(response)
+                if ttl is None and self.cache:
+                    ttl = self.cache.page_ttl
+                if entry and response.status_code == 304:
+                    self.cache.touch(key, ttl)
+                    current_span().set(cache="revalidated", status=304)
+                    return self._cached_response(entry, url)
+                response.raise_for_status()
+                self._read_body(url, response)
+            finally:
+                response.close()
+
+        content_type = response.headers.get("Content-Type", "")
+        # A ttl of 0 stores the page as already stale, keeping its validators
+        # so the next fetch can revalidate it instead of downloading it again
+        if self.cache and storable(response):
+            self.cache.put(
+                key,
+                response.content,
+                ttl,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                content_type=content_type,
+            )
+        return response
+
+    @staticmethod
+    def _cached_response(entry, url: str) -> requests.Response:
+        response = entry.to_response(url)
+        response.encoding = sniff_encoding(response, response.content)
+        return response
+
+    def _read_body(self, url: str, response: requests.Response):
+        """Check headers, then read at most max_bytes of the body into the response."""
+        check_headers(url, response.headers, self.max_bytes)
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                print(f"Truncating '{url}' at {self.max_bytes} bytes")
+                break
+        body = b"".join(chunks)[:self.max_bytes]
+        current_span().set(cache="miss", status=response.status_code, bytes=len(body))
+        response._content = body
+        response.encoding = sniff_encoding(response, body)
+
+    def close(self):
+        self.session.close()
+
+
+# Headers describing the raw transfer; they no longer apply once the body is read
+_TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class AsyncPageFetcher:
+    """
+    asyncio counterpart of PageFetcher built on httpx.AsyncClient: the same
+    connection, per-host and rate limits, streamed size-capped downloads and
+    ScrapeCache handling, but waits never block the event loop. get() returns
+    an httpx.Response and raises httpx.HTTPError or SkippedContent.
+
+    An httpx client belongs to the event loop it was first used on, so create
+    one AsyncPageFetcher per loop.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        max_connections: int = 16,
+        per_host_limit: int = 4,
+        requests_per_second: Optional[float] = 10.0,
+        cache: Optional[ScrapeCache] = None,
+        max_bytes: int = 2 * 1024 * 1024,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        # Pass a PageFetcher's limiter to share one request budget between the two
+        self.rate_limiter = rate_limiter or RateLimiter(requests_per_second)
+
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._slots = asyncio.Semaphore(max_connections)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._inflight = AsyncSingleFlight()
+
+    @classmethod
+    def like(cls, fetcher: PageFetcher) -> "AsyncPageFetcher":
+        """An async fetcher with the same settings, cache and rate limiter as `fetcher`."""
+        return cls(
+            headers=dict(fetcher.session.headers),
+            timeout=fetcher.timeout,
+            max_connections=fetcher.max_connections,
+            per_host_limit=fetcher.per_host_limit,
+            cache=fetcher.cache,
+            max_bytes=fetcher.max_bytes,
+            rate_limiter=fetcher.rate_limiter,
+        )
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_slots[host]
+
+    async def get(self, url: str) -> httpx.Response:
+        """
+        GET an HTML page; concurrent requests for the same URL share a single
+        download. See PageFetcher.get.
+        """
+        with span("fetch", "fetch", url=url, cache="coalesced"):
+            return await self._inflight.do(normalize_url(url), lambda: self._get(url))
+
+    async def _get(self, url: str) -> httpx.Response:
+        key = "page:" + normalize_url(url)
+        # SQLite lookups are quick, but still kept off the event loop
+        entry = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if entry and (entry.fresh or self.cache.offline):
+            current_span().set(cache="hit" if entry.fresh else "offline")
+            return self._cached_response(entry, url)
+        if self.cache and self.cache.offline:
+            raise httpx.ConnectError(f"Offline mode: '{url}' is not in the scrape cache")
+
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        limiter = rate_limits.get("http", urlparse(url).netloc.lower())
+        return await limiter.acall(lambda: self._download(url, key, entry, headers), http_error_kind)
+
+    async def _download(self, url: str, key: str, entry, headers: Dict[str, str]) -> httpx.Response:
+        async with self._slots, self._host_slot(url):
+            await self.rate_limiter.aacquire()
+            async with self.client.stream("GET", url, headers=headers) as streamed:
+                ttl = max_age(streamed)
+                if ttl is None and self.cache:
+                    ttl = self.cache.page_ttl
+                if entry and streamed.status_code == 304:
+                    await asyncio.to_thread(self.cache.touch, key, ttl)
+                    current_span().set(cache="revalidated", status=304)
+                    return self._cached_response(entry, url)
+                streamed.raise_for_status()
+                check_headers(url, streamed.headers, self.max_bytes)
+                body = await self._read_body(url, streamed)
+
+        response = httpx.Response(
+            streamed.status_code,
+            headers=[(k, v) for k, v in streamed.headers.items() if k.lower() not in _TRANSFER_HEADERS],
+            content=body,
+            request=streamed.request,
+        )
+        response.encoding = sniff_encoding(response, body)
+
+        if self.cache and storable(response):
+            await asyncio.to_thread(
+                self.cache.put,
+                key,
+                body,
+                ttl,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                content_type=response.headers.get("Content-Type", ""),
+            )
+        return response
+
+    async def _read_body(self, url: str, response: httpx.Response) -> bytes:
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                print(f"Truncating '{url}' at {self.max_bytes} bytes")
+                break
+        body = b"".join(chunks)[:self.max_bytes]
+        current_span().set(cache="miss", status=response.status_code, bytes=len(body))
+        return body
+
+    @staticmethod
+    def _cached_response(entry, url: str) -> httpx.Response:
+        headers = {"Content-Type": entry.content_type} if entry.content_type else {}
+        response = httpx.Response(200, headers=headers, content=entry.value, request=httpx.Request("GET", url))
+        response.encoding = sniff_encoding(response, entry.value)
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
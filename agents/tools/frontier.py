@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import re
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from agents.tools.page_cache import normalize_url
+
+# Links never worth fetching: files, and account/legal/recruiting pages
+SKIP_PATTERN = re.compile(
+    r"\.pdf|\.jpe?g|\.png|\.gif|login|signup|register|job|career|privacy|terms|subscribe|contact"
+)
+# A link's relevance is how many of these its URL or anchor text mention
+INCLUDE_KEYWORDS = (
+    "about", "team", "history", "company", "leadership",
+    "product", "service", "news", "press", "blog",
+)
+_INCLUDE_PATTERN = re.compile("|".join(INCLUDE_KEYWORDS))
+_NOT_PAGES = ("#", "mailto:", "javascript:", "tel:")
+
+CRAWL_ORDERS = ("level", "bfs", "best_first")
+
+
+def link_score(target: str, anchor_text: str) -> int:
+    """Number of distinct INCLUDE_KEYWORDS in a (lower-cased) URL path or anchor text."""
+    return len(set(_INCLUDE_PATTERN.findall(target)).union(_INCLUDE_PATTERN.findall(anchor_text)))
+
+
+def internal_links(
+    links: Iterable[Tuple[str, str]], page_url: str, base_domain: str
+) -> List[Tuple[str, str, int]]:
+    """
+    (url, normalized url, relevance score) for the relevant same-domain links
+    among a page's (href, anchor text) pairs, in document order. Each href is
+    resolved against the page it appears on; repeated hrefs are looked at once.
+    Keywords are matched against the link's path and query only, so a domain
+    that happens to contain one ("contact-lenses.com") doesn't decide anything.
+    """
+    result = []
+    examined = set()
+    for href, anchor_text in links:
+        href = href.strip()
+        if not href or href in examined or href.lower().startswith(_NOT_PAGES):
+            continue
+        examined.add(href)
+
+        url = urljoin(page_url, href)
+        parsed = urlparse(url)
+        if parsed.netloc != base_domain:
+            continue
+        target = f"{parsed.path}?{parsed.query}".lower() if parsed.query else parsed.path.lower()
+        if SKIP_PATTERN.search(target):
+            continue
+        score = link_score(target, anchor_text.lower())
+        if score:
+            result.append((url, normalize_url(url), score))
+    return result
+
+
+class CrawlFrontier:
+    """
+    URLs waiting to be crawled, each queued at most once (by normalized URL,
+    so fragment, trailing-slash and parameter-order variants count as one).
+
+    order="level": level by level, the most relevant links of a level first.
+    order="bfs": level by level in discovery order (a plain deque).
+    order="best_first": the most relevant link anywhere in the frontier first,
+    shallower ones on ties; with a text budget this spends it on the best pages.
+    """
+
+    def __init__(self, order: str = "level"):
+        if order not in CRAWL_ORDERS:
+            raise ValueError(f"Unknown crawl order '{order}', expected one of {CRAWL_ORDERS}")
+        self.order = order
+        self.seen = set()
+        self._queue: deque = deque()
+        self._heap: List[Tuple[Tuple[int, int], int, str, int]] = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._queue) + len(self._heap)
+
+    def push(self, url: str, key: str, depth: int, score: int = 0) -> bool:
+        """Queue url unless its normalized form `key` was queued before; True if queued."""
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        if self.order == "bfs":
+            self._queue.append((url, depth))
+        else:
+            priority = (depth, -score) if self.order == "level" else (-score, depth)
+            heapq.heappush(self._heap, (priority, next(self._sequence), url, depth))
+        return True
+
+    def pop_batch(self, size: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Up to `size` (url, depth) pairs to fetch next (no limit if None). In
+        the level orders a batch never mixes depths, so with no limit it is
+        exactly the next level.
+        """
+        batch: List[Tuple[str, int]] = []
+        if self.order == "bfs":
+            depth = self._queue[0][1] if self._queue else None
+            while self._queue and self._queue[0][1] == depth and (size is None or len(batch) < size):
+                batch.append(self._queue.popleft())
+            return batch
+        depth = self._heap[0][3] if self._heap else None
+        while self._heap and (size is None or len(batch) < size):
+            if self.order == "level" and self._heap[0][3] != depth:
+                break
+            _, _, url, url_depth = heapq.heappop(self._heap)
+            batch.append((url, url_depth))
+        return batch
@@ -0,0 +1,134 @@
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import FrozenSet, List, Tuple
+
+from bs4 import BeautifulSoup
+
+TEXT_TAGS = frozenset(["h1", "h2", "h3", "p"])
+# Never contain readable text
+RAW_TAGS = frozenset(["script", "style", "noscript", "template"])
+# Site chrome: links inside are still collected, text is not
+NAV_TAGS = frozenset(["nav"])
+VOID_TAGS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+])
+
+HTML_BACKENDS = ("stream", "bs4")
+
+
+@dataclass
+class ParsedPage:
+    """
+    What the scraper needs from a page: the stripped text of every <h1>-<h3>/<p>
+    block in document order, and every <a href> as (href, anchor text).
+    """
+    blocks: List[str] = field(default_factory=list)
+    links: List[Tuple[str, str]] = field(default_factory=list)
+
+    @classmethod
+    def from_soup(cls, soup: BeautifulSoup) -> "ParsedPage":
+        return cls(
+            blocks=[tag.get_text().strip() for tag in soup.find_all(list(TEXT_TAGS))],
+            links=[(a["href"], a.get_text() or "") for a in soup.find_all("a", href=True)],
+        )
+
+
+class _BlockExtractor(HTMLParser):
+    """
+    Single-pass extractor behind ParsedPage for the "stream" backend.
+
+    Keeps a stack of open elements so that, like BeautifulSoup's tree, nested
+    blocks each get all of their descendant text and an end tag implicitly
+    closes anything still open inside it.
+    """
+
+    def __init__(self, skip_text_tags: FrozenSet[str]):
+        super().__init__(convert_charrefs=True)
+        self.skip_text_tags = skip_text_tags
+        self.page = ParsedPage()
+        # (tag, block slot or None, link slot or None)
+        self._stack: List[Tuple[str, object, object]] = []
+        self._open_blocks: List[List[str]] = []
+        self._open_links: List[List[str]] = []
+        self._raw_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        block = link = None
+        if tag in RAW_TAGS:
+            self._raw_depth += 1
+        if tag in self.skip_text_tags:
+            self._skip_depth += 1
+        if tag in TEXT_TAGS and not self._skip_depth:
+            block = []
+            self._open_blocks.append(block)
+            self.page.blocks.append(block)
+        if tag == "a":
+            href = next((value for name, value in attrs if name == "href"), None)
+            if href is not None:
+                link = [href]
+                self._open_links.append(link)
+                self.page.links.append(link)
+        self._stack.append((tag, block, link))
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, block, link = self._stack.pop()
+            self._close(open_tag, block, link)
+            if open_tag == tag:
+                break
+
+    def _close(self, tag, block, link):
+        if tag in RAW_TAGS:
+            self._raw_depth -= 1
+        if tag in self.skip_text_tags:
+            self._skip_depth -= 1
+        if block is not None:
+            _remove_item(self._open_blocks, block)
+        if link is not None:
+            _remove_item(self._open_links, link)
+
+    def handle_data(self, data):
+        if self._raw_depth:
+            return
+        for block in self._open_blocks:
+            block.append(data)
+        for link in self._open_links:
+            link.append(data)
+
+    def result(self) -> ParsedPage:
+        self.close()
+        page = self.page
+        page.blocks = ["".join(parts).strip() for parts in page.blocks]
+        page.links = [(parts[0], "".join(parts[1:])) for parts in page.links]
+        return page
+
+
+def _remove_item(items: list, item: list):
+    """Remove `item` by identity (other open blocks may hold equal text)."""
+    for i in range(len(items) - 1, -1, -1):
+        if items[i] is item:
+            del items[i]
+            return
+
+
+def parse_html(html: str, backend: str = "stream", skip_nav: bool = True) -> ParsedPage:
+    """
+    Parse a page into a ParsedPage.
+
+    "stream" makes one HTMLParser pass without building a tree, skips script/style
+    content and (with skip_nav) text inside <nav>. "bs4" is the original
+    BeautifulSoup html.parser path, kept as the reference implementation.
+    """
+    if backend == "bs4":
+        return ParsedPage.from_soup(BeautifulSoup(html, "html.parser"))
+    if backend != "stream":
+        raise ValueError(f"Unknown HTML backend '{backend}', expected one of {HTML_BACKENDS}")
+    extractor = _BlockExtractor(NAV_TAGS if skip_nav else frozenset())
+    extractor.feed(html)
+    return extractor.result()
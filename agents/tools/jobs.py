@@ -0,0 +1,329 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents.tools.report_store import normalize_company
+
+DEFAULT_JOB_DB_PATH = os.path.join(".cache", "jobs.sqlite3")
+JOB_STATUSES = ("queued", "running", "done", "error")
+
+# record(kind, data, **meta): how a running job reports progress
+RecordCallback = Callable[..., None]
+
+
+@dataclass
+class Job:
+    id: str
+    company: str
+    refresh: bool
+    status: str
+    stage: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: Optional[str]
+    result: Any
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+
+_JOB_COLUMNS = "id, company, refresh, status, stage, created_at, started_at, finished_at, error, result"
+
+
+def _job(row) -> Job:
+    job = Job(*row)
+    job.refresh = bool(job.refresh)
+    job.result = json.loads(job.result) if job.result is not None else None
+    return job
+
+
+class JobQueue:
+    """
+    Report jobs persisted in SQLite and run by a pool of worker threads.
+
+    submit() stores a job and returns its id at once; get() and events()
+    read its status and the progress events it recorded so far, so a page
+    reload (or another process sharing the database) can pick a job up
+    again. A company that already has a queued or running job gets that
+    job's id instead of a second job.
+
+    `run(job, record)` does the work: it calls record(kind, data, **meta)
+    for each progress event and returns the JSON-serializable result.
+    `workers` caps how many jobs run at once in this process, `max_running`
+    how many run at once across every process sharing the database. A
+    running job whose worker stopped sending heartbeats for `stale_after`
+    seconds (the process died) is queued again; its earlier progress is
+    replaced by a "retry" event, and event numbers keep counting up so
+    pollers don't miss the new attempt's events. Only the latest "live" event
+    of a job is kept, none once it finishes, and finished jobs are deleted
+    with their events `retention` seconds later (None keeps them).
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Job, RecordCallback], Any],
+        path: str = DEFAULT_JOB_DB_PATH,
+        workers: int = 2,
+        max_running: Optional[int] = None,
+        poll_interval: float = 1.0,
+        stale_after: float = 120.0,
+        retention: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.run = run
+        self.path = path
+        self.workers = workers
+        self.max_running = max_running
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    company TEXT NOT NULL,
+                    company_key TEXT NOT NULL,
+                    refresh INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL,
+                    worker TEXT,
+                    error TEXT,
+                    result TEXT
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    data TEXT,
+                    meta TEXT,
+                    PRIMARY KEY (job_id, seq)
+                )
+                """
+            )
+
+    @classmethod
+    def from_env(cls, run: Callable[[Job, RecordCallback], Any]) -> "JobQueue":
+        """
+        Build the queue from JOB_DB_PATH, JOB_WORKERS (concurrent reports per
+        process), JOB_MAX_RUNNING (across processes; 0 = no cap) and
+        JOB_RETENTION (seconds finished jobs are kept; 0 = forever).
+        """
+        return cls(
+            run,
+            path=os.getenv("JOB_DB_PATH", DEFAULT_JOB_DB_PATH),
+            workers=int(os.getenv("JOB_WORKERS", 2)),
+            max_running=int(os.getenv("JOB_MAX_RUNNING", 0)) or None,
+            retention=float(os.getenv("JOB_RETENTION", 7 * 24 * 3600)) or None,
+        )
+
+    def submit(self, company: str, refresh: bool = False) -> str:
+        """Queue a report for company and return the job id (an existing unfinished job's, if any)."""
+        key = normalize_company(company)
+        with self._lock, self._conn:
+            # As in _claim: no other process can add the same job between the check and the insert
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE company_key = ? AND status IN ('queued', 'running') "
+                "AND refresh >= ? ORDER BY created_at LIMIT 1",
+                (key, int(refresh)),
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            job_id = uuid.uuid4().hex[:12]
+            self._conn.execute(
+                "INSERT INTO jobs (id, company, company_key, refresh, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, company, key, int(refresh), time.time()),
+            )
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def recent(self, limit: int = 10) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+    def events(self, job_id: str, after: int = 0) -> List[Tuple[int, str, Any, Dict[str, Any]]]:
+        """(seq, kind, data, meta) of the events a job recorded after seq `after`, in order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, data, meta FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(seq, kind, json.loads(data), json.loads(meta)) for seq, kind, data, meta in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {**dict.fromkeys(JOB_STATUSES, 0), **dict(rows)}
+
+    def start(self):
+        """Start the worker threads and the heartbeat thread (once)."""
+        if self._threads:
+            return
+        targets = [(self._work, f"job-worker-{index}") for index in range(self.workers)]
+        for target, name in targets + [(self._beat, "job-heartbeat")]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop taking new jobs and wait for the running ones to finish."""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self) -> Optional[Job]:
+        """Mark the oldest queued job (or one whose worker died) as ours and return it."""
+        now = time.time()
+        claimable = "(status = 'queued' OR (status = 'running' AND heartbeat_at < ?))"
+        with self._lock, self._conn:
+            # Take the write lock before counting, so the count and the claim
+            # are one step for every process sharing the database
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self.max_running is not None:
+                running = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND heartbeat_at >= ?",
+                    (now - self.stale_after,),
+                ).fetchone()[0]
+                if running >= self.max_running:
+                    return None
+            row = self._conn.execute(
+                f"SELECT id FROM jobs WHERE {claimable} ORDER BY created_at LIMIT 1",
+                (now - self.stale_after,),
+            ).fetchone()
+            if row is None:
+                return None
+            # Conditional, so two processes can't both claim it
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, worker = ?, stage = NULL "
+                f"WHERE id = ? AND {claimable}",
+                (now, now, self.worker_id, row[0], now - self.stale_after),
+            ).rowcount
+            if not claimed:
+                return None
+            # A retried job starts its progress over. The "retry" event takes
+            # the next seq and stays, so numbering continues after it.
+            last_seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?", (row[0],)
+            ).fetchone()[0]
+            if last_seq:
+                self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (row[0],))
+                self._conn.execute(
+                    "INSERT INTO job_events VALUES (?, ?, 'retry', 'null', '{}')", (row[0], last_seq + 1)
+                )
+            job = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (row[0],)).fetchone()
+        return _job(job)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._execute(job)
+
+    def _beat(self):
+        """
+        Keep this process's running jobs from looking abandoned while they
+        wait on slow calls, and delete finished jobs past their retention.
+        """
+        while not self._stopping.wait(self.stale_after / 4):
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND worker = ?",
+                    (time.time(), self.worker_id),
+                )
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete finished jobs older than `retention` and their events; returns how many."""
+        if self.retention is None:
+            return 0
+        expired = "SELECT id FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?"
+        cutoff = time.time() - self.retention
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM job_events WHERE job_id IN ({expired})", (cutoff,))
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?", (cutoff,)
+            ).rowcount
+
+    def _execute(self, job: Job):
+        with self._lock:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?", (job.id,)
+            ).fetchone()[0]
+
+        def record(kind: str, data: Any = None, **meta):
+            nonlocal seq
+            seq += 1
+            with self._lock, self._conn:
+                if kind == "live":
+                    # Only the latest streamed text matters
+                    self._conn.execute("DELETE FROM job_events WHERE job_id = ? AND kind = 'live'", (job.id,))
+                self._conn.execute(
+                    "INSERT INTO job_events VALUES (?, ?, ?, ?, ?)",
+                    (job.id, seq, kind, json.dumps(data, default=str), json.dumps(meta, default=str)),
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET stage = COALESCE(?, stage) WHERE id = ?", (meta.get("stage"), job.id)
+                )
+
+        print(f"Job {job.id}: analyzing '{job.company}'")
+        try:
+            result = self.run(job, record)
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            self._finish(job.id, "error", error=str(e))
+        else:
+            self._finish(job.id, "done", result=json.dumps(result, default=str))
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None, result: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, result = ? WHERE id = ?",
+                (status, time.time(), error, result, job_id),
+            )
+            self._conn.execute("DELETE FROM job_events WHERE job_id = ? AND kind = 'live'", (job_id,))
+
+    def close(self):
+        self.stop()
+        self._conn.close()
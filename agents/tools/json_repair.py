@@ -0,0 +1,297 @@
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Typographic quotes models sometimes emit around keys and strings
+_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+
+REPAIR_PROMPT = """Your previous reply could not be used as JSON: {problems}
+Reply again with only the corrected JSON: no explanation and no markdown. Keep all of the content that was valid.
+It must match this JSON schema:
+{schema}
+
+Previous reply:
+{reply}
+"""
+# Longest part of a broken reply quoted back in REPAIR_PROMPT
+MAX_REPLY_CHARS = 6000
+
+
+class JsonRecoveryError(ValueError):
+    """A reply had no usable JSON even after repair; args[0] lists the problems."""
+
+
+def repair_json(text: str, openers: str = "[{") -> Optional[str]:
+    """
+    Cut the JSON value out of an LLM reply and fix what models commonly get
+    wrong, in one pass: surrounding prose and ``` fences, typographic and
+    single quotes, unquoted keys, Python literals (True/None), trailing and
+    missing commas, and a reply cut off mid-value (closed after the last
+    complete element). The value starts at the first of `openers`.
+    Returns None if there is no such value.
+    """
+    text = text.translate(_QUOTES)
+    start = min((i for i in (text.find(c) for c in openers) if i >= 0), default=-1)
+    if start < 0:
+        return None
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Output length and open containers after the last complete element, for truncated replies
+    safe_length, safe_stack = 0, []
+    i, n = start, len(text)
+
+    def last_significant() -> str:
+        for piece in reversed(out):
+            stripped = piece.rstrip()
+            if stripped:
+                return stripped[-1]
+        return ""
+
+    def need_comma():
+        # Two values in a row inside a container: the model forgot the comma
+        if stack and last_significant() not in ("", "[", "{", ",", ":"):
+            out.append(",")
+
+    while i < n:
+        char = text[i]
+        if char in "\"'":
+            # Copy a string, normalizing single-quoted ones to double quotes
+            need_comma()
+            quote, j, chunk = char, i + 1, ['"']
+            while j < n and text[j] != quote:
+                if text[j] == "\\" and j + 1 < n:
+                    # \' only means something inside single quotes
+                    chunk.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                if text[j] == '"' or text[j] < " ":
+                    chunk.append(json.dumps(text[j])[1:-1])
+                else:
+                    chunk.append(text[j])
+                j += 1
+            if j >= n:
+                break  # unterminated string: the reply was cut off
+            chunk.append('"')
+            out.append("".join(chunk))
+            i = j + 1
+            if stack and stack[-1] == "]":
+                safe_length, safe_stack = len(out), list(stack)
+            continue
+
+        if char in "[{":
+            need_comma()
+            stack.append("]" if char == "[" else "}")
+            out.append(char)
+        elif char in "]}":
+            if not stack:
+                break
+            while out and out[-1].strip() in (",", ""):
+                out.pop()  # trailing comma
+            out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+            safe_length, safe_stack = len(out), list(stack)
+        elif char == ",":
+            if last_significant() not in (",", "[", "{"):
+                out.append(",")
+        elif char == ":":
+            out.append(":")
+        elif char.isalnum() or char in "-+._":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "-+._"):
+                j += 1
+            word = text[i:j]
+            rest = text[j:].lstrip()
+            need_comma()
+            if stack and stack[-1] == "}" and rest.startswith(":"):
+                out.append(json.dumps(word))  # unquoted key
+            elif word in _LITERALS:
+                out.append(_LITERALS[word])
+            else:
+                out.append(word)
+            i = j
+            if stack and stack[-1] == "]":
+                safe_length, safe_stack = len(out), list(stack)
+            continue
+        elif char.isspace():
+            out.append(char)
+        # anything else (stray backticks, prose between values) is dropped
+        i += 1
+
+    if not stack:
+        return "".join(out) or None
+    # Cut off: keep everything up to the last complete element and close what's open
+    out = out[:safe_length]
+    while out and out[-1].strip() in (",", ""):
+        out.pop()
+    return "".join(out) + "".join(reversed(safe_stack)) if out else None
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Problems with value under a (type/properties/required/items) JSON schema; empty if it conforms."""
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            return [f"{path} should be an object"]
+        problems = [f"{path} is missing \"{key}\"" for key in schema.get("required", []) if key not in value]
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                problems += validate(value[key], sub_schema, f"{path}.{key}")
+        return problems
+    if kind == "array":
+        if not isinstance(value, list):
+            return [f"{path} should be a list"]
+        items = schema.get("items")
+        problems = []
+        for index, item in enumerate(value if items else []):
+            problems += validate(item, items, f"{path}[{index}]")
+        return problems
+    checks = {
+        "string": lambda v: isinstance(v, str),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "boolean": lambda v: isinstance(v, bool),
+    }
+    if kind in checks and not checks[kind](value):
+        return [f"{path} should be a {kind}"]
+    return []
+
+
+def _conform(value: Any, schema: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """
+    Cheap structural fixes before giving up on a value: unwrap {"items": [...]}
+    when a list is expected, and drop the invalid items of a list as long as
+    some valid ones remain. Returns the value and its remaining problems.
+    """
+    if schema.get("type") == "array" and isinstance(value, dict):
+        lists = [item for item in value.values() if isinstance(item, list)]
+        if len(lists) == 1:
+            value = lists[0]
+    problems = validate(value, schema)
+    if problems and schema.get("type") == "array" and isinstance(value, list) and schema.get("items"):
+        valid = [item for item in value if not validate(item, schema["items"])]
+        if valid:
+            return valid, []
+    return value, problems
+
+
+def load_json(text: str, schema: Dict[str, Any]) -> Tuple[Any, bool]:
+    """
+    Parse an LLM reply against schema, repairing it if needed. Returns
+    (value, repaired); raises JsonRecoveryError if nothing usable is left.
+    """
+    try:
+        value = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    else:
+        if not validate(value, schema):
+            return value, False
+
+    openers = {"array": "[", "object": "{"}.get(schema.get("type"), "[{")
+    candidates = [repair_json(text or "", openers)]
+    if openers != "[{":
+        candidates.append(repair_json(text or ""))  # e.g. a list wrapped in an object
+    problems = ["no JSON value found"]
+    for candidate in candidates:
+        if candidate is None:
+            continue
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            problems = [f"invalid JSON ({e})"]
+            continue
+        value, problems = _conform(value, schema)
+        if not problems:
+            return value, True
+    raise JsonRecoveryError("; ".join(problems[:5]))
+
+
+class RecoveryStats:
+    """
+    How LLM replies were turned into JSON, per kind of reply: "clean" (parsed
+    as is), "repaired" (fixed locally), "reasked" (fixed by a repair prompt)
+    or "failed". Thread-safe; shared process-wide as recovery_stats.
+    """
+
+    OUTCOMES = ("clean", "repaired", "reasked", "failed")
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(kind, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Counts per kind plus recovery_rate: the share of malformed replies that were saved."""
+        with self._lock:
+            summary = {kind: dict(counts) for kind, counts in self._counts.items()}
+        for counts in summary.values():
+            malformed = counts["repaired"] + counts["reasked"] + counts["failed"]
+            counts["recovery_rate"] = round((malformed - counts["failed"]) / malformed, 3) if malformed else None
+        return summary
+
+
+recovery_stats = RecoveryStats()
+
+
+def _repair_prompt(reply: str, problems: str, schema: Dict[str, Any]) -> str:
+    return REPAIR_PROMPT.format(
+        problems=problems,
+        schema=json.dumps(schema, separators=(",", ":")),
+        reply=(reply or "")[:MAX_REPLY_CHARS],
+    )
+
+
+def parse_reply(
+    reply: str, schema: Dict[str, Any], kind: str, reask: Optional[Callable[[str], str]] = None
+) -> Any:
+    """
+    load_json(reply, schema); if that fails, send reask() one repair prompt
+    naming the problems and parse its answer instead, so only this call is
+    redone. Records the outcome in recovery_stats; raises JsonRecoveryError
+    when the reply can't be saved.
+    """
+    try:
+        value, repaired = load_json(reply, schema)
+    except JsonRecoveryError as e:
+        if reask is None:
+            recovery_stats.record(kind, "failed")
+            raise
+        print(f"Unusable {kind} JSON ({e}); asking for a corrected reply")
+        try:
+            value, _ = load_json(reask(_repair_prompt(reply, str(e), schema)), schema)
+        except Exception:
+            recovery_stats.record(kind, "failed")
+            raise
+        recovery_stats.record(kind, "reasked")
+        return value
+    recovery_stats.record(kind, "repaired" if repaired else "clean")
+    return value
+
+
+async def aparse_reply(
+    reply: str, schema: Dict[str, Any], kind: str, areask: Optional[Callable[[str], Awaitable[str]]] = None
+) -> Any:
+    """parse_reply() for coroutines; areask is awaited."""
+    try:
+        value, repaired = load_json(reply, schema)
+    except JsonRecoveryError as e:
+        if areask is None:
+            recovery_stats.record(kind, "failed")
+            raise
+        print(f"Unusable {kind} JSON ({e}); asking for a corrected reply")
+        try:
+            value, _ = load_json(await areask(_repair_prompt(reply, str(e), schema)), schema)
+        except Exception:
+            recovery_stats.record(kind, "failed")
+            raise
+        recovery_stats.record(kind, "reasked")
+        return value
+    recovery_stats.record(kind, "repaired" if repaired else "clean")
+    return value
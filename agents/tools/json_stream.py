@@ -0,0 +1,74 @@
+import json
+from typing import Any, List
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for a JSON array that arrives in pieces (streamed LLM
+    tokens). feed() returns the elements completed by each piece, so an
+    object can be used as soon as its closing brace arrives rather than when
+    the whole reply is done.
+
+    Text before the opening "[" (a ```json fence, a preamble) and after the
+    closing "]" is ignored, as are elements that fail to parse.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self._buffer: List[str] = []
+        self._depth = 0  # 1 = directly inside the top-level array
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[Any]:
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if self._depth == 0:
+                if char == "[":
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+                self._buffer.append(char)
+            elif char in "[{":
+                self._depth += 1
+                self._buffer.append(char)
+            elif char in "]}":
+                if self._depth == 1:
+                    # End of the top-level array
+                    self._flush(completed)
+                    self.done = True
+                    continue
+                self._depth -= 1
+                self._buffer.append(char)
+                if self._depth == 1:
+                    self._flush(completed)
+            elif char == "," and self._depth == 1:
+                self._flush(completed)
+            else:
+                self._buffer.append(char)
+        return completed
+
+    def _flush(self, completed: List[Any]):
+        text = "".join(self._buffer).strip()
+        self._buffer.clear()
+        if not text:
+            return
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        self.items.append(item)
+        completed.append(item)
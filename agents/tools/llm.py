@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, List, Optional
+
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_openai import ChatOpenAI
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from agents.tools.rate_limit import FATAL, RETRY, THROTTLE, rate_limits, retry_after
+
+from agents.tools.llm_cache import llm_cache_setting
+from agents.tools.singleflight import AsyncSingleFlight, SingleFlight
+
+# Shared by every client in the process, so identical requests coming from
+# different sessions at the same time reach OpenAI only once.
+_inflight_requests = SingleFlight()
+_ainflight_requests = AsyncSingleFlight()
+
+# Process-wide cap on requests in flight to OpenAI (None = unlimited)
+_llm_limit: Optional[int] = None
+_request_slots: Optional[threading.BoundedSemaphore] = None
+# asyncio semaphores are bound to one event loop, so async calls get one per loop
+_async_request_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def set_llm_concurrency(limit: Optional[int]):
+    """
+    Cap how many LLM requests may be in flight at once across all clients.
+    Blocking calls share one cap; async calls share one cap per event loop.
+    """
+    global _llm_limit, _request_slots
+    _llm_limit = limit or None
+    _request_slots = threading.BoundedSemaphore(limit) if limit else None
+    _async_request_slots.clear()
+
+
+def _async_slots() -> Optional[asyncio.Semaphore]:
+    if not _llm_limit:
+        return None
+    loop = asyncio.get_running_loop()
+    slots = _async_request_slots.get(loop)
+    if slots is None:
+        slots = _async_request_slots[loop] = asyncio.Semaphore(_llm_limit)
+    return slots
+
+
+def openai_error_kind(error: BaseException):
+    """How the rate limiter treats a failed OpenAI request."""
+    if isinstance(error, RateLimitError):
+        # insufficient_quota is a 429 too, but waiting won't fix it
+        if getattr(error, "code", None) == "insufficient_quota":
+            return FATAL, None
+        return THROTTLE, retry_after(error.response.headers)
+    if isinstance(error, (APITimeoutError, APIConnectionError, InternalServerError)):
+        return RETRY, None
+    return FATAL, None
+
+
+class SharedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI that coalesces identical in-flight requests (same settings and
+    messages) and respects the set_llm_concurrency cap, for invoke() and ainvoke().
+    Requests go through the model's rate_limit.ProviderLimiter, which owns
+    retries: 429s and transient errors are retried with backoff.
+    """
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = (self._get_llm_string(stop=stop, **kwargs), dumps(messages))
+        return _inflight_requests.do(
+            key, lambda: self._limited_generate(messages, stop, run_manager, **kwargs)
+        )
+
+    def _limited_generate(self, messages, stop, run_manager, **kwargs) -> ChatResult:
+        def generate():
+            slots = _request_slots
+            if slots is None:
+                return super(SharedChatOpenAI, self)._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            with slots:
+                return super(SharedChatOpenAI, self)._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        return rate_limits.get("openai", self.model_name).call(generate, openai_error_kind)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = (self._get_llm_string(stop=stop, **kwargs), dumps(messages))
+        return await _ainflight_requests.do(
+            key, lambda: self._limited_agenerate(messages, stop, run_manager, **kwargs)
+        )
+
+    async def _limited_agenerate(self, messages, stop, run_manager, **kwargs) -> ChatResult:
+        async def agenerate():
+            slots = _async_slots()
+            if slots is None:
+                return await super(SharedChatOpenAI, self)._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            async with slots:
+                return await super(SharedChatOpenAI, self)._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+
+        return await rate_limits.get("openai", self.model_name).acall(agenerate, openai_error_kind)
+
+
+def chat_model(
+    model: str = "gpt-4", temperature: float = 0.3, use_cache: bool = True, max_tokens: Optional[int] = None
+) -> ChatOpenAI:
+    """
+    Build a ChatOpenAI client configured the way every agent needs it:
+    backed by the shared LLM cache (unless use_cache is False) and streaming
+    under the hood, so token callbacks fire while a reply is generated.
+    invoke() still returns the complete message. The client doesn't retry
+    on its own; the shared rate limiter does.
+    """
+    return SharedChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        max_retries=0,
+        cache=llm_cache_setting(use_cache),
+        streaming=True,
+        stream_usage=True,
+    )
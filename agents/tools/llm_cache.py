@@ -0,0 +1,177 @@
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+DEFAULT_LLM_CACHE_PATH = os.path.join(".cache", "llm_cache.sqlite3")
+
+
+class LLMCache(BaseCache, ABC):
+    """
+    Content-addressed LLM response cache plugged into LangChain's `cache=` hook.
+
+    LangChain hands us the rendered messages (`prompt`) and the model settings
+    (`llm_string`, which includes model name and temperature); both are hashed
+    into one key, so byte-identical requests from any agent share an entry.
+    Subclasses only implement _get/_set/clear.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self._get(self.make_key(prompt, llm_string))
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            return None
+        # Flag the generations so callbacks (tracing) can tell a cache hit from a real call
+        return [
+            generation.model_copy(
+                update={"generation_info": {**(generation.generation_info or {}), "cached": True}}
+            )
+            for generation in value
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._set(self.make_key(prompt, llm_string), return_val)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        """The stored value for key, or None."""
+
+    @abstractmethod
+    def _set(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        """Store value under key."""
+
+
+class MemoryLLMCache(LLMCache):
+    """In-process LRU cache holding at most `maxsize` responses."""
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskLLMCache(LLMCache):
+    """SQLite-backed cache that survives restarts, evicting LRU entries past `max_entries`."""
+
+    def __init__(self, path: str = DEFAULT_LLM_CACHE_PATH, max_entries: int = 20000):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+
+    def _get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        try:
+            return loads(row[0])
+        except Exception as e:
+            print(f"Discarding unreadable LLM cache entry {key[:12]}: {e}")
+            return None
+
+    def _set(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, dumps(list(value)), time.time()),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_cache_built = False
+_shared_cache_lock = threading.Lock()
+
+
+def shared_llm_cache() -> Optional[LLMCache]:
+    """
+    Process-wide LLM cache shared by all agents, chosen by LLM_CACHE:
+    "memory" (default), "disk" (at LLM_CACHE_PATH) or "off".
+    """
+    global _shared_cache, _shared_cache_built
+    with _shared_cache_lock:
+        if not _shared_cache_built:
+            backend = os.getenv("LLM_CACHE", "memory").strip().lower()
+            if backend == "disk":
+                _shared_cache = DiskLLMCache(os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH))
+            elif backend == "memory":
+                _shared_cache = MemoryLLMCache()
+            else:
+                _shared_cache = None
+            _shared_cache_built = True
+        return _shared_cache
+
+
+def llm_cache_setting(use_cache: bool = True):
+    """Value for ChatOpenAI(cache=...): the shared cache, or False to bypass caching."""
+    cache = shared_llm_cache() if use_cache else None
+    return cache if cache is not None else False
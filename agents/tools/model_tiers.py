@@ -0,0 +1,49 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# "strong" for calls whose output is the report's substance (analysis, use
+# cases, implementation plans); "fast" for simple lookups and routing hops
+TIERS = ("fast", "strong")
+
+
+@dataclass(frozen=True)
+class TierSettings:
+    """
+    The model behind a tier. temperature=None keeps the temperature the
+    calling agent asks for; max_tokens=None leaves replies uncapped.
+    """
+    model: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+
+DEFAULT_TIER_SETTINGS = {
+    "strong": TierSettings("gpt-4"),
+    "fast": TierSettings("gpt-4o-mini", max_tokens=1024),
+}
+
+
+def tier_settings_from_env() -> Dict[str, TierSettings]:
+    """
+    DEFAULT_TIER_SETTINGS overridden per tier by LLM_<TIER>_MODEL,
+    LLM_<TIER>_TEMPERATURE and LLM_<TIER>_MAX_TOKENS (0 = uncapped). A
+    default reply cap only applies to the default model, so setting
+    LLM_FAST_MODEL=gpt-4 turns routing off entirely.
+    """
+    settings = {}
+    for tier, default in DEFAULT_TIER_SETTINGS.items():
+        prefix = f"LLM_{tier.upper()}_"
+        model = os.getenv(prefix + "MODEL", default.model)
+        temperature = os.getenv(prefix + "TEMPERATURE")
+        max_tokens = os.getenv(prefix + "MAX_TOKENS")
+        if max_tokens:
+            max_tokens = int(max_tokens) or None
+        else:
+            max_tokens = default.max_tokens if model == default.model else None
+        settings[tier] = TierSettings(
+            model=model,
+            temperature=float(temperature) if temperature else default.temperature,
+            max_tokens=max_tokens,
+        )
+    return settings
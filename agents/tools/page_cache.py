@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys and visited sets:
+    lower-cased scheme and host, default port and fragment dropped,
+    query parameters sorted and no trailing slash on the path.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and str(parsed.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, path, parsed.params, query, ""))
+
+
+class PageCache:
+    """
+    Thread-safe, per-request memo of fetched pages keyed by normalized URL.
+    Failed fetches (None) are cached too, and concurrent lookups of the same
+    URL wait for the first one instead of downloading it again.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Any] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._aloading: Dict[str, asyncio.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, url: str, loader: Callable[[str], Any]) -> Any:
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            pending = self._loading.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._loading[key] = threading.Event()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            pending.wait()
+            return self._entries.get(key)
+
+        value = None
+        try:
+            value = loader(url)
+        finally:
+            with self._lock:
+                self._entries[key] = value
+                del self._loading[key]
+            pending.set()
+        return value
+
+    async def aget_or_load(self, url: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        """get_or_load for coroutines on one event loop; `loader` is awaited."""
+        key = normalize_url(url)
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        pending = self._aloading.get(key)
+        if pending is not None:
+            self.hits += 1
+            await pending.wait()
+            return self._entries.get(key)
+
+        pending = self._aloading[key] = asyncio.Event()
+        self.misses += 1
+        value = None
+        try:
+            value = await loader(url)
+        finally:
+            self._entries[key] = value
+            del self._aloading[key]
+            pending.set()
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
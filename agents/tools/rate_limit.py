@@ -0,0 +1,397 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from agents.tools.tracing import span
+
+# How a failed call is handled: THROTTLE (the provider said slow down; the
+# concurrency limit is cut), RETRY (transient; retried with backoff) or FATAL
+# (raised at once, not held against the provider)
+THROTTLE, RETRY, FATAL = "throttle", "retry", "fatal"
+
+# classify(error) -> (THROTTLE | RETRY | FATAL, seconds the provider asked us to wait or None)
+Classifier = Callable[[BaseException], Tuple[str, Optional[float]]]
+
+
+class CircuitOpenError(RuntimeError):
+    """A provider's circuit breaker is open and the call has no retries left to wait out its cooldown."""
+
+
+def retry_after(headers) -> Optional[float]:
+    """Seconds from a Retry-After header (numeric form only), if present."""
+    value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Request-start budget: `rate` tokens per second, holding at most `burst`.
+    A rate of None or 0 disables it.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.rate = rate or 0.0
+        self.burst = burst or max(1.0, self.rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on calls in flight: it grows by one per `limit` successful
+    calls up to max_limit, halves when the provider throttles, and shrinks by
+    a tenth when a call takes more than latency_factor times the running
+    average, down to min_limit.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_factor: float = 3.0):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.latency_factor = latency_factor
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._average_latency: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def aacquire(self, poll: float = 0.02):
+        # The limit is shared with threads, so coroutines poll instead of
+        # waiting on the condition
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+
+    def release(self, latency: float, throttled: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            average = self._average_latency
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            elif average is not None and latency > self.latency_factor * average:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if not throttled:
+                self._average_latency = latency if average is None else 0.9 * average + 0.1 * latency
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive calls failed with transient
+    errors even after their retries; throttling doesn't count, it is left to
+    the concurrency limit and backoff. After `cooldown` seconds one trial
+    call goes through while the others wait for it: success closes the
+    circuit, a transient failure opens it again.
+    """
+
+    # How often callers check back while another caller's trial call runs
+    TRIAL_POLL = 0.05
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opens = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def admit(self) -> Tuple[str, float]:
+        """
+        ("go", 0) or ("trial", 0) when a call may go ahead, the latter as the
+        half-open trial; ("open", cooldown left) or ("wait", TRIAL_POLL) when
+        it has to wait first.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return "go", 0.0
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self.state == "open" and remaining > 0:
+                return "open", remaining
+            if self._trial_running:
+                return "wait", self.TRIAL_POLL
+            self.state = "half_open"
+            self._trial_running = True
+            return "trial", 0.0
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def failure(self, trial: bool = False):
+        """A call failed for good with a transient error, or a trial call failed."""
+        with self._lock:
+            self._failures += 1
+            if trial or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def release(self):
+        """End a trial call whose failure isn't held against the provider."""
+        with self._lock:
+            self._trial_running = False
+
+
+class ProviderLimiter:
+    """
+    Everything that keeps calls to one provider inside its limits: a token
+    bucket for request starts, an adaptive concurrency limit, retries with
+    exponential backoff and jitter (or the provider's Retry-After), and a
+    circuit breaker. Time spent waiting on any of them is recorded as a
+    "throttle" span and in throttle_seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.rejected = 0
+        self.throttle_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                setattr(self, key, getattr(self, key) + amount)
+
+    def _admit(self, attempt: int) -> Tuple[Optional[bool], int, float]:
+        """
+        (is the trial call, attempt, 0) when a call may go ahead, else (None,
+        attempt, seconds to wait before asking again). Waiting out an open
+        circuit uses up a retry; CircuitOpenError once none are left.
+        """
+        state, wait = self.breaker.admit()
+        if state in ("go", "trial"):
+            return state == "trial", attempt, 0.0
+        if state == "open":
+            if attempt >= self.max_retries:
+                self._add(rejected=1)
+                raise CircuitOpenError(f"{self.name} is failing; not calling it for another {wait:.1f}s")
+            attempt += 1
+        return None, attempt, wait
+
+    def _failed(self, error: BaseException, classify: Classifier, attempt: int, latency: float, trial: bool) -> float:
+        """Record a failed attempt; return the delay before retrying it, or re-raise."""
+        kind, wait = classify(error)
+        self.concurrency.release(latency, throttled=kind == THROTTLE)
+        exhausted = attempt >= self.max_retries
+        if kind == RETRY and (trial or exhausted):
+            self.breaker.failure(trial)
+        elif trial:
+            self.breaker.release()
+        self._add(throttled=int(kind == THROTTLE))
+        if kind == FATAL:
+            raise error
+        if exhausted:
+            self._add(failures=1)
+            raise error
+        self._add(retries=1)
+        delay = wait if wait is not None else backoff_delay(attempt, self.base_delay, self.max_delay)
+        print(f"{self.name}: {kind} ({error}); retrying in {delay:.1f}s")
+        return min(delay, self.max_delay)
+
+    def _succeeded(self, latency: float):
+        self.concurrency.release(latency)
+        self.breaker.success()
+
+    def call(self, fn: Callable[[], Any], classify: Classifier) -> Any:
+        """Run fn() within the provider's limits, retrying what classify() says is worth retrying."""
+        self._add(calls=1)
+        attempt = 0
+        while True:
+            trial, attempt, wait = self._admit(attempt)
+            if trial is None:
+                self._sleep(wait, "circuit")
+                continue
+            self._sleep(self.bucket.reserve(), "rate")
+            if not self.concurrency.try_acquire():
+                started = time.monotonic()
+                with span("throttle", "throttle", provider=self.name, reason="concurrency"):
+                    self.concurrency.acquire()
+                self._add(throttle_seconds=time.monotonic() - started)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, classify, attempt, time.monotonic() - started, trial)
+                self._sleep(delay, "backoff")
+                attempt += 1
+                continue
+            self._succeeded(time.monotonic() - started)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], classify: Classifier) -> Any:
+        """call() for coroutines: fn() is awaited and waits don't block the event loop."""
+        self._add(calls=1)
+        attempt = 0
+        while True:
+            trial, attempt, wait = self._admit(attempt)
+            if trial is None:
+                await self._asleep(wait, "circuit")
+                continue
+            await self._asleep(self.bucket.reserve(), "rate")
+            if not self.concurrency.try_acquire():
+                started = time.monotonic()
+                with span("throttle", "throttle", provider=self.name, reason="concurrency"):
+                    await self.concurrency.aacquire()
+                self._add(throttle_seconds=time.monotonic() - started)
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._failed(e, classify, attempt, time.monotonic() - started, trial)
+                await self._asleep(delay, "backoff")
+                attempt += 1
+                continue
+            self._succeeded(time.monotonic() - started)
+            return result
+
+    def _sleep(self, delay: float, reason: str):
+        if delay > 0:
+            with span("throttle", "throttle", provider=self.name, reason=reason):
+                time.sleep(delay)
+            self._add(throttle_seconds=delay)
+
+    async def _asleep(self, delay: float, reason: str):
+        if delay > 0:
+            with span("throttle", "throttle", provider=self.name, reason=reason):
+                await asyncio.sleep(delay)
+            self._add(throttle_seconds=delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "throttle_s": round(self.throttle_seconds, 3),
+            "concurrency_limit": round(self.concurrency.limit, 1),
+            "circuit": self.breaker.state,
+        }
+
+
+# Settings per provider; "http" limiters are per host, the others per model or account
+PROVIDER_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "openai": {"rate": 8.0, "burst": 16, "max_concurrency": 16, "max_retries": 4, "base_delay": 1.0},
+    "duckduckgo": {"rate": 1.0, "burst": 3, "max_concurrency": 2, "max_retries": 3, "base_delay": 2.0},
+    "http": {"max_concurrency": 4, "max_retries": 2, "base_delay": 0.5, "max_delay": 10.0},
+}
+
+
+class RateLimits:
+    """
+    The process-wide ProviderLimiters, one per (provider, key), e.g.
+    ("openai", "gpt-4") or ("http", "example.com"). Settings come from
+    PROVIDER_SETTINGS, overridden by RATE_LIMIT_<PROVIDER>_RPS and
+    RATE_LIMIT_<PROVIDER>_CONCURRENCY or configure(). The environment is
+    read on first use, so values loaded from .env after import still apply.
+    """
+
+    def __init__(self):
+        self._settings: Optional[Dict[str, Dict[str, Any]]] = None
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _provider_settings(self) -> Dict[str, Dict[str, Any]]:
+        # Called with self._lock held
+        if self._settings is None:
+            self._settings = {provider: dict(settings) for provider, settings in PROVIDER_SETTINGS.items()}
+            for provider, settings in self._settings.items():
+                rps = os.getenv(f"RATE_LIMIT_{provider.upper()}_RPS")
+                concurrency = os.getenv(f"RATE_LIMIT_{provider.upper()}_CONCURRENCY")
+                if rps is not None:
+                    settings["rate"] = float(rps) or None
+                if concurrency:
+                    settings["max_concurrency"] = int(concurrency)
+        return self._settings
+
+    def configure(self, provider: str, **settings):
+        """Change a provider's settings; its existing limiters are replaced on next use."""
+        with self._lock:
+            self._provider_settings().setdefault(provider, {}).update(settings)
+            for key in [key for key in self._limiters if key[0] == provider]:
+                del self._limiters[key]
+
+    def get(self, provider: str, key: str = "") -> ProviderLimiter:
+        with self._lock:
+            limiter = self._limiters.get((provider, key))
+            if limiter is None:
+                name = f"{provider}:{key}" if key else provider
+                settings = self._provider_settings().get(provider, {})
+                limiter = self._limiters[(provider, key)] = ProviderLimiter(name, **settings)
+            return limiter
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Stats of every limiter that had to wait, retry or reject."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {
+            limiter.name: limiter.stats()
+            for limiter in limiters
+            if limiter.throttle_seconds or limiter.retries or limiter.failures or limiter.rejected
+        }
+
+
+rate_limits = RateLimits()
@@ -0,0 +1,261 @@
+import asyncio
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Set, Tuple
+
+from agents.tools.singleflight import AsyncSingleFlight, SingleFlight
+
+# Legal-form suffixes that don't change which company is meant ("Acme Inc." == "acme")
+_LEGAL_SUFFIX = re.compile(r"(?:[\s,]+(?:inc|incorporated|corp|corporation|co|ltd|limited|llc|plc|gmbh|ag|sa))+$")
+_PUNCTUATION = re.compile(r"[^\w&+\- ]+")
+
+# Outcomes of a lookup, returned next to the report
+REPORT_STATUSES = ("fresh", "stale", "coalesced", "built")
+
+
+def normalize_company(name: str) -> str:
+    """Store key for a company name: case, punctuation, spacing and legal suffix ignored."""
+    key = " ".join(_PUNCTUATION.sub(" ", name.casefold()).split())
+    return _LEGAL_SUFFIX.sub("", key) or key
+
+
+def incomplete_reason(report: Any) -> Optional[str]:
+    """Why an (analysis, use_cases, resources) report is incomplete, or None if it isn't."""
+    try:
+        analysis, use_cases, resources = report
+    except (TypeError, ValueError):
+        return "not an (analysis, use_cases, resources) report"
+    if not isinstance(analysis, dict) or not analysis:
+        return "no analysis"
+    if "error" in analysis:
+        return f"analysis failed: {analysis['error']}"
+    if not use_cases:
+        return "no use cases"
+    has_resources = any(
+        any(value for value in bundle.values() if isinstance(value, list))
+        for bundle in resources or []
+        if isinstance(bundle, dict)
+    )
+    return None if has_resources else "no resources"
+
+
+def complete_report(report: Any) -> bool:
+    """
+    Whether an (analysis, use_cases, resources) report is worth sharing: the
+    analysis parsed, there are use cases and some resource bundle has content.
+    Reports cut short by failing LLM calls are not.
+    """
+    return incomplete_reason(report) is None
+
+
+@dataclass
+class StoredReport:
+    company: str
+    report: Any
+    created_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ReportStore:
+    """
+    Finished (analysis, use_cases, resources) reports shared by every session
+    of the process, keyed by normalize_company().
+
+    A report is fresh for `ttl` seconds and may then be served stale for
+    another `max_stale` seconds. Concurrent requests for a company that has
+    no usable report share one build. With stale_while_refresh, a stale
+    report is returned at once and a rebuild starts in the background;
+    without it, stale reports are rebuilt before answering. At most
+    `max_entries` reports are kept, least recently used evicted first.
+    Reports that `usable` rejects (default: complete_report) go back to the
+    callers that asked for them but are not stored, so an earlier good
+    report for the company stays in place.
+
+    Reports are shared between callers and must be treated as read-only.
+    Threads and event loops coalesce separately: a get() and an aget() for
+    the same company may both build it.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 6 * 3600,
+        max_stale: float = 7 * 24 * 3600,
+        max_entries: int = 256,
+        stale_while_refresh: bool = True,
+        usable: Callable[[Any], bool] = complete_report,
+    ):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.stale_while_refresh = stale_while_refresh
+        self.usable = usable
+        self._entries: "OrderedDict[str, StoredReport]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._aflight = AsyncSingleFlight()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.builds = 0
+        self.refresh_failures = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ReportStore"]:
+        """
+        Build the store from REPORT_STORE_TTL (seconds; "off" disables it),
+        REPORT_STORE_MAX_STALE (seconds) and REPORT_STORE_STALE_WHILE_REFRESH
+        (0/false to rebuild stale reports before answering).
+        """
+        ttl = os.getenv("REPORT_STORE_TTL", str(6 * 3600)).strip().lower()
+        if ttl in ("", "off", "none", "0"):
+            return None
+        refresh = os.getenv("REPORT_STORE_STALE_WHILE_REFRESH", "1").strip().lower()
+        return cls(
+            ttl=float(ttl),
+            max_stale=float(os.getenv("REPORT_STORE_MAX_STALE", 7 * 24 * 3600)),
+            stale_while_refresh=refresh not in ("0", "false", "no"),
+        )
+
+    def peek(self, company: str) -> Optional[StoredReport]:
+        """The stored report for company, however old, without counting a lookup."""
+        with self._lock:
+            return self._entries.get(normalize_company(company))
+
+    def invalidate(self, company: str):
+        with self._lock:
+            self._entries.pop(normalize_company(company), None)
+
+    def _lookup(self, key: str, refresh: bool) -> Tuple[Optional[StoredReport], Optional[str]]:
+        """(entry, status) if the stored report can be served as is, else (None, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or refresh:
+                return None, None
+            self._entries.move_to_end(key)
+            age = entry.age
+            if age < self.ttl:
+                self.hits += 1
+                return entry, "fresh"
+            if self.stale_while_refresh and age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                return entry, "stale"
+        return None, None
+
+    def _store(self, key: str, company: str, report: Any) -> Any:
+        if not self.usable(report):
+            print(f"Not storing the incomplete '{company}' report")
+            with self._lock:
+                self.builds += 1
+                self.rejected += 1
+            return report
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = StoredReport(company, report, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return report
+
+    def _start_refresh(self, key: str) -> bool:
+        """Claim the background refresh of key; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def get(
+        self, company: str, build: Callable[[], Any], refresh: bool = False
+    ) -> Tuple[Any, str, float]:
+        """
+        (report, status, age in seconds) for company, calling build() only
+        when there is no usable report (or refresh=True) and no build of it
+        already running. status is one of REPORT_STATUSES. Build errors
+        propagate to every caller waiting on that build.
+        """
+        key = normalize_company(company)
+        entry, status = self._lookup(key, refresh)
+        if entry is not None:
+            if status == "stale" and self._start_refresh(key):
+                # A new thread starts with an empty context, so the rebuild
+                # streams no events into (and isn't traced as part of) this request
+                threading.Thread(target=self._refresh, args=(key, company, build), daemon=True).start()
+            return entry.report, status, entry.age
+
+        built = []
+
+        def run():
+            built.append(True)
+            return self._store(key, company, build())
+
+        report = self._flight.do(key, run)
+        return report, "built" if built else "coalesced", 0.0
+
+    def _refresh(self, key: str, company: str, build: Callable[[], Any]):
+        try:
+            self._flight.do(key, lambda: self._store(key, company, build()))
+        except Exception as e:
+            self.refresh_failures += 1
+            print(f"Background refresh of the '{company}' report failed, keeping the stale one: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def aget(
+        self, company: str, abuild: Callable[[], Awaitable[Any]], refresh: bool = False
+    ) -> Tuple[Any, str, float]:
+        """get() for coroutines: abuild() is awaited and stale reports are refreshed in a task."""
+        key = normalize_company(company)
+        entry, status = self._lookup(key, refresh)
+        if entry is not None:
+            if status == "stale" and self._start_refresh(key):
+                # An empty context, for the same reason as the thread in get()
+                task = contextvars.Context().run(
+                    asyncio.get_running_loop().create_task, self._arefresh(key, company, abuild)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry.report, status, entry.age
+
+        built = []
+
+        async def run():
+            built.append(True)
+            return self._store(key, company, await abuild())
+
+        report = await self._aflight.do(key, run)
+        return report, "built" if built else "coalesced", 0.0
+
+    async def _arefresh(self, key: str, company: str, abuild: Callable[[], Awaitable[Any]]):
+        async def run():
+            return self._store(key, company, await abuild())
+
+        try:
+            await self._aflight.do(key, run)
+        except Exception as e:
+            self.refresh_failures += 1
+            print(f"Background refresh of the '{company}' report failed, keeping the stale one: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        return {
+            "reports": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "coalesced": self._flight.coalesced + self._aflight.coalesced,
+            "builds": self.builds,
+            "refresh_failures": self.refresh_failures,
+            "rejected": self.rejected,
+        }
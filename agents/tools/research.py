@@ -1,144 +1,453 @@
+import asyncio
+import json
+import weakref
+import httpx
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from urllib.parse import urlparse
 from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import DuckDuckGoSearchException, RatelimitException, TimeoutException
+
+from agents.tools.dedup import NearDuplicateIndex
+from agents.tools.fanout import run_concurrently
+from agents.tools.fetcher import AsyncPageFetcher, PageFetcher, SkippedContent
+from agents.tools.frontier import CRAWL_ORDERS, CrawlFrontier, internal_links
+from agents.tools.html_extract import HTML_BACKENDS, ParsedPage, parse_html
+from agents.tools.page_cache import PageCache, normalize_url
+from agents.tools.rate_limit import FATAL, RETRY, THROTTLE, CircuitOpenError, rate_limits
+from agents.tools.scrape_cache import ScrapeCache
+from agents.tools.singleflight import SingleFlight
+from agents.tools.tokens import TextBudget
+from agents.tools.tracing import current_span, span
+
+# Common headers dict with a User-Agent to mimic a browser.
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/58.0.3029.110 Safari/537.36"
+    )
+}
+
+def search_error_kind(error: BaseException):
+    """How the rate limiter treats a failed DuckDuckGo search."""
+    if isinstance(error, RatelimitException):
+        return THROTTLE, None
+    if isinstance(error, (TimeoutException, DuckDuckGoSearchException)):
+        return RETRY, None
+    return FATAL, None
+
+
+# Page cache for the report currently being gathered. Context-local so that
+# concurrent reports on a shared ResearchAgent never see each other's pages.
+_page_cache: ContextVar[Optional[PageCache]] = ContextVar("page_cache", default=None)
 
 class ResearchAgent:
     """
     ResearchAgent performs web searches and scrapes content for a given company.
-    It uses DuckDuckGo search to find relevant links, then requests+BeautifulSoup
-    to fetch and parse pages, and crawls internally up to 2 levels for more info.
+    It uses DuckDuckGo search to find relevant links, then requests to fetch
+    pages and a single-pass extractor (or BeautifulSoup, see html_backend) to
+    parse them, and crawls internally up to 2 levels for more info.
+    Pages on the same crawl level are downloaded concurrently through a pooled
+    PageFetcher. Search results and pages are kept in a persistent ScrapeCache
+    (configured from the environment unless one is passed in).
+
+    The a-prefixed methods (asearch, afetch_parsed, acrawl_site,
+    aget_company_info, ...) do the same work on an asyncio event loop, using
+    an AsyncPageFetcher with the same settings as the fetcher.
     """
 
-    def __init__(self):
-        # Define a common headers dict with a User-Agent to mimic a browser.
-        self.headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/58.0.3029.110 Safari/537.36"
-            )
-        }
+    def __init__(
+        self,
+        fetcher: Optional[PageFetcher] = None,
+        text_budget: int = 5000,
+        budget_unit: str = "chars",
+        scrape_cache: Optional[ScrapeCache] = None,
+        html_backend: str = "stream",
+        crawl_order: str = "level",
+    ):
+        if html_backend not in HTML_BACKENDS:
+            raise ValueError(f"Unknown HTML backend '{html_backend}', expected one of {HTML_BACKENDS}")
+        if crawl_order not in CRAWL_ORDERS:
+            raise ValueError(f"Unknown crawl order '{crawl_order}', expected one of {CRAWL_ORDERS}")
+        self.html_backend = html_backend
+        # Order in which crawl_site visits discovered links (see CrawlFrontier)
+        self.crawl_order = crawl_order
+        self.headers = dict(DEFAULT_HEADERS)
+        if scrape_cache is None:
+            scrape_cache = fetcher.cache if fetcher else ScrapeCache.from_env()
+        self.scrape_cache = scrape_cache
+        self.fetcher = fetcher or PageFetcher(headers=self.headers, cache=self.scrape_cache)
+        # httpx clients are bound to an event loop, so one async fetcher per loop
+        self._async_fetchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPageFetcher]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Identical searches running at the same time (e.g. two sessions
+        # analyzing the same company) share one DuckDuckGo request
+        self._inflight_searches = SingleFlight()
+        # Size limit for each of the Wikipedia and website texts, in budget_unit
+        # ("chars" or "tokens")
+        self.text_budget = text_budget
+        self.budget_unit = budget_unit
 
     def search(self, query: str, max_results: int = 5):
         """
         Perform a web search for the given query using DuckDuckGo.
         Returns a list of result dicts with keys 'title', 'href', etc.
         """
+        key = (query.strip().lower(), max_results)
+        # _search records the cache status; joiners of an identical search keep "coalesced"
+        with span("search", "search", query=query, cache="coalesced") as search_span:
+            results = self._inflight_searches.do(key, lambda: self._search(query, max_results))
+            search_span.set(results=len(results))
+        return results
+
+    async def asearch(self, query: str, max_results: int = 5):
+        """search() for coroutines. DuckDuckGo search is blocking, so it runs in a worker thread."""
+        return await asyncio.to_thread(self.search, query, max_results)
+
+    def _search(self, query: str, max_results: int):
+        cache = self.scrape_cache
+        key = f"search:{max_results}:{query.strip().lower()}"
+        entry = cache.get(key) if cache else None
+        if entry and (entry.fresh or cache.offline):
+            current_span().set(cache="hit" if entry.fresh else "offline")
+            return json.loads(entry.value)
+        if cache and cache.offline:
+            print(f"Offline mode: no cached search results for '{query}'")
+            return []
+
+        current_span().set(cache="miss")
         try:
-            ddgs = DDGS()
-            results = ddgs.text(query, max_results=max_results)
+            # Rate limited, retried with backoff and cut off by a circuit
+            # breaker across every agent in the process
+            results = rate_limits.get("duckduckgo").call(
+                lambda: DDGS().text(query, max_results=max_results), search_error_kind
+            )
         except Exception as e:
             print(f"Search failed for query '{query}': {e}")
             return []
-        return results or []
+        results = results or []
+        if cache and results:
+            cache.put(key, json.dumps(results).encode("utf-8"), cache.search_ttl)
+        return results
+
+    @contextmanager
+    def page_cache_scope(self):
+        """
+        Share one PageCache across every fetch made inside the block, so a URL
+        is downloaded and parsed at most once. Nested scopes reuse the outer cache.
+        """
+        cache = _page_cache.get()
+        if cache is not None:
+            yield cache
+            return
+        cache = PageCache()
+        token = _page_cache.set(cache)
+        try:
+            yield cache
+        finally:
+            _page_cache.reset(token)
 
     def fetch_page(self, url: str):
         """
         Fetch a page URL and return a BeautifulSoup object of its HTML.
         Returns None if the request fails or content is not HTML.
         """
+        html = self._download(url)
+        if html is None:
+            return None
+        return BeautifulSoup(html, "html.parser")
+
+    def fetch_parsed(self, url: str) -> Optional[ParsedPage]:
+        """
+        Fetch a page URL and return its text blocks and links as a ParsedPage,
+        parsed with the agent's html_backend. Returns None if the request fails
+        or content is not HTML. Inside page_cache_scope the result is memoized
+        by normalized URL.
+        """
+        cache = _page_cache.get()
+        if cache is None:
+            return self._fetch_parsed(url)
+        return cache.get_or_load(url, self._fetch_parsed)
+
+    def _fetch_parsed(self, url: str) -> Optional[ParsedPage]:
+        html = self._download(url)
+        if html is None:
+            return None
+        with span("parse", "parse", url=url, backend=self.html_backend, chars=len(html)) as parse_span:
+            page = parse_html(html, self.html_backend)
+            parse_span.set(blocks=len(page.blocks), links=len(page.links))
+        return page
+
+    def async_fetcher(self) -> AsyncPageFetcher:
+        """The AsyncPageFetcher for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        fetcher = self._async_fetchers.get(loop)
+        if fetcher is None:
+            fetcher = self._async_fetchers[loop] = AsyncPageFetcher.like(self.fetcher)
+        return fetcher
+
+    async def afetch_parsed(self, url: str) -> Optional[ParsedPage]:
+        """fetch_parsed() for coroutines."""
+        cache = _page_cache.get()
+        if cache is None:
+            return await self._afetch_parsed(url)
+        return await cache.aget_or_load(url, self._afetch_parsed)
+
+    async def _afetch_parsed(self, url: str) -> Optional[ParsedPage]:
+        html = await self._adownload(url)
+        if html is None:
+            return None
+        # Parsing is CPU work; keep it off the event loop
+        with span("parse", "parse", url=url, backend=self.html_backend, chars=len(html)) as parse_span:
+            page = await asyncio.to_thread(parse_html, html, self.html_backend)
+            parse_span.set(blocks=len(page.blocks), links=len(page.links))
+        return page
+
+    async def _adownload(self, url: str) -> Optional[str]:
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()  # raise HTTPError for bad status
-        except requests.RequestException as e:
+            response = await self.async_fetcher().get(url)
+        except SkippedContent as e:
+            print(e)
+            return None
+        except (httpx.HTTPError, CircuitOpenError) as e:
             print(f"Request failed for URL '{url}': {e}")
             return None
 
-        # Only proceed if the content type is HTML
-        content_type = response.headers.get("Content-Type", "")
-        if "html" not in content_type:
-            print(f"Skipping non-HTML content at '{url}' (Content-Type: {content_type})")
+        return response.text
+
+    def _download(self, url: str) -> Optional[str]:
+        """Return the HTML of a page, or None on failure or non-HTML content."""
+        try:
+            # raises HTTPError for bad status, SkippedContent for non-HTML or oversized pages
+            response = self.fetcher.get(url)
+        except SkippedContent as e:
+            print(e)
+            return None
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f"Request failed for URL '{url}': {e}")
             return None
 
-        # Parse and return the BeautifulSoup object
-        soup = BeautifulSoup(response.text, "html.parser")
-        return soup
+        return response.text
+
+    def fetch_pages(self, urls: List[str]) -> List[Optional[ParsedPage]]:
+        """
+        Fetch several URLs concurrently (bounded by the fetcher's connection pool).
+        Returns one ParsedPage or None per URL, in input order.
+        """
+        return run_concurrently(
+            [lambda url=url: self.fetch_parsed(url) for url in urls],
+            max_workers=self.fetcher.max_connections,
+        )
+
+    async def afetch_pages(self, urls: List[str]) -> List[Optional[ParsedPage]]:
+        """fetch_pages() for coroutines; concurrency is bounded by the async fetcher."""
+        return list(await asyncio.gather(*(self.afetch_parsed(url) for url in urls)))
 
-    def extract_text(self, soup: BeautifulSoup):
+    def extract_text(
+        self,
+        soup,
+        budget: Optional[int] = None,
+        budget_unit: str = "chars",
+        seen: Optional[NearDuplicateIndex] = None,
+    ):
         """
-        Extract and concatenate text from the parsed HTML soup.
+        Extract and concatenate text from the parsed HTML soup (or a ParsedPage).
         We pull text from <h1>, <h2>, <h3>, and <p> tags for relevance.
+        With a budget, extraction stops once that much text is collected.
+        With `seen`, blocks repeating (or nearly repeating) text already in the
+        index are skipped and new ones are added to it.
         """
+        if isinstance(soup, ParsedPage):
+            blocks = soup.blocks
+        else:
+            blocks = (tag.get_text().strip() for tag in soup.find_all(['h1', 'h2', 'h3', 'p']))
+        text_budget = TextBudget(budget, budget_unit) if budget is not None else None
         texts = []
-        for tag in soup.find_all(['h1', 'h2', 'h3', 'p']):
-            content = tag.get_text().strip()
+        for content in blocks:
             # Only include non-empty and reasonably long text
             if content and len(content) > 20:
+                if seen is not None and seen.seen(content):
+                    continue
+                if text_budget:
+                    content = text_budget.take(content if not texts else "\n" + content).lstrip("\n")
                 texts.append(content)
+                if text_budget and text_budget.full:
+                    break
         return "\n".join(texts)
 
-    def crawl_site(self, base_url: str, max_depth: int = 1):
+    def crawl_site(
+        self,
+        base_url: str,
+        max_depth: int = 1,
+        budget: Optional[int] = None,
+        budget_unit: str = "chars",
+        order: Optional[str] = None,
+    ):
         """
         Crawl the given base URL up to max_depth levels of internal links.
         Returns the concatenated text content from all visited pages.
         Only follows links on the same domain and avoids irrelevant pages.
+
+        Links are visited in `order` (default: the agent's crawl_order): by
+        default level by level, most relevant (by include-keyword score)
+        first; each normalized URL is fetched at most once. With a budget
+        (characters or tiktoken tokens), the crawl stops fetching as soon as
+        that much text has been gathered.
+
+        Headers, footers, banners and taglines repeated across pages are kept
+        only once: each page contributes just the paragraphs that are neither
+        exact nor near duplicates (MinHash) of text already collected, so the
+        budget goes to new content.
         """
-        parsed = urlparse(base_url)
-        base_domain = parsed.netloc
-        visited = set()
+        crawl = self._crawl(base_url, max_depth, budget, budget_unit, order or self.crawl_order)
+        try:
+            batch = next(crawl)
+            while True:
+                batch = crawl.send(self.fetch_pages(batch))
+        except StopIteration as done:
+            return done.value
+
+    async def acrawl_site(
+        self,
+        base_url: str,
+        max_depth: int = 1,
+        budget: Optional[int] = None,
+        budget_unit: str = "chars",
+        order: Optional[str] = None,
+    ):
+        """crawl_site() for coroutines."""
+        crawl = self._crawl(base_url, max_depth, budget, budget_unit, order or self.crawl_order)
+        try:
+            batch = next(crawl)
+            while True:
+                batch = crawl.send(await self.afetch_pages(batch))
+        except StopIteration as done:
+            return done.value
+
+    def _crawl(self, base_url: str, max_depth: int, budget: Optional[int], budget_unit: str, order: str):
+        """
+        The crawl as a generator, shared by crawl_site and acrawl_site: yields
+        each batch of URLs to fetch, is sent back their pages (ParsedPage or
+        None, in order) and returns the concatenated text.
+        """
+        base_domain = urlparse(base_url).netloc
         content_parts = []
+        text_budget = TextBudget(budget, budget_unit) if budget is not None else None
+        seen = NearDuplicateIndex()
+        frontier = CrawlFrontier(order)
+        frontier.push(base_url, normalize_url(base_url), 0)
+
+        # Without a budget a whole level is fetched at once. With one, fetch
+        # in small batches so we stop downloading once it's filled; every
+        # link is on the same host, so the per-host cap is the effective
+        # concurrency anyway.
+        batch_size = None if text_budget is None else max(1, self.fetcher.per_host_limit)
+        while frontier:
+            batch = frontier.pop_batch(batch_size)
+            pages = yield [url for url, _ in batch]
+            for (url, depth), page in zip(batch, pages):
+                if page is None:
+                    continue
+
+                # Accumulate the text this page adds to what earlier pages said
+                page_text = self.extract_text(page, seen=seen)
+                if page_text:
+                    part = f"Content from {url}:\n{page_text}\n"
+                    if content_parts:
+                        part = "\n" + part
+                    content_parts.append(text_budget.take(part) if text_budget else part)
+                    if text_budget and text_budget.full:
+                        self._log_repeats(base_url, seen)
+                        return "".join(content_parts)
 
-        queue = [(base_url, 0)]
-        while queue:
-            url, depth = queue.pop(0)
-            if url in visited or depth > max_depth:
-                continue
-            visited.add(url)
-
-            soup = self.fetch_page(url)
-            if soup is None:
-                continue
-
-            # Extract and accumulate text content from this page
-            page_text = self.extract_text(soup)
-            content_parts.append(f"Content from {url}:\n{page_text}\n")
-
-            # If we haven't reached max depth, enqueue relevant internal links
-            if depth < max_depth:
-                for a in soup.find_all('a', href=True):
-                    href = a['href']
-                    full_url = urljoin(base_url, href)
-                    parsed_href = urlparse(full_url)
-
-                    # Ensure it's the same domain (no external links)
-                    if parsed_href.netloc != base_domain:
-                        continue
-                    # Skip if already visited or pointing to a fragment or script
-                    if full_url in visited or full_url.startswith('#'):
-                        continue
-
-                    href_lower = full_url.lower()
-                    text_lower = (a.get_text() or "").lower()
-
-                    # Skip common irrelevant or sensitive links
-                    if any(kw in href_lower for kw in [
-                        '.pdf', '.jpg', '.jpeg', '.png', '.gif', 'mailto:', 'javascript:'
-                    ]):
-                        continue
-                    if any(kw in href_lower for kw in [
-                        'login', 'signup', 'register', 'job', 'career', 'privacy', 'terms', 'subscribe', 'contact'
-                    ]):
-                        continue
-
-                    # Only follow links that likely contain relevant info
-                    include_keywords = [
-                        'about', 'team', 'history', 'company', 'leadership',
-                        'product', 'service', 'news', 'press', 'blog'
-                    ]
-                    if any(kw in href_lower or kw in text_lower for kw in include_keywords):
-                        queue.append((full_url, depth + 1))
-
-        return "\n".join(content_parts)
+                # If we haven't reached max depth, enqueue relevant internal links
+                if depth < max_depth:
+                    for link, key, score in internal_links(page.links, url, base_domain):
+                        frontier.push(link, key, depth + 1, score)
+
+        self._log_repeats(base_url, seen)
+        return "".join(content_parts)
+
+    @staticmethod
+    def _log_repeats(base_url: str, seen: NearDuplicateIndex):
+        if seen.exact_hits or seen.near_hits:
+            print(
+                f"Crawl of {base_url}: skipped {seen.exact_hits} repeated and "
+                f"{seen.near_hits} near-duplicate paragraphs"
+            )
 
     def get_company_info(self, company_name: str):
         """
         High-level method to search for a company and gather information.
-        Returns a dict with scraped text from the company website and Wikipedia.
+        Returns a dict with scraped text from the company website and Wikipedia,
+        plus the page cache hit/miss counts under 'page_cache'.
         """
+        with self.page_cache_scope() as cache:
+            info = self._gather_company_info(company_name)
+        info['page_cache'] = cache.stats()
+        print(f"Page cache for '{company_name}': {cache.hits} hits, {cache.misses} misses")
+        return info
+
+    async def aget_company_info(self, company_name: str):
+        """get_company_info() for coroutines."""
+        with self.page_cache_scope() as cache:
+            info = await self._agather_company_info(company_name)
+        info['page_cache'] = cache.stats()
+        print(f"Page cache for '{company_name}': {cache.hits} hits, {cache.misses} misses")
+        return info
+
+    def _gather_company_info(self, company_name: str):
         results = self.search(company_name, max_results=10)
+        wiki_url, official_url = self._pick_urls(results)
+
+        # Fetch Wikipedia and the official site's main page concurrently
+        urls = [url for url in (wiki_url, official_url) if url]
+        pages = dict(zip(urls, self.fetch_pages(urls)))
+        info = {}
+
+        # Scrape Wikipedia content
+        if wiki_url and pages.get(wiki_url):
+            info['wikipedia'] = self.extract_text(
+                pages[wiki_url], budget=self.text_budget, budget_unit=self.budget_unit
+            )
+
+        # Scrape the official site (and internal links up to depth 1 or 2).
+        # The crawl starts from the main page, which is served from the page
+        # cache rather than re-fetched.
+        if official_url and pages.get(official_url):
+            info['website'] = self.crawl_site(
+                official_url, max_depth=1, budget=self.text_budget, budget_unit=self.budget_unit
+            )
+
+        return info
+
+    async def _agather_company_info(self, company_name: str):
+        results = await self.asearch(company_name, max_results=10)
+        wiki_url, official_url = self._pick_urls(results)
+
+        urls = [url for url in (wiki_url, official_url) if url]
+        pages = dict(zip(urls, await self.afetch_pages(urls)))
         info = {}
 
+        if wiki_url and pages.get(wiki_url):
+            info['wikipedia'] = self.extract_text(
+                pages[wiki_url], budget=self.text_budget, budget_unit=self.budget_unit
+            )
+        if official_url and pages.get(official_url):
+            info['website'] = await self.acrawl_site(
+                official_url, max_depth=1, budget=self.text_budget, budget_unit=self.budget_unit
+            )
+
+        return info
+
+    @staticmethod
+    def _pick_urls(results):
+        """(Wikipedia URL, official site URL) from search results; either may be None."""
         # Find Wikipedia link if present
         wiki_url = None
         for result in results:
@@ -155,22 +464,4 @@ class ResearchAgent:
                 official_url = href
                 break
 
-        # Scrape Wikipedia content
-        if wiki_url:
-            soup = self.fetch_page(wiki_url)
-            if soup:
-                text = self.extract_text(soup)
-                info['wikipedia'] = text[:5000]
-
-        # Scrape the official site (and internal links up to depth 1 or 2)
-        if official_url:
-            official_soup = self.fetch_page(official_url)
-            if official_soup:
-                # Combine main page content
-                main_text = self.extract_text(official_soup)
-                # Crawl one level deep for more content
-                internal_text = self.crawl_site(official_url, max_depth=1)
-                combined = f"{main_text}\n\n{internal_text}"
-                info['website'] = combined[:5000]
-
-        return info
\ No newline at end of file
+        return wiki_url, official_url
@@ -0,0 +1,173 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "scrape_cache.sqlite3")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    value: bytes
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_type: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def to_response(self, url: str) -> requests.Response:
+        """Rebuild a 200 requests.Response from a cached page body."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = self.value
+        response.headers = CaseInsensitiveDict()
+        if self.content_type:
+            response.headers["Content-Type"] = self.content_type
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+
+def max_age(response: requests.Response) -> Optional[float]:
+    """
+    Freshness lifetime a response allows itself via Cache-Control, if any.
+    0 (no-cache, max-age=0) still lets it be stored, to be revalidated before reuse.
+    """
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+def storable(response: requests.Response) -> bool:
+    """Whether a response may be cached at all (not Cache-Control: no-store)."""
+    return "no-store" not in response.headers.get("Cache-Control", "").lower()
+
+
+class ScrapeCache:
+    """
+    Persistent SQLite cache for search results and fetched pages.
+
+    Entries carry their own TTL plus the ETag/Last-Modified validators of the
+    response, so stale pages can be revalidated with a conditional GET instead
+    of downloaded again. Total size is capped, least recently used entries are
+    evicted first. In offline mode, callers serve whatever is cached (stale or
+    not) and never touch the network.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = 200 * 1024 * 1024,
+        page_ttl: float = 24 * 3600,
+        search_ttl: float = 6 * 3600,
+        offline: bool = False,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.page_ttl = page_ttl
+        self.search_ttl = search_ttl
+        self.offline = offline
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries (accessed_at)")
+
+    @classmethod
+    def from_env(cls) -> Optional["ScrapeCache"]:
+        """
+        Build the cache from SCRAPE_CACHE_PATH (set to "off" to disable) and
+        SCRAPE_CACHE_OFFLINE (1/true to replay from the cache only).
+        """
+        path = os.getenv("SCRAPE_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if path.strip().lower() in ("", "off", "none", "0"):
+            return None
+        offline = os.getenv("SCRAPE_CACHE_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+        return cls(path=path, offline=offline)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up an entry (fresh or stale) and mark it as recently used."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at, etag, last_modified, content_type FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(key, *row)
+
+    def put(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ):
+        """Store an entry for `ttl` seconds, then evict LRU entries over the size cap."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, value, etag, last_modified, content_type, now + ttl, now, len(value)),
+            )
+            self._evict()
+
+    def touch(self, key: str, ttl: float):
+        """Extend an entry's freshness after a successful revalidation (304)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (now + ttl, now, key),
+            )
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    function, everyone who asks for the same key while it is in flight waits
+    for and receives the same result (or exception). Nothing is cached after
+    the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines: concurrent awaits of the same key on one event
+    loop share a single run of the coroutine function. Calls on different loops
+    are never coalesced, so one instance can be shared process-wide.
+
+    The run is a task owned by the flight, so a caller that is cancelled only
+    stops waiting; the others still get the result. The run is cancelled once
+    every caller waiting on it has been.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        flight = self._inflight.get(slot)
+        if flight is None:
+            flight = self._inflight[slot] = _Flight(loop.create_task(fn()))
+            flight.task.add_done_callback(lambda task, flight=flight: self._landed(slot, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Every caller gave up: stop the run, and don't let a new caller join it
+                self._forget(slot, flight)
+                flight.task.cancel()
+
+    def _forget(self, slot, flight: _Flight):
+        if self._inflight.get(slot) is flight:
+            del self._inflight[slot]
+
+    def _landed(self, slot, flight: _Flight):
+        self._forget(slot, flight)
+        if not flight.task.cancelled():
+            flight.task.exception()  # don't warn about it when nobody was left waiting
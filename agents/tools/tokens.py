@@ -0,0 +1,78 @@
+from functools import lru_cache
+
+import tiktoken
+
+
+# Rough characters-per-token ratio for English text, used when the tiktoken
+# encoding files can't be loaded (e.g. no network on first use).
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Number of tokens `text` takes up for the given OpenAI model."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """Cut `text` down to at most `max_tokens` tokens."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max(0, max_tokens) * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(0, max_tokens)])
+
+
+class TextBudget:
+    """
+    Running size budget for gathered text, measured in characters or tokens.
+    take() hands back as much of each piece as still fits.
+    """
+
+    def __init__(self, limit: int, unit: str = "chars", model: str = "gpt-4"):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown budget unit: {unit}")
+        self.limit = limit
+        self.unit = unit
+        self.model = model
+        self.used = 0
+
+    def size(self, text: str) -> int:
+        return len(text) if self.unit == "chars" else count_tokens(text, self.model)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used)
+
+    @property
+    def full(self) -> bool:
+        return self.used >= self.limit
+
+    def take(self, text: str) -> str:
+        """Consume budget for `text`, truncating it if it doesn't fully fit."""
+        size = self.size(text)
+        if size > self.remaining:
+            if self.unit == "chars":
+                text = text[:self.remaining]
+            else:
+                text = truncate_to_tokens(text, self.remaining, self.model)
+            self.used = self.limit
+            return text
+        self.used += size
+        return text
@@ -0,0 +1,320 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+from agents.tools.usage import token_usage
+
+# USD per million (prompt, completion) tokens, used to estimate the cost of LLM spans
+MODEL_PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-3.5-turbo": (0.5, 1.5),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimated USD cost of a call, or None for models missing from MODEL_PRICES."""
+    # Dated variants (gpt-4o-2024-08-06) are priced like their longest known prefix
+    matches = [name for name in MODEL_PRICES if model == name or model.startswith(name + "-")]
+    if not matches:
+        return None
+    prompt_price, completion_price = MODEL_PRICES[max(matches, key=len)]
+    return round((prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6, 6)
+
+
+@dataclass
+class Span:
+    """
+    One timed operation in a trace. kind is "workflow", "stage", "search",
+    "fetch", "parse", "compact", "llm" or "throttle" (waiting on a rate
+    limit or a retry backoff); attributes carry what was measured (bytes,
+    prompt_tokens, completion_tokens, cost_usd, cache, ...).
+    """
+    name: str
+    kind: str
+    trace_id: str
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+    def to_otel(self) -> Dict[str, Any]:
+        """The span as an OTLP/JSON span record."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_CLIENT" if self.kind in ("search", "fetch", "llm") else "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otel_attribute("span.kind", self.kind)] + [
+                _otel_attribute(key, value) for key, value in self.attributes.items() if value is not None
+            ],
+            "status": {"code": "STATUS_CODE_ERROR" if self.status == "error" else "STATUS_CODE_OK"},
+        }
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class _NoopSpan:
+    """Stands in for a span when no trace is active, so call sites needn't check."""
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Collects the finished spans of one trace (thread-safe)."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-stage wall time plus totals per span kind, LLM tokens, cost, bytes downloaded and time throttled."""
+        with self._lock:
+            spans = list(self.spans)
+        kinds: Dict[str, Dict[str, float]] = {}
+        for span in spans:
+            totals = kinds.setdefault(span.kind, {"count": 0, "ms": 0.0})
+            totals["count"] += 1
+            totals["ms"] = round(totals["ms"] + span.duration_ms, 3)
+        llm = [span for span in spans if span.kind == "llm"]
+        fetches = [span for span in spans if span.kind == "fetch"]
+        root = next((span for span in spans if span.parent_id is None), None)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(root.duration_ms, 3) if root else None,
+            "stages": {span.name: round(span.duration_ms, 3) for span in spans if span.kind == "stage"},
+            "kinds": kinds,
+            "llm_calls": len(llm),
+            "llm_cache_hits": sum(1 for span in llm if span.attributes.get("cache") == "hit"),
+            "prompt_tokens": sum(span.attributes.get("prompt_tokens", 0) for span in llm),
+            "completion_tokens": sum(span.attributes.get("completion_tokens", 0) for span in llm),
+            "cost_usd": round(sum(span.attributes.get("cost_usd") or 0.0 for span in llm), 6),
+            "bytes_downloaded": sum(span.attributes.get("bytes", 0) for span in fetches),
+            "throttle_ms": kinds.get("throttle", {}).get("ms", 0.0),
+        }
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        """Flat span records, in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return [span.to_dict() for span in spans]
+
+    def to_otel(self, service_name: str = "company-analysis") -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ExportTraceServiceRequest body."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otel_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "agents.tools.tracing"},
+                    "spans": [span.to_otel() for span in spans],
+                }],
+            }]
+        }
+
+    def export(self, path: str, fmt: str = "otel"):
+        """Append the trace to a JSONL file, as OTLP/JSON ("otel") or flat span records ("json")."""
+        record = self.to_otel() if fmt == "otel" else {"trace_id": self.trace_id, "spans": self.to_json()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def export_from_env(tracer: Tracer):
+    """Append the trace to TRACE_EXPORT_PATH (as TRACE_EXPORT_FORMAT), if set."""
+    export_path = os.getenv("TRACE_EXPORT_PATH")
+    if export_path:
+        tracer.export(export_path, fmt=os.getenv("TRACE_EXPORT_FORMAT", "otel"))
+
+
+_tracer: ContextVar[Optional[Tracer]] = ContextVar("tracer", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_span(name: str, kind: str, tracer: Tracer, attributes: Dict[str, Any]) -> Span:
+    parent = _current_span.get()
+    return Span(
+        name, kind, tracer.trace_id, parent_id=parent.span_id if parent else None, attributes=attributes
+    )
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """
+    Time the block as a child of the current span, if a trace is active.
+    Yields the span (or a no-op stand-in) so the block can add attributes.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+    current = _new_span(name, kind, tracer, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = str(e)[:200]
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        tracer.record(current)
+
+
+def current_tracer() -> Optional[Tracer]:
+    """The active Tracer, or None outside trace()."""
+    return _tracer.get()
+
+
+def current_span():
+    """The innermost open span of the active trace, or a no-op stand-in."""
+    if _tracer.get() is None:
+        return NOOP_SPAN
+    return _current_span.get() or NOOP_SPAN
+
+
+class LLMSpanHandler(BaseCallbackHandler):
+    """Records every model run in the active trace as an "llm" span."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._open: Dict[UUID, Tuple[Span, Tracer]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]):
+        tracer = _tracer.get()
+        if tracer is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or ""
+        with self._lock:
+            self._open[run_id] = (_new_span("llm", "llm", tracer, {"model": model}), tracer)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        current, tracer = opened
+        prompt_tokens, completion_tokens = token_usage(response)
+        cached = any(
+            (generation.generation_info or {}).get("cached")
+            for generations in response.generations
+            for generation in generations
+        )
+        current.set(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cache="hit" if cached else "miss",
+            cost_usd=0.0 if cached else estimate_cost(current.attributes["model"], prompt_tokens, completion_tokens),
+        )
+        current.end_ns = time.time_ns()
+        tracer.record(current)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        current, tracer = opened
+        current.status = "error"
+        current.set(error=str(error)[:200])
+        current.end_ns = time.time_ns()
+        tracer.record(current)
+
+
+# LangChain attaches the handler held here to every model run in the context.
+_llm_span_handler: ContextVar[Optional[LLMSpanHandler]] = ContextVar("llm_span_handler", default=None)
+register_configure_hook(_llm_span_handler, inheritable=True)
+
+
+@contextmanager
+def trace(name: str = "workflow", **attributes):
+    """
+    Trace everything done inside the block (and threads or tasks copied from
+    it) under a root span `name`; yields the Tracer. Inside an active trace
+    this just opens a child span and yields the outer tracer.
+    """
+    tracer = _tracer.get()
+    if tracer is not None:
+        with span(name, "workflow", **attributes):
+            yield tracer
+        return
+    tracer = Tracer()
+    tracer_token = _tracer.set(tracer)
+    handler_token = _llm_span_handler.set(LLMSpanHandler())
+    try:
+        with span(name, "workflow", **attributes):
+            yield tracer
+    finally:
+        _llm_span_handler.reset(handler_token)
+        _tracer.reset(tracer_token)
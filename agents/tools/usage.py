@@ -0,0 +1,100 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+
+class UsageTracker(BaseCallbackHandler):
+    """
+    Callback handler that counts LLM calls, errors, prompt/completion tokens and
+    time spent waiting on the model. Trackers nest: everything recorded by an
+    inner tracker is also recorded by the one that was active around it.
+    """
+
+    # Cheap and lock-protected, so async runs call it directly on the event loop
+    run_inline = True
+
+    def __init__(self, parent: Optional["UsageTracker"] = None):
+        self.parent = parent
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_seconds = 0.0
+        self._started: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_tokens, completion_tokens = token_usage(response)
+        self._record(run_id, prompt_tokens, completion_tokens, error=False)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record(run_id, 0, 0, error=True)
+
+    def _record(self, run_id: Optional[UUID], prompt_tokens: int, completion_tokens: int, error: bool, elapsed: Optional[float] = None):
+        with self._lock:
+            start = self._started.pop(run_id, None)
+            if elapsed is None:
+                elapsed = time.perf_counter() - start if start is not None else 0.0
+            self.calls += 1
+            self.errors += int(error)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.llm_seconds += elapsed
+        if self.parent is not None:
+            self.parent._record(None, prompt_tokens, completion_tokens, error, elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.calls,
+            "llm_errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_seconds": round(self.llm_seconds, 3),
+        }
+
+
+def token_usage(response: LLMResult):
+    """(prompt_tokens, completion_tokens) reported for a model response, 0s if unknown."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+# LangChain attaches the tracker held here to every model run in the context.
+_tracker: ContextVar[Optional[UsageTracker]] = ContextVar("usage_tracker", default=None)
+register_configure_hook(_tracker, inheritable=True)
+
+
+@contextmanager
+def track_usage():
+    """Record usage of every LLM call made inside the block (and threads copied from it)."""
+    tracker = UsageTracker(parent=_tracker.get())
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
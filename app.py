@@ -1,8 +1,39 @@
+import json
+import os
+import time
+
 import streamlit as st
+from agents.registry import get_registry
+from agents.tools.jobs import JobQueue
+from agents.tools.llm import set_llm_concurrency
 from main import MasterAgent
 
-# Instantiate MasterAgent
-master_agent = MasterAgent()
+
+@st.cache_resource
+def get_shared_registry():
+    # LLM clients, HTTP connection pools and compiled graphs shared by all sessions
+    return get_registry()
+
+
+@st.cache_resource
+def get_master_agent():
+    # Built once per process instead of on every rerun
+    return MasterAgent(registry=get_shared_registry())
+
+
+@st.cache_resource
+def get_job_queue():
+    # Reports run on a worker pool, not in the script thread, and are kept in
+    # SQLite: a page reload (?job=<id>) picks a running or finished job up again.
+    # LLM requests in flight are capped across all jobs and sessions.
+    set_llm_concurrency(int(os.getenv("LLM_CONCURRENCY", 8)))
+    jobs = JobQueue.from_env(get_master_agent().run_job)
+    jobs.start()
+    return jobs
+
+
+master_agent = get_master_agent()
+job_queue = get_job_queue()
 
 # Custom CSS for styling
 st.markdown("""
@@ -50,6 +81,111 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+
+def render_analysis(analysis):
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("Analysis")
+
+    # Format analysis as bullet points
+    key_offerings = ''.join([f'- {item}\n' for item in analysis.get('key_offerings', [])])
+    strategic_focus = ''.join([f'- {item}\n' for item in analysis.get('strategic_focus', [])])
+    analysis_text = f"""
+    **Industry:** {analysis.get('industry', 'N/A')}\n\n
+    **Market Position:** {analysis.get('market_position', 'N/A')}\n\n
+    **Key Offerings:**
+    {key_offerings}\n\n
+    **Strategic Focus:**
+    {strategic_focus}
+    """
+    st.markdown(analysis_text)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def render_use_case(i, use_case):
+    with st.expander(f"Use Case {i}: {use_case.get('use_case', '')}", expanded=False):
+        st.markdown(f"**Market Trend:** {use_case.get('market_trend', 'N/A')}")
+        st.markdown("**Implementation Steps:**")
+        for j, step in enumerate(use_case.get('implementation_steps', []), 1):
+            st.markdown(f"{j}. {step}")
+
+
+def render_resource(i, resource):
+    with st.expander(f"Resource {i}: Implementation Details", expanded=False):
+        if resource.get('implementation_plan'):
+            st.markdown("**Implementation Plan:**")
+            for step in resource.get('implementation_plan', []):
+                st.markdown(f"**Step {step.get('step', '')}:** {step.get('description', '')}")
+
+        if resource.get('models'):
+            st.markdown("**Recommended Models:**")
+            for model in resource.get('models', []):
+                st.markdown(f"- [{model.get('name', '')}]({model.get('url', '')}) ({model.get('platform', '')})")
+
+        if resource.get('research_papers'):
+            st.markdown("**Research Papers:**")
+            for paper in resource.get('research_papers', []):
+                authors = ", ".join(paper.get('authors', []))
+                st.markdown(f"- **{paper.get('title', '')}** by {authors}  \n[{paper.get('url', '')}]")
+
+
+def render_timing(trace):
+    summary = trace["summary"]
+    with st.expander("Timing breakdown", expanded=False):
+        st.markdown(
+            f"**Total:** {summary['total_ms'] / 1000:.1f}s · "
+            f"**LLM calls:** {summary['llm_calls']} ({summary['llm_cache_hits']} cached) · "
+            f"**Tokens:** {summary['prompt_tokens']} in / {summary['completion_tokens']} out · "
+            f"**Est. cost:** ${summary['cost_usd']:.4f} · "
+            f"**Downloaded:** {summary['bytes_downloaded'] / 1024:.0f} KB · "
+            f"**Throttled:** {summary.get('throttle_ms', 0) / 1000:.1f}s"
+        )
+        st.markdown("**Stages**")
+        st.dataframe(
+            [{"stage": name, "seconds": round(ms / 1000, 2)} for name, ms in summary["stages"].items()],
+            hide_index=True,
+        )
+        st.markdown("**Spans**")
+        spans = trace["spans"]
+        origin = spans[0]["start_ns"] if spans else 0
+        st.dataframe(
+            [
+                {
+                    "kind": span["kind"],
+                    "name": span["attributes"].get("url") or span["attributes"].get("query") or span["name"],
+                    "start_s": round((span["start_ns"] - origin) / 1e9, 2),
+                    "duration_s": round(span["duration_ms"] / 1000, 3),
+                    "cache": span["attributes"].get("cache", ""),
+                    "bytes": span["attributes"].get("bytes"),
+                    "tokens": (span["attributes"].get("prompt_tokens", 0) + span["attributes"].get("completion_tokens", 0)) or None,
+                    "cost_usd": span["attributes"].get("cost_usd"),
+                    "status": span["status"],
+                }
+                for span in spans
+            ],
+            hide_index=True,
+        )
+        st.download_button(
+            "Download trace (OTLP JSON)",
+            data=json.dumps(trace["otel"], indent=2),
+            file_name=f"trace-{trace['trace_id']}.json",
+            mime="application/json",
+        )
+
+
+def format_age(seconds):
+    if seconds < 3600:
+        return f"{max(1, round(seconds / 60))} min"
+    if seconds < 48 * 3600:
+        return f"{round(seconds / 3600)} h"
+    return f"{round(seconds / 86400)} days"
+
+
+STAGE_LABELS = {
+    "research": "Researching the company...",
+    "use_cases": "Generating use cases...",
+    "resources": "Collecting resources...",
+}
+
 # Streamlit App
 st.markdown('<div class="title">Company Analysis App</div>', unsafe_allow_html=True)
 
@@ -59,64 +195,99 @@ if st.button("Check Server Health", key="health_check", help="Check if the serve
 
 # Input for Company Name
 company_name = st.text_input("Enter Company Name:")
+show_timing = st.checkbox("Show timing breakdown", help="Where the report spent its time: stages, fetches and LLM calls")
+force_refresh = st.checkbox("Build a fresh report", help="Ignore reports already built for this company in any session")
 
 # Analyze Company Button
 if st.button("Analyze Company", key="analyze", help="Click to analyze the company's data"):
     if company_name.strip() == "":
         st.markdown('<p class="error">Please enter a company name.</p>', unsafe_allow_html=True)
     else:
-        with st.spinner("Analyzing..."):
-            analysis, use_cases, resources = master_agent.execute_workflow(company_name)
-
-            # Display Results
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.subheader("Analysis")
-
-            # Format analysis as bullet points
-            analysis_text = f"""
-            **Industry:** {analysis.get('industry', 'N/A')}\n\n
-            **Market Position:** {analysis.get('market_position', 'N/A')}\n\n
-            **Key Offerings:**
-            {''.join([f'- {item}\\n' for item in analysis.get('key_offerings', [])])}\n\n
-            **Strategic Focus:**
-            {''.join([f'- {item}\\n' for item in analysis.get('strategic_focus', [])])}
-            """
-            st.markdown(analysis_text)
-            st.markdown('</div>', unsafe_allow_html=True)
-
-            # Use Cases Section
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.subheader("Use Cases")
-
-            for i, use_case in enumerate(use_cases, 1):
-                with st.expander(f"Use Case {i}: {use_case.get('use_case', '')}", expanded=False):
-                    st.markdown(f"**Market Trend:** {use_case.get('market_trend', 'N/A')}")
-                    st.markdown("**Implementation Steps:**")
-                    for j, step in enumerate(use_case.get('implementation_steps', []), 1):
-                        st.markdown(f"{j}. {step}")
-                        
-            st.markdown('</div>', unsafe_allow_html=True)
-
-            # Resources Section
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            st.subheader("Resources")
-
-            for i, resource in enumerate(resources, 1):
-                with st.expander(f"Resource {i}: Implementation Details", expanded=False):
-                    if resource.get('implementation_plan'):
-                        st.markdown("**Implementation Plan:**")
-                        for step in resource.get('implementation_plan', []):
-                            st.markdown(f"**Step {step.get('step', '')}:** {step.get('description', '')}")
-                    
-                    if resource.get('models'):
-                        st.markdown("**Recommended Models:**")
-                        for model in resource.get('models', []):
-                            st.markdown(f"- [{model.get('name', '')}]({model.get('url', '')}) ({model.get('platform', '')})")
-                    
-                    if resource.get('research_papers'):
-                        st.markdown("**Research Papers:**")
-                        for paper in resource.get('research_papers', []):
-                            authors = ", ".join(paper.get('authors', []))
-                            st.markdown(f"- **{paper.get('title', '')}** by {authors}  \n[{paper.get('url', '')}]")
-
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Reports are shared across sessions: a recent one is shown at once, and
+        # a company another session is already analyzing is built only once
+        st.query_params["job"] = job_queue.submit(company_name, refresh=force_refresh)
+
+with st.sidebar:
+    st.subheader("Recent reports")
+    for recent_job in job_queue.recent():
+        st.markdown(f"[{recent_job.company}](?job={recent_job.id}) · {recent_job.status}")
+
+job_id = st.query_params.get("job")
+job = job_queue.get(job_id) if job_id else None
+if job_id and job is None:
+    st.markdown('<p class="error">This report no longer exists.</p>', unsafe_allow_html=True)
+elif job is not None:
+    # Results are rendered as the job records them, polling the job store
+    status = st.status(f"Analyzing {job.company}...", expanded=True)
+    live_output = status.empty()
+    analysis_section = st.container()
+    use_case_section = st.container()
+    resource_section = st.container()
+    timing_section = st.container()
+
+    seq = 0
+    shown = False
+    resources_started = False
+    report_label = None
+    while True:
+        finished = job.finished
+        for seq, kind, data, meta in job_queue.events(job.id, after=seq):
+            if kind == "retry":
+                # The job's worker died and another one started it over: its
+                # earlier events are gone, so redraw the page from the new ones
+                if shown:
+                    st.rerun()
+                continue
+            shown = True
+
+            if kind == "stage":
+                status.update(label=STAGE_LABELS.get(data, "Analyzing..."))
+
+            elif kind == "live":
+                live_output.code(data, language=None)
+
+            elif kind == "analysis":
+                with analysis_section:
+                    render_analysis(data)
+
+            elif kind == "use_case":
+                with use_case_section:
+                    if meta["index"] == 0:
+                        st.subheader("Use Cases")
+                    render_use_case(meta["index"] + 1, data)
+
+            elif kind == "resources":
+                # Resources start arriving while use cases are still streaming,
+                # so this doesn't end the use-case stage's live output
+                if not resources_started:
+                    resources_started = True
+                    with resource_section:
+                        st.subheader("Resources")
+                with resource_section:
+                    render_resource(meta["index"] + 1, data)
+
+            elif kind == "report":
+                age = format_age(meta["age_s"])
+                report_label = {
+                    "fresh": f"Report built {age} ago",
+                    "stale": f"Report built {age} ago (a newer one is being built)",
+                    "coalesced": "Report built for another session just now",
+                }.get(data)
+
+            elif kind == "trace":
+                if show_timing:
+                    with timing_section:
+                        render_timing(data)
+
+        if finished:
+            break
+        if job.status == "queued":
+            status.update(label=f"Waiting for a free worker ({job_queue.counts()['queued']} reports queued)...")
+        time.sleep(1)
+        job = job_queue.get(job.id)
+
+    live_output.empty()
+    if job.status == "error":
+        status.update(label=f"Analysis failed: {job.error}", state="error", expanded=False)
+    else:
+        status.update(label=report_label or "Analysis complete", state="complete", expanded=False)
@@ -0,0 +1,210 @@
+"""
+Batch analysis: run the full workflow for a list of companies.
+
+    python batch.py companies.csv -o results.jsonl --workers 4 --llm-concurrency 8
+
+The input is a CSV (a "company" column, or the first column) or a JSONL file
+(objects with a "company" field, or plain strings). Each finished company is
+appended to the output JSONL right away, and the output doubles as the
+checkpoint: rerunning the same command skips companies that already have an
+"ok" record, so an interrupted sweep resumes where it stopped. Failed
+companies, including ones whose report came back incomplete (no analysis,
+use cases or resources), are recorded as errors and retried on the next run.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from agents.registry import ResourceRegistry
+from agents.research_agent import RESEARCH_MODES
+from agents.resource_agent import RESOURCE_MODES
+from agents.tools.fanout import run_concurrently
+from agents.tools.llm import set_llm_concurrency
+from agents.tools.report_store import incomplete_reason
+from agents.tools.tracing import export_from_env, trace
+from main import MasterAgent
+
+load_dotenv()
+
+
+def read_companies(path: str) -> List[str]:
+    """Company names from a CSV or JSONL file, in file order, without duplicates."""
+    names = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                names.append(item["company"] if isinstance(item, dict) else str(item))
+        else:
+            rows = list(csv.reader(f))
+            if rows and "company" in [cell.strip().lower() for cell in rows[0]]:
+                column = [cell.strip().lower() for cell in rows[0]].index("company")
+                rows = rows[1:]
+            else:
+                column = 0
+            names = [row[column] for row in rows if len(row) > column]
+
+    return list(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+
+def completed_companies(output_path: str) -> Set[str]:
+    """Companies that already have an "ok" record in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from an interrupted write
+            if record.get("status") == "ok":
+                done.add(record["company"])
+    return done
+
+
+class BatchRunner:
+    """
+    Runs MasterAgent.execute_workflow for many companies on a bounded pool of
+    workers. All workers share one registry, so LLM clients, the HTTP pool and
+    the caches are shared; HTTP and LLM concurrency are capped process-wide.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        llm_concurrency: Optional[int] = 8,
+        http_concurrency: int = 16,
+        company_timeout: Optional[float] = None,
+        resource_mode: str = "per_field",
+        research_mode: str = "direct",
+    ):
+        self.workers = workers
+        self.company_timeout = company_timeout
+        set_llm_concurrency(llm_concurrency)
+        self.registry = ResourceRegistry(http_concurrency=http_concurrency)
+        self.agent = MasterAgent(
+            registry=self.registry,
+            resource_mode=resource_mode,
+            research_mode=research_mode,
+        )
+
+    def analyze(self, company: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        tracer = None
+        try:
+            with trace("batch_item", company=company) as tracer:
+                analysis, use_cases, resources = self.agent.execute_workflow(company)
+        except Exception as e:
+            print(f"Workflow failed for '{company}': {e}")
+            if tracer is not None:
+                export_from_env(tracer)
+            return {
+                "company": company,
+                "status": "error",
+                "error": str(e),
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+        export_from_env(tracer)
+        record = {
+            "company": company,
+            "status": "ok",
+            "analysis": analysis,
+            "use_cases": use_cases,
+            "resources": resources,
+            "seconds": round(time.perf_counter() - start, 2),
+            "trace": tracer.summary(),
+        }
+        # Most stage failures come back as degraded output rather than raising;
+        # record those as errors too, so the next run retries the company
+        reason = incomplete_reason((analysis, use_cases, resources))
+        if reason:
+            print(f"Incomplete report for '{company}': {reason}")
+            record.update(status="error", error=f"incomplete report: {reason}")
+        return record
+
+    def run(self, companies: List[str], output_path: str) -> Dict[str, Any]:
+        """Analyze the companies not yet done in output_path, appending each result as it finishes."""
+        done = completed_companies(output_path)
+        pending = [company for company in companies if company not in done]
+        print(f"{len(companies)} companies: {len(done & set(companies))} already done, {len(pending)} to run")
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        counts = {"ok": 0, "error": 0}
+        start = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as out:
+
+            def write(index: int, record: Optional[Dict[str, Any]]):
+                if record is None:
+                    record = {
+                        "company": pending[index],
+                        "status": "error",
+                        "error": f"timed out after {self.company_timeout}s",
+                    }
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                counts[record["status"]] += 1
+                finished = counts["ok"] + counts["error"]
+                print(f"[{finished}/{len(pending)}] {record['company']}: {record['status']}")
+
+            run_concurrently(
+                [lambda company=company: self.analyze(company) for company in pending],
+                max_workers=self.workers,
+                timeout=self.company_timeout,
+                on_result=write,
+            )
+
+        elapsed = time.perf_counter() - start
+        finished = counts["ok"] + counts["error"]
+        return {
+            "companies": finished,
+            "ok": counts["ok"],
+            "errors": counts["error"],
+            "skipped": len(companies) - len(pending),
+            "seconds": round(elapsed, 1),
+            "companies_per_minute": round(finished / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file listing companies")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL results / checkpoint file")
+    parser.add_argument("--workers", type=int, default=4, help="companies analyzed concurrently")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="max LLM requests in flight (0 = unlimited)")
+    parser.add_argument("--http-concurrency", type=int, default=16, help="max HTTP requests in flight")
+    parser.add_argument("--timeout", type=float, default=None, help="per-company timeout in seconds")
+    parser.add_argument("--resource-mode", default="per_field", choices=RESOURCE_MODES)
+    parser.add_argument("--research-mode", default="direct", choices=RESEARCH_MODES)
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        http_concurrency=args.http_concurrency,
+        company_timeout=args.timeout,
+        resource_mode=args.resource_mode,
+        research_mode=args.research_mode,
+    )
+    summary = runner.run(read_companies(args.input), args.output)
+    print(
+        f"Finished {summary['companies']} companies ({summary['ok']} ok, {summary['errors']} failed, "
+        f"{summary['skipped']} skipped) in {summary['seconds']}s: "
+        f"{summary['companies_per_minute']} companies/min"
+    )
+
+
+if __name__ == "__main__":
+    main()
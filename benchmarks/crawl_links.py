@@ -0,0 +1,155 @@
+"""
+Micro-benchmark for crawl link selection on link-heavy pages.
+
+Compares the previous per-anchor filtering (keyword lists rebuilt and scanned
+with any() for every anchor, a plain list as the next level, sorted and
+de-duplicated when visited) with agents.tools.frontier (precompiled matchers,
+each href examined once per page, a CrawlFrontier that queues each
+normalized URL once). Also checks that both pick the same links and scores.
+Exits with status 1 if they differ.
+
+    python -m benchmarks.crawl_links
+    python -m benchmarks.crawl_links --anchors 20000 --pages 8 --repeat 5
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List, Tuple
+from urllib.parse import urljoin, urlparse
+
+from agents.tools.frontier import CRAWL_ORDERS, CrawlFrontier, internal_links
+from agents.tools.page_cache import normalize_url
+
+BASE_URL = "https://www.example-corp.test/"
+
+
+def synthetic_links(anchors: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """(href, anchor text) pairs like a large corporate homepage's: mostly repeated menu and product links."""
+    rng = random.Random(seed)
+    sections = ["about", "team", "products", "services", "news", "blog", "press", "history", "solutions", "docs"]
+    links = []
+    for i in range(anchors):
+        kind = rng.random()
+        section = rng.choice(sections)
+        if kind < 0.35:
+            href = f"/{section}/{rng.randrange(60)}?ref=home#s{rng.randrange(5)}"
+        elif kind < 0.5:
+            href = f"{section}#top"
+        elif kind < 0.6:
+            href = f"{BASE_URL}{section}/item-{rng.randrange(40)}"
+        elif kind < 0.7:
+            href = f"https://partner{rng.randrange(20)}.test/{section}"
+        elif kind < 0.78:
+            href = rng.choice(["/login", "/careers/open-roles", "/privacy", "/terms", "/contact", "/files/report.pdf"])
+        elif kind < 0.84:
+            href = rng.choice(["mailto:info@example-corp.test", "javascript:void(0)", "#", "#main"])
+        else:
+            href = f"/{section}"
+        links.append((href, f"{section.title()} link {i % 50}"))
+    return links
+
+
+def legacy_links(links, base_url: str, base_domain: str, visited: set):
+    """The previous ResearchAgent._internal_links, kept as the reference."""
+    result = []
+    for href, anchor_text in links:
+        full_url = urljoin(base_url, href)
+        parsed_href = urlparse(full_url)
+        if parsed_href.netloc != base_domain:
+            continue
+        if normalize_url(full_url) in visited or full_url.startswith('#'):
+            continue
+        href_lower = full_url.lower()
+        text_lower = anchor_text.lower()
+        if any(kw in href_lower for kw in ['.pdf', '.jpg', '.jpeg', '.png', '.gif', 'mailto:', 'javascript:']):
+            continue
+        if any(kw in href_lower for kw in [
+            'login', 'signup', 'register', 'job', 'career', 'privacy', 'terms', 'subscribe', 'contact'
+        ]):
+            continue
+        include_keywords = [
+            'about', 'team', 'history', 'company', 'leadership',
+            'product', 'service', 'news', 'press', 'blog'
+        ]
+        score = sum(1 for kw in include_keywords if kw in href_lower or kw in text_lower)
+        if score:
+            result.append((full_url, score))
+    return result
+
+
+def legacy_select(pages: List[List[Tuple[str, str]]]) -> List[Tuple[str, int]]:
+    """Links of one crawl level the old way: collect, sort by score, de-duplicate by normalized URL."""
+    base_domain = urlparse(BASE_URL).netloc
+    visited = {normalize_url(BASE_URL)}
+    level = []
+    for links in pages:
+        level.extend(legacy_links(links, BASE_URL, base_domain, visited))
+    selected = []
+    for url, score in sorted(level, key=lambda link: -link[1]):
+        key = normalize_url(url)
+        if key not in visited:
+            visited.add(key)
+            selected.append((key, score))
+    return selected
+
+
+def frontier_select(pages: List[List[Tuple[str, str]]], order: str) -> List[Tuple[str, int]]:
+    """The same level through internal_links and a CrawlFrontier."""
+    base_domain = urlparse(BASE_URL).netloc
+    frontier = CrawlFrontier(order)
+    frontier.push(BASE_URL, normalize_url(BASE_URL), 0)
+    frontier.pop_batch()
+    scores = {}
+    for links in pages:
+        for url, key, score in internal_links(links, BASE_URL, base_domain):
+            if frontier.push(url, key, 1, score):
+                scores[key] = score
+    return [(normalize_url(url), scores[normalize_url(url)]) for url, _ in frontier.pop_batch()]
+
+
+def best_time(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--anchors", type=int, default=5000, help="anchors per page")
+    parser.add_argument("--pages", type=int, default=4, help="pages whose links make up one crawl level")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    pages = [synthetic_links(args.anchors, seed) for seed in range(args.pages)]
+    reference = legacy_select(pages)
+    ok = True
+    for order in CRAWL_ORDERS:
+        candidate = frontier_select(pages, order)
+        if sorted(candidate) != sorted(reference):
+            ok = False
+            print(f"[{order}] selected links differ: {len(candidate)} vs {len(reference)} in the reference")
+    if frontier_select(pages, "level") != reference:
+        ok = False
+        print("[level] visiting order differs from the reference")
+
+    legacy_time = best_time(lambda: legacy_select(pages), args.repeat)
+    print(f"{args.pages} pages x {args.anchors} anchors -> {len(reference)} links to crawl\n")
+    print(f"{'implementation':<22}{'ms/level':>10}{'us/anchor':>11}{'speedup':>9}")
+    print(f"{'legacy':<22}{legacy_time * 1000:>10.2f}{legacy_time * 1e6 / (args.pages * args.anchors):>11.2f}{'':>9}")
+    for order in CRAWL_ORDERS:
+        elapsed = best_time(lambda: frontier_select(pages, order), args.repeat)
+        print(
+            f"{'frontier/' + order:<22}{elapsed * 1000:>10.2f}"
+            f"{elapsed * 1e6 / (args.pages * args.anchors):>11.2f}{legacy_time / elapsed:>8.1f}x"
+        )
+
+    print("\nParity OK" if ok else "\nParity FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
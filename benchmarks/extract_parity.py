@@ -0,0 +1,97 @@
+"""
+Parity check and timing for the HTML extraction backends.
+
+Parses each page with the reference BeautifulSoup backend and the single-pass
+"stream" backend (nav skipping off, so both see the same blocks), reports any
+difference in text blocks or links, and times both. Exits with status 1 if
+the outputs differ.
+
+    python -m benchmarks.extract_parity                  # synthetic pages
+    python -m benchmarks.extract_parity page1.html page2.html --repeat 20
+"""
+import argparse
+import sys
+import time
+
+from agents.tools.html_extract import parse_html
+
+# Markup the two backends have to agree on: nesting, unclosed tags, entities,
+# comments, scripts inside blocks and links with nested markup.
+EDGE_CASES = [
+    "<p>Hello <b>world</b> &amp; more</p><h1>Title</h1>",
+    "<div><p>outer <p>inner</p> tail</p></div>",
+    "<p>unclosed <div>in div</div> after",
+    "<nav><a href='/about'>About <span>us</span></a><p>nav para</p></nav><p>body <script>var x=1</script>text</p>",
+    "<p>a</div>b</p><a href=''>empty</a><a>no href</a><a href='/x'><p>para in link</p></a>",
+    "<p>one<!-- comment -->two</p><h2>x<br/>y<img src=a>z</h2>",
+    "<table><tr><td><p>cell</td></tr></table><p>after",
+    "<p>x</p></p></p><h3>&nbsp;&#169; copyright</h3><style>p {color: red}</style>",
+]
+
+
+def synthetic_page(sections: int = 400, links_per_section: int = 10) -> str:
+    """A large, link-heavy corporate-style page."""
+    parts = ["<html><head><script>var tracking = {};</script><style>body{}</style></head><body>"]
+    parts.append("<nav>" + "".join(f"<a href='/nav/{i}'>Nav item {i}</a>" for i in range(50)) + "</nav>")
+    for i in range(sections):
+        parts.append(f"<section><h2>Section {i} about our products and services</h2>")
+        parts.append(f"<p>Paragraph {i} with <b>bold</b>, <i>italic</i> and &amp; entities describing the company.</p>")
+        parts.append("<ul>" + "".join(
+            f"<li><a href='/products/{i}/{j}?ref=home#top'>Product <span>{j}</span></a></li>"
+            for j in range(links_per_section)
+        ) + "</ul></section>")
+    parts.append("<footer><p>Copyright 2024 Example Corp. All rights reserved.</p></footer></body></html>")
+    return "".join(parts)
+
+
+def compare(name: str, html: str) -> bool:
+    reference = parse_html(html, "bs4")
+    candidate = parse_html(html, "stream", skip_nav=False)
+    ok = True
+    if reference.blocks != candidate.blocks:
+        ok = False
+        print(f"[{name}] text blocks differ:\n  bs4:    {reference.blocks[:5]}\n  stream: {candidate.blocks[:5]}")
+    if reference.links != candidate.links:
+        ok = False
+        print(f"[{name}] links differ:\n  bs4:    {reference.links[:5]}\n  stream: {candidate.links[:5]}")
+    return ok
+
+
+def time_backend(html: str, backend: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_html(html, backend)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="HTML files to check (default: synthetic pages)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    pages = {}
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages[path] = f.read()
+    if not pages:
+        pages = {f"edge-case-{i}": html for i, html in enumerate(EDGE_CASES)}
+        pages["synthetic-large"] = synthetic_page()
+
+    all_ok = all([compare(name, html) for name, html in pages.items()])
+
+    print(f"\n{'page':<28}{'KB':>8}{'bs4 ms':>10}{'stream ms':>11}{'speedup':>9}")
+    for name, html in pages.items():
+        bs4_time = time_backend(html, "bs4", args.repeat)
+        stream_time = time_backend(html, "stream", args.repeat)
+        print(
+            f"{name[-28:]:<28}{len(html) / 1024:>8.1f}{bs4_time * 1000:>10.2f}"
+            f"{stream_time * 1000:>11.2f}{bs4_time / stream_time:>8.1f}x"
+        )
+
+    print("\nParity OK" if all_ok else "\nParity FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the model tiers on real OpenAI calls.
+
+Sends every per-field resource prompt (plan, datasets, models, papers) for
+the sample use cases to the model of each tier and reports, per tier and
+field: median and p95 latency, how often the reply was valid JSON for the
+field's schema as is ("clean") or after local repair ("valid"), the mean
+number of items, and the estimated cost per call. Replies are not re-asked,
+so validity is the model's own. The LLM cache is bypassed.
+
+Tier models come from LLM_FAST_* / LLM_STRONG_* (see agents/tools/model_tiers.py).
+
+    python -m benchmarks.model_tiers --rounds 2
+    python -m benchmarks.model_tiers --fields datasets models --json tiers.json
+"""
+import argparse
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from agents.registry import ResourceRegistry
+from agents.resource_agent import FIELD_PROMPTS, FIELD_SCHEMAS, RESOURCE_FIELDS, ResourceAgent
+from agents.tools.json_repair import JsonRecoveryError, load_json
+from agents.tools.model_tiers import TIERS
+from agents.tools.tracing import estimate_cost
+from agents.tools.usage import track_usage
+from benchmarks.resource_modes import SAMPLE_USE_CASES
+
+load_dotenv()
+
+
+def run_call(llm, prompt: str, field: str):
+    with track_usage() as usage:
+        start = time.perf_counter()
+        reply = llm.invoke(prompt).content
+        elapsed = time.perf_counter() - start
+    try:
+        value, repaired = load_json(reply, FIELD_SCHEMAS[field])
+        outcome, items = ("repaired" if repaired else "clean"), len(value)
+    except JsonRecoveryError:
+        outcome, items = "invalid", 0
+    return {
+        "seconds": elapsed,
+        "outcome": outcome,
+        "items": items,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+    }
+
+
+def summarize(rows, model: str):
+    seconds = sorted(row["seconds"] for row in rows)
+    prompt_tokens = statistics.mean(row["prompt_tokens"] for row in rows)
+    completion_tokens = statistics.mean(row["completion_tokens"] for row in rows)
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    return {
+        "calls": len(rows),
+        "median_s": round(statistics.median(seconds), 2),
+        "p95_s": round(seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))], 2),
+        "clean_rate": round(sum(row["outcome"] == "clean" for row in rows) / len(rows), 3),
+        "valid_rate": round(sum(row["outcome"] != "invalid" for row in rows) / len(rows), 3),
+        "mean_items": round(statistics.mean(row["items"] for row in rows), 1),
+        "cost_usd": round(cost, 5) if cost is not None else "n/a",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--fields", nargs="+", default=RESOURCE_FIELDS, choices=RESOURCE_FIELDS)
+    parser.add_argument("--use-cases", help="JSON file with a list of {use_case, market_trend} dicts")
+    parser.add_argument("--json", help="Write the summary to this file")
+    args = parser.parse_args()
+
+    use_cases = SAMPLE_USE_CASES
+    if args.use_cases:
+        with open(args.use_cases) as f:
+            use_cases = json.load(f)
+
+    registry = ResourceRegistry()
+    results = {}
+    for tier in TIERS:
+        llm = registry.tier_model(tier, 0.3, use_cache=False)
+        print(f"Running the {tier} tier ({llm.model_name}, {args.rounds} rounds, {len(use_cases)} use cases)...")
+        results[tier] = {"model": llm.model_name}
+        for field in args.fields:
+            rows = [
+                run_call(llm, FIELD_PROMPTS[field].format(**use_case), field)
+                for _ in range(args.rounds)
+                for use_case in use_cases
+            ]
+            results[tier][field] = summarize(rows, llm.model_name)
+
+    routed = ResourceAgent.LLM_TIERS
+    metrics = list(results[TIERS[0]][args.fields[0]])
+    for field in args.fields:
+        print(f"\n{field} (routed to {routed[field]})")
+        print(f"{'metric':<14}" + "".join(f"{tier:>14}" for tier in TIERS))
+        for metric in metrics:
+            print(f"{metric:<14}" + "".join(f"{results[tier][field][metric]:>14}" for tier in TIERS))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Offline benchmark suite for the full pipeline.
+
+Replays recorded search results, pages and LLM replies (benchmarks/fixtures)
+through a local HTTP server and a fake ChatOpenAI, with configurable injected
+latency, so runs are repeatable and never touch the network. Measures:
+
+- workflow: end-to-end and per-stage latency of MasterAgent.execute_workflow
+- throughput: workflows/min with N concurrent workflows (threads, or one
+  event loop with --async)
+- report_store: N sessions asking for one company at once (one shared
+  build), and a repeat request served from the report store
+- crawl_site / extract_text: latency of the scraper on the recorded site
+- memory: peak Python allocations (tracemalloc) of each of the above
+
+Results can be saved as a baseline and later runs compared against it; any
+metric worse than the baseline by more than --tolerance is flagged and the
+script exits with status 1.
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --concurrency 8 --llm-latency 0.5 --save-baseline
+    python -m benchmarks.pipeline --async --json results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from agents.tools.fanout import run_concurrently
+from agents.tools.html_extract import parse_html
+from agents.tools.rate_limit import rate_limits
+from agents.tools.tracing import trace
+from benchmarks.replay import FixtureServer, Fixtures, ReplayRegistry, company_name
+from main import MasterAgent
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Silence the pipeline's progress prints while measuring."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def peak_memory_mb(fn: Callable[[], Any]) -> float:
+    """Peak traced Python memory while fn runs, in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_workflow(agent: MasterAgent, rounds: int) -> Dict[str, float]:
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    for i in range(rounds):
+        with trace("benchmark") as tracer:
+            start = time.perf_counter()
+            agent.execute_workflow(company_name(1000 + i))
+            totals.append(time.perf_counter() - start)
+        for name, ms in tracer.summary()["stages"].items():
+            stages.setdefault(name, []).append(ms / 1000)
+    metrics = {"workflow.total_s": statistics.median(totals)}
+    for name, values in stages.items():
+        metrics[f"workflow.{name}_s"] = statistics.median(values)
+    return metrics
+
+
+def bench_throughput(agent: MasterAgent, concurrency: int, use_async: bool) -> Dict[str, float]:
+    companies = [company_name(2000 + i) for i in range(concurrency)]
+    start = time.perf_counter()
+    if use_async:
+        async def run_all():
+            return await asyncio.gather(*(agent.aexecute_workflow(company) for company in companies))
+        asyncio.run(run_all())
+    else:
+        run_concurrently(
+            [lambda company=company: agent.execute_workflow(company) for company in companies],
+            max_workers=concurrency,
+        )
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput.batch_s": elapsed,
+        "throughput.workflows_per_min": concurrency / elapsed * 60,
+    }
+
+
+def bench_report_store(agent: MasterAgent, concurrency: int) -> Dict[str, float]:
+    company = company_name(5000)
+    # Sessions type the name differently; all map to one stored report
+    variants = [company, f"{company} Inc.", f" {company} ", f"{company}, Ltd"]
+    start = time.perf_counter()
+    run_concurrently(
+        [lambda i=i: agent.get_report(variants[i % len(variants)]) for i in range(concurrency)],
+        max_workers=concurrency,
+    )
+    coalesced = time.perf_counter() - start
+    start = time.perf_counter()
+    agent.get_report(company)
+    hit = time.perf_counter() - start
+    return {
+        "report_store.concurrent_s": coalesced,
+        "report_store.builds": agent.registry.report_store().builds,
+        "report_store.hit_ms": hit * 1000,
+    }
+
+
+def bench_scraper(agent: MasterAgent, base_url: str, rounds: int) -> Dict[str, float]:
+    scraper = agent.research_agent.research_agent
+    site = f"{base_url}/site/{company_name(3000)}/"
+    crawl, budgeted = [], []
+    for i in range(rounds):
+        start = time.perf_counter()
+        scraper.crawl_site(site, max_depth=1)
+        crawl.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        scraper.crawl_site(site, max_depth=1, budget=scraper.text_budget)
+        budgeted.append(time.perf_counter() - start)
+
+    fixtures = Fixtures()
+    pages = [
+        parse_html(fixtures.page(path).decode("utf-8"), scraper.html_backend)
+        for path in ("/site/x/", "/site/x/products", "/site/x/blog", "/wikipedia.org/wiki/x")
+    ]
+    repeat = 50
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            scraper.extract_text(page)
+            scraper.extract_text(page, budget=scraper.text_budget)
+    extract_ms = (time.perf_counter() - start) * 1000 / (repeat * len(pages) * 2)
+
+    return {
+        "crawl_site.full_s": statistics.median(crawl),
+        "crawl_site.budgeted_s": statistics.median(budgeted),
+        "extract_text.ms_per_call": extract_ms,
+        "memory.crawl_site_mb": peak_memory_mb(lambda: scraper.crawl_site(site, max_depth=1)),
+        "memory.extract_text_mb": peak_memory_mb(lambda: [scraper.extract_text(page) for page in pages]),
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_min")
+
+
+def compare(metrics: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Describe every metric that regressed past tolerance relative to the baseline."""
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        change = (value - reference) / reference
+        worse = -change if higher_is_better(name) else change
+        if worse > tolerance:
+            regressions.append(f"{name}: {value:.4g} vs baseline {reference:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions for latency measurements (median is reported)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent workflows for the throughput run")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="run the throughput batch on one event loop")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the first token of each LLM reply")
+    parser.add_argument("--llm-tps", type=float, default=200.0, help="LLM generation speed in tokens/s (0 = instant)")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="seconds the fixture server waits per request")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="seconds each recorded search takes")
+    parser.add_argument("--fixtures", default=None, help="fixtures directory (default: benchmarks/fixtures)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run's metrics as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--json", help="also write the metrics to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    settings = {
+        "llm_latency": args.llm_latency,
+        "llm_tps": args.llm_tps,
+        "page_latency": args.page_latency,
+        "search_latency": args.search_latency,
+        "concurrency": args.concurrency,
+        "async": args.use_async,
+    }
+    fixtures = Fixtures(args.fixtures) if args.fixtures else Fixtures()
+    # The replayed LLM isn't subject to OpenAI's request budget; retries and
+    # the adaptive concurrency limit stay on
+    rate_limits.configure("openai", rate=None)
+    with FixtureServer(fixtures, latency=args.page_latency) as server:
+        registry = ReplayRegistry(
+            fixtures,
+            server,
+            first_token_latency=args.llm_latency,
+            tokens_per_second=args.llm_tps or None,
+            search_latency=args.search_latency,
+        )
+        agent = MasterAgent(registry=registry)
+        metrics: Dict[str, float] = {}
+        with quiet(not args.verbose):
+            metrics.update(bench_workflow(agent, args.rounds))
+            metrics.update(bench_throughput(agent, args.concurrency, args.use_async))
+            metrics.update(bench_report_store(agent, args.concurrency))
+            metrics.update(bench_scraper(agent, server.base_url, args.rounds))
+            metrics["memory.execute_workflow_mb"] = peak_memory_mb(
+                lambda: agent.execute_workflow(company_name(4000))
+            )
+
+    metrics = {name: round(value, 4) for name, value in metrics.items()}
+    width = max(len(name) for name in metrics)
+    for name, value in metrics.items():
+        print(f"{name:<{width}}  {value:>10.4f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "metrics": metrics}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "metrics": metrics}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (run with --save-baseline to create one).")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print(f"Warning: baseline was recorded with different settings: {baseline.get('settings')}")
+    regressions = compare(metrics, baseline["metrics"], args.tolerance)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%} of the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Offline stand-ins for everything the pipeline talks to, driven by the recorded
+fixtures in benchmarks/fixtures:
+
+- FixtureServer: a local HTTP server serving the recorded company site and
+  Wikipedia article, with injected per-request latency.
+- FakeChatOpenAI: a SharedChatOpenAI whose transport replays recorded replies
+  (including function calls) token by token, with injected first-token
+  latency and generation speed. Coalescing, concurrency limits and callbacks
+  behave as in production; only the OpenAI request is replaced.
+- ReplayResearchAgent: a ResearchAgent whose DuckDuckGo call replays recorded
+  search results after an injected delay.
+- ReplayRegistry: a ResourceRegistry that hands these to MasterAgent, with
+  the LLM and scrape caches off so every run does the full work.
+
+Company names look like "bench-co-<n>"; every URL and reply mentions the
+company, so concurrent workflows for different companies never share a request.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from agents.registry import ResourceRegistry
+from agents.tools.fetcher import PageFetcher
+from agents.tools.llm import SharedChatOpenAI
+from agents.tools.report_store import ReportStore
+from agents.tools.research import DEFAULT_HEADERS, ResearchAgent
+from agents.tools.tokens import count_tokens
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+COMPANY_PATTERN = re.compile(r"bench-co-\d+")
+DEFAULT_COMPANY = "bench-co-0"
+# Characters per streamed chunk (roughly one token)
+CHUNK_CHARS = 4
+
+
+def company_name(index: int) -> str:
+    return f"bench-co-{index}"
+
+
+class Fixtures:
+    """Recorded search results, pages and LLM replies loaded from a fixtures directory."""
+
+    def __init__(self, path: str = FIXTURES_DIR):
+        self.path = path
+        with open(os.path.join(path, "search.json"), encoding="utf-8") as f:
+            self.search_results = json.load(f)
+        with open(os.path.join(path, "llm.json"), encoding="utf-8") as f:
+            self.llm_responses = json.load(f)["responses"]
+
+    def search(self, query: str, base_url: str) -> List[Dict[str, str]]:
+        results = self.search_results.get(query.strip().lower(), self.search_results["default"])
+        company = _company_in(query)
+        return [
+            {key: value.replace("{base}", base_url).replace("{company}", company) for key, value in result.items()}
+            for result in results
+        ]
+
+    def page(self, path: str) -> Optional[bytes]:
+        """
+        Body for a request path: /site/<company>/<page> serves site/<page>.html
+        (index.html for the site root) and /wikipedia.org/wiki/<company> the
+        recorded article. None for anything else.
+        """
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if len(parts) >= 2 and parts[0] == "site":
+            name = "/".join(parts[2:]) or "index"
+            file_path = os.path.join(self.path, "site", name + ".html")
+        elif parts[:2] == ["wikipedia.org", "wiki"]:
+            file_path = os.path.join(self.path, "wiki.html")
+        else:
+            return None
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def reply(self, prompt: str, tool: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(text, function call arguments) recorded for a prompt; tool names a forced function call."""
+        company = _company_in(prompt)
+        for entry in self.llm_responses:
+            if tool is not None and entry.get("tool") == tool:
+                return "", _fill(entry["arguments"], company)
+            if tool is None and "match" in entry and entry["match"] in prompt:
+                return _fill(entry["response"], company), None
+        raise KeyError(f"No recorded reply for prompt starting {prompt[:80]!r} (tool={tool})")
+
+
+def _company_in(text: str) -> str:
+    match = COMPANY_PATTERN.search(text)
+    return match.group(0) if match else DEFAULT_COMPANY
+
+
+def _fill(value: Any, company: str) -> Any:
+    if isinstance(value, str):
+        return value.replace("{company}", company)
+    if isinstance(value, list):
+        return [_fill(item, company) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, company) for key, item in value.items()}
+    return value
+
+
+class FixtureServer:
+    """Serves Fixtures pages on 127.0.0.1 from a background thread, sleeping `latency` seconds per request."""
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.fixtures.page(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeChatOpenAI(SharedChatOpenAI):
+    """SharedChatOpenAI that streams recorded replies instead of calling OpenAI."""
+
+    fixtures: Any = None
+    first_token_latency: float = 0.0
+    tokens_per_second: Optional[float] = None
+
+    def _reply_chunks(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> Iterator[Tuple[float, ChatGenerationChunk]]:
+        """(delay before it, chunk) pairs for the recorded reply to `messages`."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        tools = kwargs.get("tools") or []
+        tool_choice = kwargs.get("tool_choice")
+        forced = None
+        if isinstance(tool_choice, dict):
+            forced = tool_choice.get("function", {}).get("name")
+        elif tools and tool_choice not in (None, "auto", "none"):
+            forced = tools[0]["function"]["name"]
+
+        if forced is None and tools and not isinstance(messages[-1], ToolMessage):
+            # ReAct loop: call the (only) research tool first...
+            text, arguments = "", {"query": _company_in(prompt)}
+            forced = tools[0]["function"]["name"]
+        elif forced is None and isinstance(messages[-1], ToolMessage):
+            # ...then answer with what it returned
+            text, arguments = str(messages[-1].content), None
+        else:
+            text, arguments = self.fixtures.reply(prompt, forced)
+
+        output = json.dumps(arguments) if arguments is not None else text
+        per_chunk = CHUNK_CHARS / (4 * self.tokens_per_second) if self.tokens_per_second else 0.0
+        for start in range(0, len(output), CHUNK_CHARS):
+            piece = output[start:start + CHUNK_CHARS]
+            delay = self.first_token_latency if start == 0 else per_chunk
+            if arguments is not None:
+                message = AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[{
+                        "name": forced if start == 0 else None,
+                        "args": piece,
+                        "id": "call_replay" if start == 0 else None,
+                        "index": 0,
+                    }],
+                )
+            else:
+                message = AIMessageChunk(content=piece)
+            yield delay, ChatGenerationChunk(message=message)
+
+        usage = {
+            "input_tokens": count_tokens(prompt),
+            "output_tokens": count_tokens(output),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        yield 0.0, ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for delay, chunk in self._reply_chunks(messages, kwargs):
+            if delay:
+                time.sleep(delay)
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for delay, chunk in self._reply_chunks(messages, kwargs):
+            if delay:
+                await asyncio.sleep(delay)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+
+class ReplayResearchAgent(ResearchAgent):
+    """ResearchAgent whose web search replays recorded results after `search_latency` seconds."""
+
+    def __init__(self, fixtures: Fixtures, base_url: str, search_latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = fixtures
+        self.base_url = base_url
+        self.search_latency = search_latency
+
+    def _search(self, query: str, max_results: int):
+        if self.search_latency:
+            time.sleep(self.search_latency)
+        return self.fixtures.search(query, self.base_url)[:max_results]
+
+
+class ReplayRegistry(ResourceRegistry):
+    """ResourceRegistry that builds fake LLM clients and a scraper pointed at a FixtureServer."""
+
+    def __init__(
+        self,
+        fixtures: Fixtures,
+        server: FixtureServer,
+        first_token_latency: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        search_latency: float = 0.0,
+        http_concurrency: int = 16,
+    ):
+        super().__init__(http_concurrency=http_concurrency)
+        self.fixtures = fixtures
+        self.server = server
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.search_latency = search_latency
+
+    def chat_model(
+        self, model: str = "gpt-4", temperature: float = 0.3, use_cache: bool = True, max_tokens: Optional[int] = None
+    ):
+        return self.get_or_create(
+            ("chat_model", model, temperature, max_tokens),
+            lambda: FakeChatOpenAI(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key="replay",
+                cache=False,
+                streaming=True,
+                stream_usage=True,
+                fixtures=self.fixtures,
+                first_token_latency=self.first_token_latency,
+                tokens_per_second=self.tokens_per_second,
+            ),
+        )
+
+    def page_fetcher(self) -> PageFetcher:
+        return self.get_or_create(
+            "page_fetcher",
+            lambda: PageFetcher(headers=DEFAULT_HEADERS, max_connections=self.http_concurrency, cache=None),
+        )
+
+    def report_store(self) -> ReportStore:
+        # Always on and empty, whatever REPORT_STORE_TTL says
+        return self.get_or_create("report_store", ReportStore)
+
+    def research_scraper(self) -> ResearchAgent:
+        return self.get_or_create(
+            "research_scraper",
+            lambda: ReplayResearchAgent(
+                self.fixtures,
+                self.server.base_url,
+                search_latency=self.search_latency,
+                fetcher=self.page_fetcher(),
+            ),
+        )
@@ -0,0 +1,110 @@
+"""
+Compare ResourceAgent's per-field and batched modes on real OpenAI calls.
+
+For each mode and round this reports wall-clock latency, prompt/completion
+tokens, number of LLM calls and parse failures (replies that could not be
+used and had to be dropped or refilled). The LLM cache is bypassed so every
+round hits the API.
+
+    python -m benchmarks.resource_modes --rounds 3
+    python -m benchmarks.resource_modes --use-cases use_cases.json --json results.json
+"""
+import argparse
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from agents.resource_agent import RESOURCE_FIELDS, RESOURCE_MODES, ResourceAgent
+from agents.tools.usage import track_usage
+
+load_dotenv()
+
+SAMPLE_USE_CASES = [
+    {
+        "use_case": "AI-powered demand forecasting for retail inventory",
+        "market_trend": "Retailers are cutting stock-outs with ML-driven replenishment",
+    },
+    {
+        "use_case": "Generative AI assistant for customer support tickets",
+        "market_trend": "Support teams adopt LLM copilots to reduce handling time",
+    },
+    {
+        "use_case": "Computer vision quality inspection on manufacturing lines",
+        "market_trend": "Factories automate defect detection with edge vision models",
+    },
+]
+
+
+def run_mode(mode: str, use_cases, rounds: int):
+    rows = []
+    for _ in range(rounds):
+        agent = ResourceAgent(mode=mode, use_llm_cache=False)
+        with track_usage() as usage:
+            start = time.perf_counter()
+            bundles = agent.process_resources_many(use_cases)
+            elapsed = time.perf_counter() - start
+        empty_fields = sum(1 for bundle in bundles for field in RESOURCE_FIELDS if not bundle.get(field))
+        rows.append({
+            "seconds": elapsed,
+            "llm_calls": usage.calls,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "parse_failures": agent.stats["parse_failures"],
+            "empty_fields": empty_fields,
+            "fields_refilled": agent.stats["fields_refilled"],
+        })
+    return rows
+
+
+def summarize(rows, fields_per_round: int):
+    def mean(key):
+        return statistics.mean(row[key] for row in rows)
+
+    return {
+        "rounds": len(rows),
+        "mean_seconds": round(mean("seconds"), 2),
+        "max_seconds": round(max(row["seconds"] for row in rows), 2),
+        "mean_llm_calls": round(mean("llm_calls"), 1),
+        "mean_prompt_tokens": round(mean("prompt_tokens")),
+        "mean_completion_tokens": round(mean("completion_tokens")),
+        "parse_failure_rate": round(
+            sum(row["parse_failures"] for row in rows) / max(1, sum(row["llm_calls"] for row in rows)), 3
+        ),
+        "empty_field_rate": round(
+            sum(row["empty_fields"] for row in rows) / (fields_per_round * len(rows)), 3
+        ),
+        "mean_fields_refilled": round(mean("fields_refilled"), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--use-cases", help="JSON file with a list of {use_case, market_trend} dicts")
+    parser.add_argument("--json", help="Write the summary to this file")
+    args = parser.parse_args()
+
+    use_cases = SAMPLE_USE_CASES
+    if args.use_cases:
+        with open(args.use_cases) as f:
+            use_cases = json.load(f)
+
+    fields_per_round = len(use_cases) * len(RESOURCE_FIELDS)
+    results = {}
+    for mode in RESOURCE_MODES:
+        print(f"Running {mode} mode ({args.rounds} rounds, {len(use_cases)} use cases)...")
+        results[mode] = summarize(run_mode(mode, use_cases, args.rounds), fields_per_round)
+
+    print(f"\n{'metric':<24}" + "".join(f"{mode:>14}" for mode in RESOURCE_MODES))
+    for metric in results[RESOURCE_MODES[0]]:
+        print(f"{metric:<24}" + "".join(f"{results[mode][metric]:>14}" for mode in RESOURCE_MODES))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
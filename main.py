@@ -1,51 +1,270 @@
 from agents.research_agent import ResearchLangGraphAgent
 from agents.market_analysis_agent import MarketAnalysisAgent
 from agents.resource_agent import ResourceAgent
+from agents.registry import ResourceRegistry, get_registry
+from agents.tools.llm_cache import shared_llm_cache
+from agents.tools.events import WorkflowEvent, emit, event_sink, stage
+from agents.tools.json_repair import recovery_stats
+from agents.tools.rate_limit import rate_limits
+from agents.tools.tracing import Tracer, current_tracer, export_from_env, trace
 from dotenv import load_dotenv
-import os
-from typing import List, Dict, Any
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 import json
 
 load_dotenv()
 
 class MasterAgent:
-    def __init__(self):
-        self.research_agent = ResearchLangGraphAgent()
-        self.market_agent = MarketAnalysisAgent()
-        self.resource_agent = ResourceAgent()
+    def __init__(
+        self,
+        max_concurrency: int = 12,
+        call_timeout: Optional[float] = 120.0,
+        registry: Optional[ResourceRegistry] = None,
+        resource_mode: str = "per_field",
+        research_mode: str = "direct",
+    ):
+        # LLM clients, HTTP pools and compiled graphs come from the shared
+        # registry, so building another MasterAgent is cheap.
+        self.registry = registry or get_registry()
+        # research_mode="react" uses the LangGraph ReAct loop instead of the
+        # direct scrape-then-extract pipeline
+        self.research_agent = ResearchLangGraphAgent(registry=self.registry, mode=research_mode)
+        self.market_agent = MarketAnalysisAgent(registry=self.registry)
+        # Step 3 fans its LLM calls out on a pool of max_concurrency threads,
+        # or with resource_mode="batched" makes one structured call for all use cases.
+        self.resource_agent = ResourceAgent(
+            max_concurrency=max_concurrency,
+            call_timeout=call_timeout,
+            registry=self.registry,
+            mode=resource_mode,
+        )
 
     def execute_workflow(self, company: str):
-        # Step 1: Company Research
-        analysis = self.research_agent.research_and_analyze(company)
-
-        print("*" * 50)
-        print(type(analysis))
-        print(analysis)
-        print("*" * 50)
-        
-        # Step 2: Market Analysis
-        use_cases = self.market_agent.execute_workflow(analysis)
-        use_cases = use_cases.get("generated_use_cases", [])
-
-        print("*" * 50)
-        print(type(use_cases))
-        print(use_cases)
-        print("*" * 50)
-
-        
-        # Step 3: Resource Collection
-        resources = []
-        for use_case in use_cases[:3]:
-            result = self.resource_agent.process_resources(use_case)
-            resources.append(result)
-
-        print("*" * 50)
-        print(type(resources))
-        print(resources)
-        print("*" * 50)
-        
+        # Every stage, search, fetch, parse and LLM call is recorded as a span;
+        # the trace is emitted as a "trace" event at the end
+        owns_trace = current_tracer() is None
+        with trace("workflow", company=company) as tracer:
+            # Step 1: Company Research
+            with stage("research"):
+                analysis = self.research_agent.research_and_analyze(company)
+            emit("analysis", analysis)
+
+            # Step 2: Market Analysis. Step 3 (resource collection) starts for
+            # each of the first three use cases as soon as it has streamed in.
+            pipeline = self.resource_agent.pipeline(limit=3)
+            with stage("use_cases"):
+                try:
+                    use_cases = self.market_agent.execute_workflow(
+                        analysis, on_use_case=lambda index, use_case: pipeline.add(use_case)
+                    )
+                except BaseException:
+                    # Don't leave resource calls for the use cases streamed so far running
+                    pipeline.cancel()
+                    raise
+            use_cases = use_cases.get("generated_use_cases", [])
+
+            # Step 3: Resource Collection (the part still running once use cases are done)
+            with stage("resources"):
+                resources = pipeline.finish(use_cases)
+
+        self._finish(tracer, owns_trace)
+        return analysis, use_cases, resources
+
+    async def aexecute_workflow(self, company: str):
+        """
+        execute_workflow() for coroutines: every LLM call is awaited with
+        ainvoke and pages are fetched with the async fetcher, so one event loop
+        can run many reports at once without a thread per report.
+        """
+        owns_trace = current_tracer() is None
+        with trace("workflow", company=company) as tracer:
+            with stage("research"):
+                analysis = await self.research_agent.aresearch_and_analyze(company)
+            emit("analysis", analysis)
+
+            pipeline = self.resource_agent.pipeline(limit=3)
+            with stage("use_cases"):
+                try:
+                    use_cases = await self.market_agent.aexecute_workflow(
+                        analysis, on_use_case=lambda index, use_case: pipeline.aadd(use_case)
+                    )
+                except BaseException:
+                    await pipeline.acancel()
+                    raise
+            use_cases = use_cases.get("generated_use_cases", [])
+
+            with stage("resources"):
+                resources = await pipeline.afinish(use_cases)
+
+        self._finish(tracer, owns_trace)
         return analysis, use_cases, resources
 
+    def get_report(self, company: str, refresh: bool = False):
+        """
+        The (analysis, use_cases, resources) report for company from the shared
+        report store: a stored report if it is still usable, otherwise a new
+        one from execute_workflow(), joining an identical run already in
+        progress for another session. refresh=True skips stored reports.
+        Reports not built by this call are replayed as events after a "report"
+        event naming where they came from.
+        """
+        store = self.registry.report_store()
+        if store is None:
+            return self.execute_workflow(company)
+        report, status, age = store.get(company, lambda: self.execute_workflow(company), refresh=refresh)
+        self._replay(report, status, age)
+        return report
+
+    async def aget_report(self, company: str, refresh: bool = False):
+        """get_report() for coroutines, building with aexecute_workflow()."""
+        store = self.registry.report_store()
+        if store is None:
+            return await self.aexecute_workflow(company)
+        report, status, age = await store.aget(company, lambda: self.aexecute_workflow(company), refresh=refresh)
+        self._replay(report, status, age)
+        return report
+
+    @staticmethod
+    def _replay(report, status: str, age: float):
+        emit("report", status, age_s=round(age, 1))
+        if status == "built":
+            return  # its events were streamed while it ran
+        analysis, use_cases, resources = report
+        emit("analysis", analysis)
+        for index, use_case in enumerate(use_cases):
+            emit("use_case", use_case, index=index)
+        for index, bundle in enumerate(resources):
+            emit("resources", bundle, index=index)
+
+    @staticmethod
+    def _finish(tracer: Tracer, owns_trace: bool):
+        """Report the run's timing summary, cache, JSON recovery and rate limit stats; export the trace if TRACE_EXPORT_PATH is set."""
+        print(f"⏱️ Trace: {json.dumps(tracer.summary())}")
+        llm_cache = shared_llm_cache()
+        if llm_cache is not None:
+            print(f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses")
+        recovery = recovery_stats.summary()
+        if recovery:
+            print(f"JSON recovery (process-wide): {json.dumps(recovery)}")
+        limits = rate_limits.summary()
+        if limits:
+            print(f"Rate limits (process-wide): {json.dumps(limits)}")
+        # A caller that opened the trace (e.g. BatchRunner) exports it itself
+        if owns_trace:
+            export_from_env(tracer)
+        emit("trace", tracer)
+
+    def run_job(self, job, record, live_interval: float = 1.0) -> list:
+        """
+        Runner for agents.tools.jobs.JobQueue: builds job.company's report
+        through get_report() and records what a page needs to show its
+        progress: "stage" changes, the stage's latest streamed text as "live"
+        (at most every live_interval seconds), the analysis, use cases,
+        resources, "report" and the trace. Returns [analysis, use_cases, resources].
+        """
+        current_stage, streamed_text, last_live = "research", "", 0.0
+        record("stage", current_stage, stage=current_stage)
+        for event in self.stream_workflow(job.company, use_store=True, refresh=job.refresh):
+            if event.kind == "token":
+                token_stage = event.meta.get("stage")
+                # Resource calls run concurrently, so their tokens would interleave
+                if token_stage == "resources":
+                    continue
+                if token_stage != current_stage:
+                    current_stage, streamed_text = token_stage, ""
+                    record("stage", token_stage, stage=token_stage)
+                streamed_text += event.data
+                if time.monotonic() - last_live >= live_interval:
+                    last_live = time.monotonic()
+                    record("live", streamed_text[-1500:], stage=token_stage)
+            elif event.kind == "trace":
+                tracer = event.data
+                record("trace", {
+                    "trace_id": tracer.trace_id,
+                    "summary": tracer.summary(),
+                    "spans": tracer.to_json(),
+                    "otel": tracer.to_otel(),
+                })
+            elif event.kind == "done":
+                return list(event.data)
+            elif event.kind != "research":
+                record(event.kind, event.data, **event.meta)
+
+    def stream_workflow(self, company: str, use_store: bool = False, refresh: bool = False) -> Iterator[WorkflowEvent]:
+        """
+        Run execute_workflow in a background thread and yield WorkflowEvents as
+        results become available: research text, the analysis, each use case,
+        each resource bundle and streamed LLM tokens. The last event is "done"
+        with the (analysis, use_cases, resources) tuple; errors are re-raised.
+        With use_store, the report comes from get_report(company, refresh).
+        """
+        events: "queue.Queue[WorkflowEvent]" = queue.Queue()
+
+        def run():
+            with event_sink(events.put):
+                try:
+                    if use_store:
+                        result = self.get_report(company, refresh=refresh)
+                    else:
+                        result = self.execute_workflow(company)
+                except Exception as e:
+                    events.put(WorkflowEvent("error", e))
+                else:
+                    events.put(WorkflowEvent("done", result))
+
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+        worker.start()
+        while True:
+            event = events.get()
+            if event.kind == "error":
+                raise event.data
+            yield event
+            if event.kind == "done":
+                return
+
+    async def astream_workflow(
+        self, company: str, use_store: bool = False, refresh: bool = False
+    ) -> AsyncIterator[WorkflowEvent]:
+        """
+        Async-iterator version of stream_workflow, running aexecute_workflow
+        (or aget_report with use_store) as a task on the current event loop.
+        """
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue[WorkflowEvent]" = asyncio.Queue()
+
+        def put(event: WorkflowEvent):
+            # Events may come from worker threads (search, HTML parsing)
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        async def run():
+            with event_sink(put):
+                try:
+                    if use_store:
+                        result = await self.aget_report(company, refresh=refresh)
+                    else:
+                        result = await self.aexecute_workflow(company)
+                except Exception as e:
+                    put(WorkflowEvent("error", e))
+                else:
+                    put(WorkflowEvent("done", result))
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await events.get()
+                if event.kind == "error":
+                    raise event.data
+                yield event
+                if event.kind == "done":
+                    return
+        finally:
+            if not task.done():
+                task.cancel()
+
 if __name__ == "__main__":
     agent = MasterAgent()
     company = input("Enter company/industry to analyze: ")
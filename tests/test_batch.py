@@ -0,0 +1,43 @@
+from batch import BatchRunner, completed_companies, read_companies
+
+REPORTS = {
+    "Acme": ({"industry": "Robotics"}, [{"use_case": "Forecasting"}], [{"datasets": ["https://kaggle.com/x"]}]),
+    "Globex": ({"error": "Failed to parse JSON"}, [], []),
+    "Initech": ({"industry": "Software"}, [{"use_case": "Triage"}], [{"datasets": [], "models": []}]),
+}
+
+
+class StubAgent:
+    def execute_workflow(self, company):
+        if company == "Umbrella":
+            raise RuntimeError("search is down")
+        return REPORTS[company]
+
+
+def runner() -> BatchRunner:
+    runner = BatchRunner.__new__(BatchRunner)
+    runner.workers, runner.company_timeout, runner.agent = 2, None, StubAgent()
+    return runner
+
+
+def test_only_complete_reports_count_as_done(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    summary = runner().run(["Acme", "Globex", "Initech", "Umbrella"], output)
+    assert (summary["ok"], summary["errors"]) == (1, 3)
+    assert completed_companies(output) == {"Acme"}
+
+
+def test_incomplete_reports_say_why():
+    record = runner().analyze("Globex")
+    assert record["status"] == "error"
+    assert record["error"] == "incomplete report: analysis failed: Failed to parse JSON"
+    assert runner().analyze("Initech")["error"] == "incomplete report: no resources"
+
+
+def test_read_companies(tmp_path):
+    csv_path = tmp_path / "companies.csv"
+    csv_path.write_text("name,company\nx,Acme\ny,Globex\nz,Acme\n", encoding="utf-8")
+    jsonl_path = tmp_path / "companies.jsonl"
+    jsonl_path.write_text('{"company": "Acme"}\n"Globex"\n\n', encoding="utf-8")
+    assert read_companies(str(csv_path)) == ["Acme", "Globex"]
+    assert read_companies(str(jsonl_path)) == ["Acme", "Globex"]
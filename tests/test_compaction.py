@@ -0,0 +1,54 @@
+from agents.tools.compaction import compact_sections
+from agents.tools.tokens import count_tokens
+
+RELEVANT = "Acme is a market leader in industrial robotics, founded in 1990 and headquartered in Ohio."
+FILLER = "The weather in the region was mild for most of the year, with occasional rain in spring {}."
+
+
+def filler(count: int) -> str:
+    return "\n".join(FILLER.format(index) for index in range(count))
+
+
+def test_text_that_fits_is_returned_whole():
+    sections = [("Wikipedia Info", "Acme makes robots.\nAll rights reserved."), ("Website Info", "Hi")]
+    text, stats = compact_sections(sections, "Acme", max_tokens=1500)
+    assert text == "Company: Acme\n\nWikipedia Info:\nAcme makes robots.\nAll rights reserved.\n\nWebsite Info:\nHi"
+    assert stats["kept"] == stats["paragraphs"] == 3
+
+
+def test_output_stays_within_the_budget_and_keeps_the_relevant_paragraphs():
+    sections = [("Wikipedia Info", filler(40) + "\n" + RELEVANT), ("Website Info", filler(40))]
+    text, stats = compact_sections(sections, "Acme", max_tokens=200)
+    assert count_tokens(text) <= 200
+    assert stats["tokens"] == count_tokens(text)
+    assert RELEVANT in text
+    assert stats["kept"] < stats["paragraphs"]
+
+
+def test_sections_and_paragraphs_keep_their_original_order():
+    first = "Acme sells its platform to customers in retail and logistics markets."
+    second = "Acme announced the acquisition of a robotics technology partner last year."
+    sections = [("Wikipedia Info", first + "\n" + filler(30)), ("Website Info", filler(30) + "\n" + second)]
+    text, _ = compact_sections(sections, "Acme", max_tokens=150)
+    assert text.index("Wikipedia Info:") < text.index(first) < text.index("Website Info:") < text.index(second)
+
+
+def test_duplicates_and_boilerplate_are_dropped_first():
+    footer = "Acme Robotics GmbH, Industriestrasse 1, 44135 Dortmund, Germany"
+    pages = "\n".join(
+        f"Content from https://acme.com/{page}:\n{RELEVANT}\nSubscribe to our newsletter\n{footer}"
+        for page in range(2)
+    ) + "\n" + "\n".join(f"Content from https://acme.com/news/{page}:\n{footer}" for page in range(3))
+    text, stats = compact_sections([("Website Info", pages + "\n" + filler(30))], "Acme", max_tokens=200)
+    assert text.count(RELEVANT) == 1
+    assert "Subscribe" not in text and footer not in text
+    assert stats["duplicates"] == 1
+    assert stats["boilerplate"] == 2 + 5
+
+
+def test_a_section_larger_than_the_whole_budget_is_truncated_to_fit():
+    huge = " ".join(["Acme builds industrial robots for customers worldwide."] * 200)
+    text, stats = compact_sections([("Website Info", huge)], "Acme", max_tokens=100)
+    assert text.startswith("Company: Acme\n\nWebsite Info:\nAcme builds")
+    assert count_tokens(text) <= 100
+    assert stats["kept"] == 1
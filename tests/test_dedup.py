@@ -0,0 +1,40 @@
+from agents.tools.dedup import NearDuplicateIndex
+
+WORDS = (
+    "acme builds industrial robots for warehouses and factories across europe and north america "
+    "its machines sort parcels pick items from shelves and load trucks while a cloud platform "
+    "plans routes schedules maintenance and reports throughput to operators in real time the "
+    "company was founded by two engineers who previously designed control systems for car plants "
+    "and it now employs several hundred people in offices spread over four countries with most of "
+    "its revenue coming from long term service contracts signed with large logistics providers "
+    "retailers and parcel carriers that run dozens of distribution centres each year"
+).split()
+
+
+def test_exact_repeats_ignore_case_and_punctuation():
+    index = NearDuplicateIndex()
+    assert not index.seen("Acme makes robots.")
+    assert index.seen("ACME makes   robots!")
+    assert index.exact_hits == 1
+
+
+def test_near_repeat_is_recognized():
+    index = NearDuplicateIndex()
+    original = " ".join(WORDS)
+    changed = " ".join(WORDS[:60] + ["2024"] + WORDS[61:])
+    assert not index.seen(original)
+    assert index.seen(changed)
+    assert index.near_hits == 1
+
+
+def test_different_paragraphs_are_kept():
+    index = NearDuplicateIndex()
+    assert not index.seen(" ".join(WORDS))
+    assert not index.seen(" ".join(reversed(WORDS)))
+    assert not index.seen("Contact our sales team for a quote on your next automation project today.")
+
+
+def test_short_paragraphs_only_match_exactly():
+    index = NearDuplicateIndex(shingle_size=3)
+    assert not index.seen("About us")
+    assert not index.seen("About them")
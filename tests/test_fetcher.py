@@ -0,0 +1,113 @@
+import io
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from agents.tools.fetcher import PageFetcher, SkippedContent, check_headers, sniff_encoding
+from agents.tools.scrape_cache import ScrapeCache
+
+
+def fake_response(status: int = 200, body: bytes = b"", **headers) -> requests.Response:
+    """A streamed requests.Response as Session.get(..., stream=True) returns it."""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict({key.replace("_", "-"): value for key, value in headers.items()})
+    response.raw = io.BytesIO(body)
+    response.url = "https://a.com/"
+    return response
+
+
+class FakeSession:
+    """Stands in for the fetcher's requests.Session, answering from a list of responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def fetcher_with(session: FakeSession, **settings) -> PageFetcher:
+    fetcher = PageFetcher(requests_per_second=None, **settings)
+    fetcher.session.get = session.get
+    return fetcher
+
+
+@pytest.mark.parametrize("cache_control", ["max-age=0", "no-cache"])
+def test_pages_that_must_be_revalidated_are_stored_stale(cache, cache_control):
+    page = b"<html><p>hello</p></html>"
+    session = FakeSession(
+        fake_response(200, page, Content_Type="text/html", Cache_Control=cache_control, ETag='"v1"'),
+        fake_response(304),
+    )
+    fetcher = fetcher_with(session, cache=cache)
+    assert fetcher.get("https://a.com/").content == page
+    assert not cache.get("page:https://a.com").fresh
+
+    assert fetcher.get("https://a.com/").content == page
+    assert session.requests[1] == {"If-None-Match": '"v1"'}
+
+
+def test_no_store_pages_are_not_cached(cache):
+    session = FakeSession(fake_response(200, b"<html></html>", Content_Type="text/html", Cache_Control="no-store"))
+    fetcher_with(session, cache=cache).get("https://a.com/")
+    assert cache.get("page:https://a.com") is None
+
+
+def test_non_html_responses_are_skipped_before_the_body_is_read():
+    response = fake_response(200, b"%PDF-1.7", Content_Type="application/pdf")
+    fetcher = fetcher_with(FakeSession(response))
+    with pytest.raises(SkippedContent, match="non-HTML"):
+        fetcher.get("https://a.com/report.pdf")
+    assert response._content is False  # never read
+
+
+def test_announced_oversized_bodies_are_skipped():
+    response = fake_response(200, b"x" * 100, Content_Type="text/html", Content_Length="100")
+    fetcher = fetcher_with(FakeSession(response), max_bytes=50)
+    with pytest.raises(SkippedContent, match="oversized"):
+        fetcher.get("https://a.com/")
+
+
+def test_bodies_without_a_length_are_cut_at_the_cap():
+    fetcher = fetcher_with(FakeSession(fake_response(200, b"x" * 200_000, Content_Type="text/html")), max_bytes=100_000)
+    assert len(fetcher.get("https://a.com/").content) == 100_000
+
+
+@pytest.mark.parametrize("content_type, body, expected", [
+    ("text/html; charset=ISO-8859-1", b'<meta charset="utf-8">', "ISO-8859-1"),
+    ("text/html", b'<html><head><meta charset="windows-1252">', "windows-1252"),
+    ("text/html", b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">', "Shift_JIS"),
+    ("text/html", b"<html></html>", "utf-8"),
+])
+def test_sniff_encoding(content_type, body, expected):
+    assert sniff_encoding(fake_response(200, body, Content_Type=content_type), body) == expected
+
+
+def test_meta_charset_is_used_when_the_header_has_none():
+    body = '<html><head><meta charset="windows-1252"></head><p>café</p></html>'.encode("cp1252")
+    fetcher = fetcher_with(FakeSession(fake_response(200, body, Content_Type="text/html")))
+    assert "café" in fetcher.get("https://a.com/").text
+
+
+@pytest.mark.parametrize("headers", [
+    {"Content-Type": "image/png"},
+    {"Content-Type": "text/html", "Content-Length": "11"},
+])
+def test_check_headers_rejects(headers):
+    with pytest.raises(SkippedContent):
+        check_headers("https://a.com/", headers, max_bytes=10)
+
+
+def test_check_headers_accepts_html_within_the_cap():
+    check_headers("https://a.com/", {"Content-Type": "text/html; charset=utf-8", "Content-Length": "10"}, max_bytes=10)
@@ -0,0 +1,68 @@
+import pytest
+
+from agents.tools.frontier import CrawlFrontier, internal_links
+
+
+def fill(frontier):
+    frontier.push("https://a.com/1", "a/1", depth=1, score=1)
+    frontier.push("https://a.com/2", "a/2", depth=1, score=3)
+    frontier.push("https://a.com/3", "a/3", depth=2, score=5)
+    frontier.push("https://a.com/4", "a/4", depth=1, score=2)
+
+
+def urls(batch):
+    return [url.rsplit("/", 1)[1] for url, _ in batch]
+
+
+def test_push_queues_each_key_once():
+    frontier = CrawlFrontier()
+    assert frontier.push("https://a.com/x/", "a/x", depth=1)
+    assert not frontier.push("https://a.com/x#top", "a/x", depth=1)
+    assert len(frontier) == 1
+
+
+def test_level_order_takes_a_whole_level_best_first():
+    frontier = CrawlFrontier("level")
+    fill(frontier)
+    assert urls(frontier.pop_batch()) == ["2", "4", "1"]
+    assert frontier.pop_batch() == [("https://a.com/3", 2)]
+
+
+def test_bfs_keeps_discovery_order():
+    frontier = CrawlFrontier("bfs")
+    for name, depth, score in (("1", 1, 1), ("2", 1, 3), ("4", 1, 2), ("3", 2, 5)):
+        frontier.push(f"https://a.com/{name}", f"a/{name}", depth=depth, score=score)
+    assert urls(frontier.pop_batch(2)) == ["1", "2"]
+    assert urls(frontier.pop_batch()) == ["4"]
+    assert urls(frontier.pop_batch()) == ["3"]
+
+
+def test_best_first_crosses_levels():
+    frontier = CrawlFrontier("best_first")
+    fill(frontier)
+    assert urls(frontier.pop_batch(2)) == ["3", "2"]
+    assert urls(frontier.pop_batch()) == ["4", "1"]
+    assert len(frontier) == 0
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        CrawlFrontier("random")
+
+
+def test_internal_links_filters_and_scores():
+    links = [
+        ("/about-us", "About"),
+        ("/about-us", "About again"),
+        ("https://other.com/about", "About them"),
+        ("/careers/jobs", "Careers"),
+        ("/files/report.pdf", "Company report"),
+        ("mailto:hi@a.com", "Mail"),
+        ("/misc", "Our history and leadership team"),
+        ("/misc2", "Nothing relevant"),
+    ]
+    result = internal_links(links, "https://a.com/index.html", "a.com")
+    assert result == [
+        ("https://a.com/about-us", "https://a.com/about-us", 1),
+        ("https://a.com/misc", "https://a.com/misc", 3),
+    ]
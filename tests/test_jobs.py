@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from agents.tools.jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    def run(job, record):
+        record("stage", "research", stage="research")
+        for text in ("a", "ab", "abc"):
+            record("live", text, stage="research")
+        return ["report"]
+
+    queue = JobQueue(run, path=str(tmp_path / "jobs.sqlite3"), stale_after=0.01)
+    yield queue
+    queue.close()
+
+
+def kinds(queue, job_id, after=0):
+    return [(seq, kind) for seq, kind, _, _ in queue.events(job_id, after)]
+
+
+def test_live_events_are_dropped_when_a_job_finishes(queue):
+    job_id = queue.submit("Acme")
+    queue._execute(queue._claim())
+    assert queue.get(job_id).status == "done"
+    assert kinds(queue, job_id) == [(1, "stage")]
+
+
+def test_reclaimed_job_keeps_numbering_events(queue):
+    job_id = queue.submit("Acme")
+    job = queue._claim()
+    queue.run = lambda job, record: (record("stage", "research", stage="research"), record("analysis", {}))
+    queue._execute(job)
+    assert kinds(queue, job_id) == [(1, "stage"), (2, "analysis")]
+
+    # The worker died before marking the job finished
+    with queue._conn:
+        queue._conn.execute("UPDATE jobs SET status = 'running', heartbeat_at = 0 WHERE id = ?", (job_id,))
+    queue.run = lambda job, record: record("stage", "research", stage="research")
+    queue._execute(queue._claim())
+    assert kinds(queue, job_id) == [(3, "retry"), (4, "stage")]
+    assert kinds(queue, job_id, after=2) == [(3, "retry"), (4, "stage")]
+
+
+def test_finished_jobs_expire(queue):
+    job_id = queue.submit("Acme")
+    queue._execute(queue._claim())
+    queue.retention = 60
+    assert queue.prune() == 0
+    queue.retention = 0.01
+    time.sleep(0.02)
+    assert queue.prune() == 1
+    assert queue.get(job_id) is None and queue.events(job_id) == []
+
+
+class PausingConnection:
+    """Delegates to a sqlite3 connection, running `hook` once right after the first running-jobs count."""
+
+    def __init__(self, conn, hook):
+        self._conn = conn
+        self._hook = hook
+
+    def execute(self, sql, *args):
+        result = self._conn.execute(sql, *args)
+        if self._hook and "COUNT(*)" in sql:
+            hook, self._hook = self._hook, None
+            hook()
+        return result
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_max_running_holds_across_queues_sharing_a_database(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = JobQueue(lambda job, record: None, path=path, max_running=1)
+    second = JobQueue(lambda job, record: None, path=path, max_running=1)
+    first.submit("Acme")
+    first.submit("Globex")
+    claims = []
+    other = threading.Thread(target=lambda: claims.append(second._claim()))
+
+    def claim_from_the_other_queue():
+        # The other process tries to claim between this one's count and its claim
+        other.start()
+        other.join(0.2)
+
+    first._conn = PausingConnection(first._conn, claim_from_the_other_queue)
+    claims.append(first._claim())
+    other.join()
+    assert len(claims) == 2
+    assert sum(job is not None for job in claims) == 1
+    assert first.counts()["running"] == 1
+    first.close()
+    second.close()
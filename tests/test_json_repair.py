@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from agents.tools.json_repair import JsonRecoveryError, load_json, repair_json, validate
+
+ITEMS = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "year": {"type": "integer"}},
+        "required": ["name"],
+    },
+}
+
+
+def repaired(text, openers="[{"):
+    return json.loads(repair_json(text, openers))
+
+
+def test_repair_strips_prose_and_fences():
+    text = 'Here you go:\n```json\n[{"name": "a"}]\n```\nHope that helps!'
+    assert repaired(text) == [{"name": "a"}]
+
+
+def test_repair_quotes_keys_and_literals():
+    text = "{name: 'Acme', 'public': True, parent: None, “tag”: “x”}"
+    assert repaired(text) == {"name": "Acme", "public": True, "parent": None, "tag": "x"}
+
+
+def test_repair_commas():
+    assert repaired('[1, 2, 3,]') == [1, 2, 3]
+    assert repaired('[{"a": 1} {"a": 2}]') == [{"a": 1}, {"a": 2}]
+    assert repaired('["a" "b"]') == ["a", "b"]
+
+
+def test_repair_escapes_inside_strings():
+    assert repaired("""['it\\'s', "say \\"hi\\""]""") == ["it's", 'say "hi"']
+    assert repaired('["line\nbreak"]') == ["line\nbreak"]
+
+
+def test_repair_closes_truncated_reply_after_last_complete_element():
+    text = '[{"name": "a"}, {"name": "b"}, {"name": "c", "ye'
+    assert repaired(text) == [{"name": "a"}, {"name": "b"}]
+
+
+def test_repair_uses_openers():
+    assert repaired('{"items": [1, 2]}', "[") == [1, 2]
+    assert repair_json("no json here") is None
+
+
+def test_validate_reports_paths():
+    value = [{"name": "a", "year": "1999"}, {"year": 2000}, "x"]
+    assert validate(value, ITEMS) == [
+        "$[0].year should be a integer",
+        '$[1] is missing "name"',
+        "$[2] should be an object",
+    ]
+    assert validate([{"name": "a", "year": 1999}], ITEMS) == []
+    assert validate(True, {"type": "integer"}) == ["$ should be a integer"]
+
+
+def test_load_json_clean_reply_is_not_repaired():
+    assert load_json('[{"name": "a"}]', ITEMS) == ([{"name": "a"}], False)
+
+
+def test_load_json_repairs_and_conforms():
+    assert load_json("```json\n[{name: 'a'},]\n```", ITEMS) == ([{"name": "a"}], True)
+    # a list wrapped in an object is unwrapped
+    assert load_json('{"results": [{"name": "a"}]}', ITEMS) == ([{"name": "a"}], True)
+    # invalid items are dropped while valid ones remain
+    assert load_json('[{"name": "a"}, {"year": 1}]', ITEMS) == ([{"name": "a"}], True)
+
+
+def test_load_json_raises_when_nothing_usable():
+    with pytest.raises(JsonRecoveryError):
+        load_json("I can't help with that.", ITEMS)
+    with pytest.raises(JsonRecoveryError):
+        load_json('[{"year": 1}]', ITEMS)
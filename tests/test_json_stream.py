@@ -0,0 +1,29 @@
+from agents.tools.json_stream import JsonArrayStream
+
+
+def feed_all(stream, pieces):
+    completed = []
+    for piece in pieces:
+        completed.append(stream.feed(piece))
+    return completed
+
+
+def test_elements_complete_as_they_arrive():
+    stream = JsonArrayStream()
+    completed = feed_all(stream, ['```json\n[{"a": ', '1}, {"a"', ': 2}', ", 3]\n```"])
+    assert completed == [[], [{"a": 1}], [{"a": 2}], [3]]
+    assert stream.items == [{"a": 1}, {"a": 2}, 3]
+    assert stream.done
+
+
+def test_brackets_and_commas_inside_strings_are_text():
+    stream = JsonArrayStream()
+    stream.feed('[{"text": "a, [b] {c} \\"d\\""}, ["x", "y"]]')
+    assert stream.items == [{"text": 'a, [b] {c} "d"'}, ["x", "y"]]
+
+
+def test_unparseable_elements_are_skipped_and_trailing_text_ignored():
+    stream = JsonArrayStream()
+    stream.feed('[{"a": 1}, {oops}, {"b": 2}] and then [{"c": 3}]')
+    assert stream.items == [{"a": 1}, {"b": 2}]
+    assert stream.feed("[4]") == []
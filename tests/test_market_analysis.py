@@ -0,0 +1,40 @@
+from agents.market_analysis_agent import UseCaseGenerationTool, UseCaseStream
+
+A = {"use_case": "A", "market_trend": "t"}
+C = {"use_case": "C", "market_trend": "t"}
+
+
+def streamed(reply: str):
+    delivered = []
+    stream = UseCaseStream(lambda index, use_case: delivered.append((index, use_case)))
+    for token in reply:
+        stream.on_llm_new_token(token)
+    return stream, delivered
+
+
+def test_use_cases_are_delivered_as_they_stream():
+    stream, delivered = streamed('```json\n[{"use_case": "A", "market_trend": "t"}, {"use_case": "C", "market_trend": "t"}]')
+    assert delivered == [(0, A), (1, C)]
+    assert UseCaseGenerationTool._finish_stream([A, C], stream) == [A, C]
+    assert len(delivered) == 2
+
+
+def test_invalid_streamed_use_cases_wait_for_the_validated_reply():
+    stream, delivered = streamed('[{"use_case": "A", "market_trend": "t"}, {"use_case": "B"}, {"use_case": "C", "market_trend": "t"}]')
+    assert delivered == [(0, A)]
+    repaired = {"use_case": "B", "market_trend": ""}
+    assert UseCaseGenerationTool._finish_stream([A, repaired, C], stream) == [A, repaired, C]
+    assert delivered == [(0, A), (1, repaired), (2, C)]
+
+
+def test_an_unusable_reply_keeps_what_was_delivered():
+    stream, delivered = streamed('[{"use_case": "A", "market_trend": "t"}, {"use_case": ')
+    assert UseCaseGenerationTool._finish_stream([], stream) == [A]
+    assert delivered == [(0, A)]
+
+
+def test_replies_without_tokens_are_delivered_at_the_end():
+    delivered = []
+    stream = UseCaseStream(lambda index, use_case: delivered.append(index))
+    assert UseCaseGenerationTool._finish_stream([A, C], stream) == [A, C]
+    assert delivered == [0, 1]
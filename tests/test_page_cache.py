@@ -0,0 +1,21 @@
+import pytest
+
+from agents.tools.page_cache import normalize_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://Example.COM/About/", "https://example.com/About"),
+        ("https://example.com:443/a#team", "https://example.com/a"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+        ("  https://example.com/  ", "https://example.com"),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_keeps_blank_query_values():
+    assert normalize_url("https://example.com/?q=&a=1") == "https://example.com?a=1&q="
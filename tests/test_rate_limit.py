@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from agents.tools.rate_limit import (
+    FATAL, RETRY, THROTTLE, CircuitBreaker, CircuitOpenError, ProviderLimiter, RateLimits, TokenBucket,
+    retry_after,
+)
+
+
+class Flaky:
+    """Fails with `error` for the first `failures` calls, then returns "ok"."""
+
+    def __init__(self, failures: int, error: Exception):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def classify(error):
+    if isinstance(error, PermissionError):
+        return FATAL, None
+    if isinstance(error, TimeoutError):
+        return RETRY, None
+    return THROTTLE, 0.0
+
+
+def limiter(**settings):
+    return ProviderLimiter("test", base_delay=0.001, max_delay=0.01, **settings)
+
+
+def test_token_bucket_waits_once_the_burst_is_spent():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(None)
+    assert all(bucket.reserve() == 0 for _ in range(100))
+
+
+def test_circuit_breaker_cycle():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.failure()
+    assert breaker.admit() == ("go", 0.0)
+    breaker.failure()
+    state, wait = breaker.admit()
+    assert state == "open" and 0 < wait <= 0.05
+    time.sleep(0.06)
+    assert breaker.admit()[0] == "trial"
+    assert breaker.admit() == ("wait", CircuitBreaker.TRIAL_POLL)
+    breaker.success()
+    assert breaker.state == "closed" and breaker.admit()[0] == "go"
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    breaker.failure()
+    time.sleep(0.02)
+    assert breaker.admit()[0] == "trial"
+    breaker.failure(trial=True)
+    assert breaker.admit()[0] == "open"
+    assert breaker.opens == 2
+
+
+def test_retries_until_success():
+    fn = Flaky(2, TimeoutError("timed out"))
+    assert limiter(max_retries=3).call(fn, classify) == "ok"
+    assert fn.calls == 3
+
+
+def test_fatal_errors_are_not_retried():
+    fn = Flaky(1, PermissionError("401"))
+    with pytest.raises(PermissionError):
+        limiter().call(fn, classify)
+    assert fn.calls == 1
+
+
+def test_throttling_does_not_open_the_circuit():
+    guarded = limiter(max_retries=2, failure_threshold=1)
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            guarded.call(Flaky(10, ConnectionError("429")), classify)
+    assert guarded.breaker.state == "closed"
+    assert guarded.call(lambda: "ok", classify) == "ok"
+
+
+def test_exhausted_transient_errors_open_the_circuit():
+    guarded = limiter(max_retries=0, failure_threshold=1, cooldown=60)
+    with pytest.raises(TimeoutError):
+        guarded.call(Flaky(10, TimeoutError("timed out")), classify)
+    assert guarded.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        guarded.call(lambda: "ok", classify)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "2"}, 2.0),
+    ({"retry-after": "0.5"}, 0.5),
+    ({"Retry-After": "-3"}, 0.0),
+    ({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, None),
+    ({}, None),
+    (None, None),
+])
+def test_retry_after(headers, expected):
+    assert retry_after(headers) == expected
+
+
+def test_settings_come_from_the_environment_on_first_use(monkeypatch):
+    limits = RateLimits()
+    monkeypatch.setenv("RATE_LIMIT_OPENAI_RPS", "2")
+    monkeypatch.setenv("RATE_LIMIT_OPENAI_CONCURRENCY", "3")
+    openai = limits.get("openai", "gpt-4")
+    assert openai.bucket.rate == 2.0 and openai.concurrency.max_limit == 3
+    assert limits.get("openai", "gpt-4") is openai
+    limits.configure("openai", rate=None)
+    assert limits.get("openai", "gpt-4").bucket.rate == 0.0
@@ -0,0 +1,59 @@
+import pytest
+
+from agents.tools.report_store import ReportStore, complete_report, normalize_company
+
+ANALYSIS = {"industry": "Retail", "key_offerings": ["Groceries"]}
+GOOD = (ANALYSIS, [{"use_case": "Demand forecasting"}], [{"datasets": ["https://kaggle.com/x"]}])
+
+
+@pytest.mark.parametrize("name", ["Acme Inc.", "ACME", "acme, inc", "  Acme   Corporation ", "acme ltd"])
+def test_normalize_company_ignores_case_punctuation_and_legal_form(name):
+    assert normalize_company(name) == "acme"
+
+
+def test_normalize_company_keeps_a_bare_legal_word():
+    assert normalize_company("Inc") == "inc"
+
+
+@pytest.mark.parametrize("report", [
+    ({"error": "Failed to parse JSON"}, GOOD[1], GOOD[2]),
+    (ANALYSIS, [], GOOD[2]),
+    (ANALYSIS, GOOD[1], [{"datasets": [], "repositories": []}]),
+    (ANALYSIS, GOOD[1]),
+    None,
+])
+def test_incomplete_reports(report):
+    assert not complete_report(report)
+
+
+def test_complete_report():
+    assert complete_report(GOOD)
+
+
+def test_get_builds_once_then_serves_fresh():
+    store = ReportStore()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return GOOD
+
+    assert store.get("Acme Inc.", build)[:2] == (GOOD, "built")
+    assert store.get("acme", build)[:2] == (GOOD, "fresh")
+    assert len(builds) == 1
+    assert store.get("acme", build, refresh=True)[1] == "built"
+
+
+def test_rejected_report_keeps_the_previous_one():
+    store = ReportStore()
+    store.get("acme", lambda: GOOD)
+    bad = ({"error": "Failed to parse JSON"}, [], [])
+    assert store.get("acme", lambda: bad, refresh=True)[:2] == (bad, "built")
+    assert store.peek("acme").report == GOOD
+    assert store.stats()["rejected"] == 1
+
+
+def test_expired_report_is_rebuilt_without_stale_while_refresh():
+    store = ReportStore(ttl=0, stale_while_refresh=False)
+    store.get("acme", lambda: GOOD)
+    assert store.get("acme", lambda: GOOD)[1] == "built"
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+from agents.resource_agent import RESOURCE_FIELDS, ResourceAgent
+
+USE_CASES = [{"use_case": f"Use case {index}", "market_trend": "Automation"} for index in range(3)]
+
+
+class Gauge:
+    """Counts calls in flight and remembers the most seen at once."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def agent(max_concurrency: int) -> ResourceAgent:
+    """A per-field ResourceAgent whose LLM calls are replaced by short sleeps."""
+    agent = ResourceAgent.__new__(ResourceAgent)
+    agent.mode, agent.max_concurrency, agent.call_timeout = "per_field", max_concurrency, None
+    agent.gauge = Gauge()
+
+    def field_call(field, input_data):
+        def call():
+            with agent.gauge:
+                time.sleep(0.02)
+            return [{"for": input_data.get("use_case"), "field": field}]
+        return call
+
+    async def afield_call(field, input_data):
+        with agent.gauge:
+            await asyncio.sleep(0.02)
+        return [{"for": input_data.get("use_case"), "field": field}]
+
+    agent._field_call, agent._afield_call = field_call, afield_call
+    return agent
+
+
+def check(bundles):
+    assert len(bundles) == 3
+    for use_case, bundle in zip(USE_CASES, bundles):
+        assert list(bundle) == RESOURCE_FIELDS
+        assert all(bundle[field] == [{"for": use_case["use_case"], "field": field}] for field in RESOURCE_FIELDS)
+
+
+def test_streamed_use_cases_share_the_concurrency_cap():
+    resources = agent(max_concurrency=3)
+    pipeline = resources.pipeline(limit=3)
+    for use_case in USE_CASES:
+        pipeline.add(use_case)
+    check(pipeline.finish(USE_CASES))
+    assert resources.gauge.peak <= 3
+
+
+def test_async_streamed_use_cases_share_the_concurrency_cap():
+    resources = agent(max_concurrency=3)
+
+    async def main():
+        pipeline = resources.pipeline(limit=3)
+        for use_case in USE_CASES:
+            pipeline.aadd(use_case)
+        return await pipeline.afinish(USE_CASES)
+
+    check(asyncio.run(main()))
+    assert resources.gauge.peak <= 3
+
+
+def test_use_cases_missing_keys_still_get_resources():
+    pipeline = agent(max_concurrency=4).pipeline(limit=3)
+    pipeline.add({"use_case": "Only a name"})
+    bundle = pipeline.finish([{"use_case": "Only a name"}])[0]
+    assert bundle["datasets"] == [{"for": "Only a name", "field": "datasets"}]
+
+
+def test_cancel_skips_calls_not_started():
+    resources = agent(max_concurrency=1)
+    pipeline = resources.pipeline(limit=3)
+    pipeline.add(USE_CASES[0])
+    pipeline.cancel()
+    pipeline.add(USE_CASES[1])
+    assert len(pipeline.use_cases) == 1
+    assert sum(1 for field in RESOURCE_FIELDS if pipeline.bundles[0][field]) < len(RESOURCE_FIELDS)
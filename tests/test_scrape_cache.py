@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from agents.tools.scrape_cache import ScrapeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ScrapeCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(cache):
+    cache.put("page:a", b"<html>", 60, etag='"v1"', last_modified="Mon", content_type="text/html")
+    entry = cache.get("page:a")
+    assert entry.value == b"<html>"
+    assert (entry.etag, entry.last_modified, entry.content_type) == ('"v1"', "Mon", "text/html")
+    assert entry.fresh
+    assert cache.get("page:missing") is None
+
+
+def test_expired_entries_are_kept_for_revalidation(cache):
+    cache.put("page:a", b"old", -1)
+    assert not cache.get("page:a").fresh
+    cache.touch("page:a", 60)
+    assert cache.get("page:a").fresh
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(cache):
+    cache.put("a", b"123", 60)
+    time.sleep(0.01)
+    cache.put("b", b"456", 60)
+    time.sleep(0.01)
+    cache.get("a")  # a is now more recently used than b
+    time.sleep(0.01)
+    cache.put("c", b"78901", 60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_entry_rebuilds_a_response(cache):
+    cache.put("page:a", b"<p>hi</p>", 60, content_type="text/html; charset=utf-8")
+    response = cache.get("page:a").to_response("https://a.com")
+    assert response.status_code == 200
+    assert response.text == "<p>hi</p>"
+    assert response.encoding == "utf-8"
+
+
+def test_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("SCRAPE_CACHE_PATH", "off")
+    assert ScrapeCache.from_env() is None
+    monkeypatch.setenv("SCRAPE_CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    monkeypatch.setenv("SCRAPE_CACHE_OFFLINE", "1")
+    cache = ScrapeCache.from_env()
+    assert cache.offline
+    cache.close()
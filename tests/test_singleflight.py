@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agents.tools.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+    started = threading.Event()
+
+    def work():
+        runs.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    owner.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    for thread in [owner] + waiters:
+        thread.join()
+    assert results == ["result"] * 4
+    assert len(runs) == 1
+    assert flight.coalesced == 3
+
+
+def test_errors_reach_every_caller_and_nothing_is_cached():
+    flight = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        flight.do("k", lambda: 1 / 0)
+    assert flight.do("k", lambda: "again") == "again"
+
+
+def test_async_calls_share_one_run():
+    async def main():
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(4)))
+        return results, runs, flight.coalesced
+
+    results, runs, coalesced = asyncio.run(main())
+    assert results == ["result"] * 4
+    assert len(runs) == 1 and coalesced == 3
+
+
+def test_cancelling_one_caller_leaves_the_others_waiting():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.1)
+            return "result"
+
+        owner = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter, owner.cancelled()
+
+    assert asyncio.run(main()) == ("result", True)
+
+
+def test_run_is_cancelled_once_every_caller_is():
+    async def main():
+        flight = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        # a new caller starts a new run instead of joining the cancelled one
+        return await flight.do("k", lambda: asyncio.sleep(0, result="fresh"))
+
+    assert asyncio.run(main()) == "fresh"
@@ -0,0 +1,29 @@
+import pytest
+
+from agents.tools.tokens import TextBudget, count_tokens
+
+
+def test_char_budget_truncates_the_piece_that_overflows():
+    budget = TextBudget(10)
+    assert budget.take("hello") == "hello"
+    assert budget.remaining == 5
+    assert budget.take("wonderful world") == "wonde"
+    assert budget.full
+    assert budget.take("more") == ""
+
+
+def test_token_budget_counts_tokens():
+    text = "The quick brown fox jumps over the lazy dog."
+    size = count_tokens(text)
+    budget = TextBudget(size + 2, unit="tokens")
+    assert budget.take(text) == text
+    assert budget.remaining == 2
+    rest = budget.take(text)
+    assert text.startswith(rest)
+    assert count_tokens(rest) <= 2
+    assert budget.full
+
+
+def test_unknown_unit():
+    with pytest.raises(ValueError):
+        TextBudget(10, unit="words")